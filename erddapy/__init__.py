@@ -1,9 +1,11 @@
 """Easier access to scientific data."""
 
+from erddapy.core.profiling import profile
 from erddapy.erddapy import ERDDAP
 
 __all__ = [
     "ERDDAP",
+    "profile",
 ]
 
 try:
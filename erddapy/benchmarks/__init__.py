@@ -0,0 +1,13 @@
+"""Offline benchmarks of erddapy.
+
+The benchmarks follow the airspeed velocity (asv) conventions, classes with
+`setup`, `params`, and `time_*` methods, and run against a local stand-in
+server with synthetic datasets, see `erddapy.benchmarks.server`.
+
+Run them with asv, pointing `benchmark_dir` to this package, or without
+extra dependencies with:
+
+    python -m erddapy.benchmarks [filter]
+
+where the optional `filter` selects the benchmarks by name.
+"""
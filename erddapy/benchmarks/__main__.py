@@ -0,0 +1,81 @@
+"""Run the benchmarks without asv, `python -m erddapy.benchmarks [filter]`."""
+
+from __future__ import annotations
+
+import importlib
+import inspect
+import itertools
+import pkgutil
+import sys
+import timeit
+from typing import TYPE_CHECKING
+
+import erddapy.benchmarks
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+def _benchmarks() -> Iterator[tuple[str, type, str]]:
+    """Yield the module, class, and method name of each benchmark."""
+    for module_info in pkgutil.iter_modules(erddapy.benchmarks.__path__):
+        if not module_info.name.startswith("bench_"):
+            continue
+        module = importlib.import_module(
+            f"erddapy.benchmarks.{module_info.name}",
+        )
+        for name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            for method in dir(cls):
+                if method.startswith("time_"):
+                    yield f"{module_info.name}.{name}.{method}", cls, method
+
+
+def _param_combinations(cls: type) -> list[tuple]:
+    params = getattr(cls, "params", ())
+    if not params:
+        return [()]
+    # asv takes a single list of parameters as the only parameter.
+    if not isinstance(params[0], list | tuple):
+        params = (params,)
+    return list(itertools.product(*params))
+
+
+def run(
+    pattern: str = "",
+    repeat: int = 3,
+    number: int = 0,
+) -> list[tuple[str, tuple, float]]:
+    """Run the benchmarks whose name contain `pattern`.
+
+    Returns the name, parameters, and best time per call, in seconds,
+    of each benchmark. `number` is the calls per repeat,
+    or automatically chosen to last at least 0.2 seconds when zero.
+    """
+    results = []
+    for name, cls, method in _benchmarks():
+        if pattern not in name:
+            continue
+        for params in _param_combinations(cls):
+            bench = cls()
+            if hasattr(bench, "setup"):
+                bench.setup(*params)
+            func = getattr(bench, method)
+            timer = timeit.Timer(lambda f=func, p=params: f(*p))
+            calls = number or timer.autorange()[0]
+            best = min(timer.repeat(repeat=repeat, number=calls)) / calls
+            results.append((name, params, best))
+    return results
+
+
+def main() -> None:
+    """Print the results of the benchmarks selected by the first argument."""
+    pattern = sys.argv[1] if len(sys.argv) > 1 else ""
+    for name, params, best in run(pattern):
+        label = f"{name}{list(params)}" if params else name
+        print(f"{label:<70} {best * 1e6:12.1f} us")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
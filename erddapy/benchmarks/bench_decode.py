@@ -0,0 +1,67 @@
+"""Decoding and transport benchmarks of `to_pandas` and `to_xarray`."""
+
+from __future__ import annotations
+
+from erddapy import ERDDAP
+from erddapy.benchmarks.server import shared_server
+from erddapy.core.url import _urlopen
+
+SIZES = (1_000, 100_000)
+
+
+def _erddap(rows: int) -> ERDDAP:
+    e = ERDDAP(shared_server().url, protocol="tabledap")
+    e.dataset_id = f"table_{rows}"
+    return e
+
+
+class TimeToPandas:
+    """Time `to_pandas` decoding of cached responses."""
+
+    params = (SIZES, ("csvp", "csv", "dods"))
+    param_names = ("rows", "response")
+
+    def setup(self: TimeToPandas, rows: int, response: str) -> None:
+        """Download the response once."""
+        self.e = _erddap(rows)
+        self.kw = {"skiprows": [1]} if response == "csv" else {}
+        self.e.to_pandas(response=response, **self.kw)
+
+    def time_to_pandas(self: TimeToPandas, rows: int, response: str) -> None:  # noqa: ARG002
+        """Decode the response."""
+        self.e.to_pandas(response=response, **self.kw)
+
+
+class TimeToXarray:
+    """Time `to_xarray` decoding of cached responses."""
+
+    params = (SIZES, ("ncCF", "dods"))
+    param_names = ("rows", "response")
+
+    def setup(self: TimeToXarray, rows: int, response: str) -> None:
+        """Download the response once."""
+        self.e = _erddap(rows)
+        if response == "dods":
+            self.e.response = "dods"
+        self.e.to_xarray().load()
+
+    def time_to_xarray(self: TimeToXarray, rows: int, response: str) -> None:  # noqa: ARG002
+        """Decode the response."""
+        self.e.to_xarray().load()
+
+
+class TimeTransport:
+    """Time `to_pandas` download and decoding, without the response cache."""
+
+    params = (SIZES,)
+    param_names = ("rows",)
+
+    def setup(self: TimeTransport, rows: int) -> None:
+        """Warm up the stand-in server payload."""
+        self.e = _erddap(rows)
+        self.e.to_pandas()
+
+    def time_to_pandas(self: TimeTransport, rows: int) -> None:  # noqa: ARG002
+        """Download and decode the csvp response."""
+        _urlopen.cache_clear()
+        self.e.to_pandas()
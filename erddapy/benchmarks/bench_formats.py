@@ -0,0 +1,46 @@
+"""Response format benchmarks, see `erddapy.benchmarks.formats`."""
+
+from __future__ import annotations
+
+from erddapy.benchmarks.formats import (
+    VARIABLES,
+    _download,
+    available_formats,
+    decoders,
+)
+from erddapy.benchmarks.server import shared_server
+from erddapy.core.url import get_download_url
+
+
+class TimeFormats:
+    """Time the download and decoding of the same query in many formats."""
+
+    params = ((1_000, 100_000), tuple(available_formats()))
+    param_names = ("rows", "response")
+
+    def setup(self: TimeFormats, rows: int, response: str) -> None:
+        """Build the download URL."""
+        self.url = get_download_url(
+            shared_server().url,
+            dataset_id=f"table_{rows}",
+            protocol="tabledap",
+            variables=VARIABLES,
+            response=response,
+        )
+
+    def time_download_decode(
+        self: TimeFormats,
+        rows: int,  # noqa: ARG002
+        response: str,
+    ) -> None:
+        """Download and decode the response."""
+        _download(self.url)
+        decoders[response](self.url)
+
+    def track_bytes(
+        self: TimeFormats,
+        rows: int,  # noqa: ARG002
+        response: str,  # noqa: ARG002
+    ) -> int:
+        """Track the bytes on the wire."""
+        return _download(self.url)
@@ -0,0 +1,37 @@
+"""Metadata parsing benchmarks.
+
+The responses are downloaded once in `setup` and `urlopen` caches them,
+so these benchmarks time the parsing only.
+"""
+
+from __future__ import annotations
+
+from erddapy import ERDDAP
+from erddapy.benchmarks.server import shared_server
+from erddapy.core.griddap import _griddap_get_constraints
+
+
+class TimeInfoParsing:
+    """Time the parsing of the info response into the variables metadata."""
+
+    def setup(self: TimeInfoParsing) -> None:
+        """Download the info response."""
+        self.e = ERDDAP(shared_server().url, protocol="tabledap")
+        self.e._get_variables_uncached("table_1000")  # noqa: SLF001
+
+    def time_get_variables_uncached(self: TimeInfoParsing) -> None:
+        """Parse the info response."""
+        self.e._get_variables_uncached("table_1000")  # noqa: SLF001
+
+
+class TimeNcMLParsing:
+    """Time the parsing of the griddap NcML into the initial constraints."""
+
+    def setup(self: TimeNcMLParsing) -> None:
+        """Download the NcML response."""
+        self.url = f"{shared_server().url}/griddap/grid_1000"
+        _griddap_get_constraints(self.url, step=1)
+
+    def time_griddap_get_constraints(self: TimeNcMLParsing) -> None:
+        """Parse the NcML response."""
+        _griddap_get_constraints(self.url, step=1)
@@ -0,0 +1,27 @@
+"""Multiple server search benchmarks."""
+
+from __future__ import annotations
+
+from erddapy.benchmarks.server import shared_server
+from erddapy.core.url import _urlopen
+from erddapy.multiple_server_search import search_servers
+
+
+class TimeSearchServers:
+    """Time the search fan-out to many servers, without the response cache."""
+
+    params = (1, 8)
+    param_names = ("servers",)
+
+    def setup(self: TimeSearchServers, servers: int) -> None:
+        """Play many servers with the stand-in, one path prefix each."""
+        url = shared_server().url
+        self.servers = [
+            url.replace("/erddap", f"/s{k}/erddap") + "/"
+            for k in range(servers)
+        ]
+
+    def time_search_servers(self: TimeSearchServers, servers: int) -> None:  # noqa: ARG002
+        """Search all the servers."""
+        _urlopen.cache_clear()
+        search_servers("temperature", servers_list=self.servers)
@@ -0,0 +1,72 @@
+"""URL building benchmarks."""
+
+from __future__ import annotations
+
+from erddapy.core.url import (
+    _sort_url,
+    get_download_url,
+    get_search_url,
+    quote_url,
+)
+
+SERVER = "https://erddap.ioos.us/erddap"
+
+CONSTRAINTS = {
+    "time>=": "2020-01-01T00:00:00Z",
+    "time<=": "2020-12-31T23:59:59Z",
+    "latitude>=": 38.0,
+    "latitude<=": 41.0,
+    "longitude>=": -72.0,
+    "longitude<=": -69.0,
+    "station=": "A01",
+}
+
+VARIABLES = ["time", "latitude", "longitude", "station", "temperature"]
+
+
+class TimeURLBuilding:
+    """Time the URL builders used by every request."""
+
+    def setup(self: TimeURLBuilding) -> None:
+        """Build the URLs used as input."""
+        self.url = get_download_url(
+            SERVER,
+            dataset_id="buoy",
+            protocol="tabledap",
+            variables=VARIABLES,
+            response="csvp",
+            constraints=CONSTRAINTS,
+        )
+
+    def time_get_download_url(self: TimeURLBuilding) -> None:
+        """Tabledap download URL with time, spatial, and string constraints."""
+        get_download_url(
+            SERVER,
+            dataset_id="buoy",
+            protocol="tabledap",
+            variables=VARIABLES,
+            response="csvp",
+            constraints=CONSTRAINTS,
+        )
+
+    def time_get_search_url(self: TimeURLBuilding) -> None:
+        """Advanced search URL with a bounding box and time range."""
+        get_search_url(
+            SERVER,
+            search_for="sea_water_temperature",
+            response="csv",
+            min_lon=-72.0,
+            max_lon=-69.0,
+            min_lat=38.0,
+            max_lat=41.0,
+            min_time="2020-01-01T00:00:00Z",
+            max_time="2020-12-31T23:59:59Z",
+        )
+
+    def time_sort_url(self: TimeURLBuilding) -> None:
+        """Sort the query of a download URL, used to compare URLs."""
+        _sort_url(self.url)
+
+    def time_quote_url(self: TimeURLBuilding) -> None:
+        """Quote the query of a download URL before the request."""
+        quote_url(self.url)
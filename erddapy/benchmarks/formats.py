@@ -0,0 +1,150 @@
+"""Compare the response formats of the same tabledap query.
+
+For each format it measures the bytes on the wire, the download time, the
+time to decode the response into a DataFrame, and the peak memory of the
+decoding, against the stand-in server, e.g.:
+
+    python -m erddapy.benchmarks.formats 100000
+
+"""
+
+from __future__ import annotations
+
+import functools
+import importlib.util
+import json
+import sys
+import time
+import tracemalloc
+from typing import TYPE_CHECKING
+
+import pandas as pd
+
+from erddapy.benchmarks.server import shared_server
+from erddapy.core import interfaces
+from erddapy.core.url import _urlopen, get_download_url, urlopen
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+VARIABLES = ["time", "latitude", "longitude", "station", "temperature"]
+
+
+def _read_jsonl(url: str, *, header: bool = False) -> pd.DataFrame:
+    data = urlopen(url)
+    columns = json.loads(data.readline()) if header else VARIABLES
+    df = pd.read_json(data, lines=True)
+    df.columns = columns
+    return df
+
+
+def _read_nc(url: str, response: str) -> pd.DataFrame:
+    return interfaces.to_xarray(url, response=response).to_dataframe()
+
+
+# Decoders of the responses into a DataFrame, by file type.
+decoders: dict[str, Callable[[str], pd.DataFrame]] = {
+    "csv": functools.partial(
+        interfaces.to_pandas,
+        pandas_kwargs={"skiprows": [1]},
+    ),
+    "csvp": interfaces.to_pandas,
+    "nccsv": interfaces.to_pandas,
+    "dods": interfaces.to_pandas,
+    "parquet": lambda url: pd.read_parquet(urlopen(url)),
+    "nc": functools.partial(_read_nc, response="nc"),
+    "ncCF": functools.partial(_read_nc, response="ncCF"),
+    "jsonlCSV": _read_jsonl,
+    "jsonlCSV1": functools.partial(_read_jsonl, header=True),
+    "jsonlKVP": lambda url: pd.read_json(urlopen(url), lines=True),
+}
+
+_requires = {
+    "parquet": "pyarrow",
+    "nc": "netCDF4",
+    "ncCF": "netCDF4",
+}
+
+
+def available_formats() -> list[str]:
+    """Return the formats whose optional dependencies are installed."""
+    return [
+        response
+        for response in decoders
+        if response not in _requires
+        or importlib.util.find_spec(_requires[response]) is not None
+    ]
+
+
+def _best(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _download(url: str) -> int:
+    _urlopen.cache_clear()
+    return len(urlopen(url).getvalue())
+
+
+def _peak_memory(func: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def compare_formats(
+    rows: int = 100_000,
+    responses: list[str] | None = None,
+    server: str | None = None,
+    repeat: int = 3,
+) -> pd.DataFrame:
+    """Measure the same tabledap query in many response formats.
+
+    rows: the size of the synthetic `table_<rows>` dataset.
+    responses: the formats to compare, defaults to `available_formats()`.
+    server: the ERDDAP server URL, defaults to the shared stand-in server.
+    repeat: the best of `repeat` timings is reported.
+
+    Returns a DataFrame indexed by format with the columns
+    `bytes`, `download_s`, `decode_s`, `peak_memory_mb`, and `total_s`,
+    the download and decode times, sorted by `total_s`.
+    """
+    server = server or shared_server().url
+    results = {}
+    for response in responses or available_formats():
+        url = get_download_url(
+            server,
+            dataset_id=f"table_{rows}",
+            protocol="tabledap",
+            variables=VARIABLES,
+            response=response,
+        )
+        size = _download(url)
+        download = _best(functools.partial(_download, url), repeat)
+        # The response stays in the `urlopen` cache, only decoding is timed.
+        decode = decoders[response]
+        decode_time = _best(functools.partial(decode, url), repeat)
+        peak = _peak_memory(functools.partial(decode, url))
+        results[response] = {
+            "bytes": size,
+            "download_s": download,
+            "decode_s": decode_time,
+            "peak_memory_mb": peak / 2**20,
+        }
+    df = pd.DataFrame.from_dict(results, orient="index")
+    df.index.name = "response"
+    df["total_s"] = df["download_s"] + df["decode_s"]
+    return df.sort_values("total_s")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with pd.option_context("display.width", 120):
+        print(compare_formats(rows))  # noqa: T201
@@ -0,0 +1,364 @@
+"""Local stand-in for an ERDDAP server with synthetic datasets.
+
+The server runs in a background thread and answers the requests erddapy
+makes, so the benchmarks run offline and are not affected by the network
+or by the load of a real server.
+
+The datasets are named after their size:
+
+- `table_<rows>`, a tabledap time series with `<rows>` rows;
+- `grid_<times>`, a griddap dataset with `<times>` time steps.
+
+Any path prefix before `/erddap/` is ignored, so one stand-in can play
+many servers, e.g. `http://127.0.0.1:<port>/s1/erddap`.
+"""
+
+from __future__ import annotations
+
+import functools
+import io
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Self
+from urllib.parse import unquote, urlparse
+
+import numpy as np
+import pandas as pd
+
+_units = {
+    "time": "UTC",
+    "latitude": "degrees_north",
+    "longitude": "degrees_east",
+    "station": "",
+    "temperature": "degree_C",
+}
+
+_search_columns = (
+    "griddap",
+    "subset",
+    "tabledap",
+    "Make A Graph",
+    "wms",
+    "files",
+    "Title",
+    "Summary",
+    "FGDC",
+    "ISO 19115",
+    "Info",
+    "Background Info",
+    "RSS",
+    "Email",
+    "Institution",
+    "Dataset ID",
+)
+
+
+@functools.lru_cache(maxsize=32)
+def synthetic_table(rows: int) -> pd.DataFrame:
+    """Return the data of the `table_<rows>` dataset."""
+    rng = np.random.default_rng(rows)
+    stations = np.array([f"station_{k:02d}" for k in range(10)])
+    return pd.DataFrame(
+        {
+            "time": pd.date_range("2020-01-01", periods=rows, freq="min")
+            .strftime("%Y-%m-%dT%H:%M:%SZ")
+            .to_numpy(),
+            "latitude": rng.uniform(-90, 90, rows).round(4),
+            "longitude": rng.uniform(-180, 180, rows).round(4),
+            "station": stations[np.arange(rows) % stations.size],
+            "temperature": rng.normal(15, 5, rows).round(3),
+        },
+    )
+
+
+def _csv(df: pd.DataFrame, response: str) -> bytes:
+    """Encode a table as ERDDAP's csv, with a units row, or csvp."""
+    if response == "csvp":
+        df = df.rename(
+            columns={
+                name: f"{name} ({_units[name]})" if _units[name] else name
+                for name in df.columns
+            },
+        )
+        return df.to_csv(index=False).encode()
+    units = pd.DataFrame([[_units[name] for name in df.columns]])
+    units.columns = df.columns
+    return pd.concat([units, df]).to_csv(index=False).encode()
+
+
+def _nc(df: pd.DataFrame) -> bytes:
+    """Encode a table as a netCDF file, like ncCF, with xarray."""
+    import xarray as xr  # noqa: PLC0415
+
+    df = df.assign(time=pd.to_datetime(df["time"]).dt.tz_localize(None))
+    ds = xr.Dataset.from_dataframe(df.rename_axis("row")).drop_vars("row")
+    ds["station"] = ds["station"].astype(str)
+    return bytes(ds.to_netcdf())
+
+
+def _dods(df: pd.DataFrame, dataset_id: str) -> bytes:
+    """Encode a table as a DAP2 sequence, the .dods response."""
+    seconds = (
+        pd.to_datetime(df["time"], utc=True) - pd.Timestamp(0, tz="UTC")
+    ) / pd.Timedelta(seconds=1)
+    dds = (
+        "Dataset {\n  Sequence {\n    Float64 time;\n    Float64 latitude;\n"
+        "    Float64 longitude;\n    String station;\n"
+        "    Float32 temperature;\n  } s;\n"
+        f"}} {dataset_id};\n\nData:\n"
+    )
+    fixed = np.empty(
+        len(df),
+        dtype=[
+            ("marker", ">u4"),
+            ("time", ">f8"),
+            ("latitude", ">f8"),
+            ("longitude", ">f8"),
+        ],
+    )
+    fixed["marker"] = 0x5A000000
+    fixed["time"] = seconds
+    fixed["latitude"] = df["latitude"]
+    fixed["longitude"] = df["longitude"]
+    temperature = df["temperature"].to_numpy(">f4")
+    buffer = io.BytesIO()
+    buffer.write(dds.encode())
+    for k, station in enumerate(df["station"]):
+        data = station.encode()
+        buffer.write(fixed[k : k + 1].tobytes())
+        buffer.write(len(data).to_bytes(4, "big"))
+        buffer.write(data + b"\0" * (-len(data) % 4))
+        buffer.write(temperature[k : k + 1].tobytes())
+    buffer.write(0xA5000000.to_bytes(4, "big"))
+    return buffer.getvalue()
+
+
+def _parquet(df: pd.DataFrame) -> bytes:
+    """Encode a table as parquet, requires pyarrow."""
+    df = df.assign(time=pd.to_datetime(df["time"], utc=True))
+    return df.to_parquet(index=False)
+
+
+def _jsonl(df: pd.DataFrame, response: str) -> bytes:
+    """Encode a table as jsonlCSV, jsonlCSV1, with the header, or jsonlKVP."""
+    if response == "jsonlKVP":
+        return df.to_json(orient="records", lines=True).encode()
+    lines = [json.dumps(row) for row in df.itertuples(index=False)]
+    if response == "jsonlCSV1":
+        lines.insert(0, json.dumps(list(df.columns)))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _nccsv(df: pd.DataFrame, dataset_id: str) -> bytes:
+    """Encode a table as NCCSV, the attributes followed by the data."""
+    types = {"time": "String", "station": "String", "temperature": "float"}
+    header = [
+        '*GLOBAL*,Conventions,"COARDS, CF-1.6, ACDD-1.3, NCCSV-1.2"',
+        f"*GLOBAL*,title,{dataset_id}",
+    ]
+    for name, units in _units.items():
+        header.append(f"{name},*DATA_TYPE*,{types.get(name, 'double')}")
+        if units:
+            header.append(f"{name},units,{units}")
+    data = df.to_csv(index=False)
+    return (
+        "\n".join(header) + "\n\n*END_METADATA*\n" + data + "*END_DATA*\n"
+    ).encode()
+
+
+# Encoders of the tabledap responses, by file type.
+table_encoders = {
+    "csv": lambda df, _: _csv(df, "csv"),
+    "csvp": lambda df, _: _csv(df, "csvp"),
+    "ncCF": lambda df, _: _nc(df),
+    "nc": lambda df, _: _nc(df),
+    "dods": _dods,
+    "parquet": lambda df, _: _parquet(df),
+    "jsonlCSV": lambda df, _: _jsonl(df, "jsonlCSV"),
+    "jsonlCSV1": lambda df, _: _jsonl(df, "jsonlCSV1"),
+    "jsonlKVP": lambda df, _: _jsonl(df, "jsonlKVP"),
+    "nccsv": _nccsv,
+}
+
+
+@functools.lru_cache(maxsize=64)
+def table_payload(dataset_id: str, response: str) -> bytes:
+    """Return the encoded response of a tabledap dataset."""
+    rows = int(dataset_id.rsplit("_", maxsplit=1)[-1])
+    return table_encoders[response](synthetic_table(rows), dataset_id)
+
+
+@functools.lru_cache(maxsize=32)
+def info_payload(dataset_id: str, attributes: int = 50) -> bytes:
+    """Return the info/index.csv response of a dataset."""
+    rows = [
+        ("attribute", "NC_GLOBAL", f"global_{k}", "String", f"value {k}")
+        for k in range(attributes)
+    ]
+    rows.append(("attribute", "NC_GLOBAL", "title", "String", dataset_id))
+    for name, units in _units.items():
+        dtype = "String" if name == "station" else "double"
+        rows.append(("variable", name, "", dtype, ""))
+        rows.append(("attribute", name, "units", "String", units))
+        rows.append(("attribute", name, "long_name", "String", name.title()))
+        rows.append(
+            ("attribute", name, "actual_range", dtype, "-90.0, 90.0"),
+        )
+    df = pd.DataFrame(
+        rows,
+        columns=[
+            "Row Type",
+            "Variable Name",
+            "Attribute Name",
+            "Data Type",
+            "Value",
+        ],
+    )
+    return df.to_csv(index=False).encode()
+
+
+@functools.lru_cache(maxsize=32)
+def ncml_payload(dataset_id: str) -> bytes:
+    """Return the NcML response of a `grid_<times>` dataset."""
+    times = int(dataset_id.rsplit("_", maxsplit=1)[-1])
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<netcdf xmlns="https://www.unidata.ucar.edu/namespaces/netcdf/ncml-2.2"
+    location="{dataset_id}">
+  <attribute name="title" value="Synthetic {dataset_id}"/>
+  <dimension name="time" length="{times}"/>
+  <dimension name="latitude" length="180"/>
+  <dimension name="longitude" length="360"/>
+  <variable name="time" shape="time" type="double">
+    <attribute name="units" value="seconds since 1970-01-01T00:00:00Z"/>
+    <attribute name="actual_range" type="double"
+        value="0.0 {86400.0 * (times - 1)}"/>
+  </variable>
+  <variable name="latitude" shape="latitude" type="float">
+    <attribute name="actual_range" type="float" value="-89.5 89.5"/>
+  </variable>
+  <variable name="longitude" shape="longitude" type="float">
+    <attribute name="actual_range" type="float" value="-179.5 179.5"/>
+  </variable>
+  <variable name="sst" shape="time latitude longitude" type="float">
+    <attribute name="units" value="degree_C"/>
+  </variable>
+</netcdf>
+""".encode()
+
+
+@functools.lru_cache(maxsize=8)
+def search_payload(datasets: int = 20) -> bytes:
+    """Return a search/index.csv response."""
+    df = pd.DataFrame(
+        [
+            {
+                **dict.fromkeys(_search_columns, ""),
+                "tabledap": f"tabledap/table_{k}",
+                "Title": f"Synthetic table {k}",
+                "Institution": "erddapy",
+                "Dataset ID": f"table_{k}",
+            }
+            for k in range(1, datasets + 1)
+        ],
+    )
+    return df.to_csv(index=False).encode()
+
+
+def version_payload() -> bytes:
+    """Return the version response."""
+    return b"ERDDAP_version=2.25\n"
+
+
+_routes = (
+    (re.compile(r"^/version$"), version_payload),
+    (re.compile(r"^/search/(index|advanced)\.csv$"), search_payload),
+    (
+        re.compile(r"^/info/(?P<dataset_id>[^/]+)/index\.csv$"),
+        info_payload,
+    ),
+    (
+        re.compile(r"^/griddap/(?P<dataset_id>grid_\d+)\.ncml$"),
+        ncml_payload,
+    ),
+    (
+        re.compile(
+            r"^/tabledap/(?P<dataset_id>table_\d+)\.(?P<response>\w+)$"
+        ),
+        table_payload,
+    ),
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Answer the ERDDAP requests with the synthetic payloads."""
+
+    def do_GET(self: _Handler) -> None:
+        path = unquote(urlparse(self.path).path)
+        path = path[path.find("/erddap/") + len("/erddap") :]
+        for pattern, payload in _routes:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            try:
+                body = payload(**match.groupdict())
+            except KeyError:
+                break
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        body = (
+            f'Error {{\n    code=404;\n    message="Not Found: {path}";\n}}\n'
+        ).encode()
+        self.send_response(404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self: _Handler, *args: object) -> None:
+        """Do not log the requests."""
+
+
+class StandInServer:
+    """Run the stand-in ERDDAP server in a background thread.
+
+    Examples
+    --------
+        >>> from erddapy import ERDDAP
+        >>> from erddapy.benchmarks.server import StandInServer
+        >>> with StandInServer() as server:
+        ...     e = ERDDAP(server.url, protocol="tabledap")
+        ...     e.dataset_id = "table_1000"
+        ...     df = e.to_pandas()
+
+    """
+
+    def __init__(self: StandInServer, host: str = "127.0.0.1") -> None:
+        """Bind the server to a free port of `host`."""
+        self.httpd = ThreadingHTTPServer((host, 0), _Handler)
+        self.httpd.daemon_threads = True
+        port = self.httpd.server_address[1]
+        self.url = f"http://{host}:{port}/erddap"
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever,
+            daemon=True,
+        )
+
+    def __enter__(self) -> Self:
+        """Start serving."""
+        self.thread.start()
+        return self
+
+    def __exit__(self: StandInServer, *args: object) -> None:
+        """Stop serving."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@functools.cache
+def shared_server() -> StandInServer:
+    """Return a stand-in server shared by all the benchmarks of a process."""
+    return StandInServer().__enter__()
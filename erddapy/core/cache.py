@@ -0,0 +1,456 @@
+"""Caches shared by all ERDDAP instances.
+
+The metadata cache has an in-memory layer, shared by every instance in the
+process, and an optional SQLite layer on disk that is shared by every process
+on the host. Entries are keyed by `(server, dataset_id, kind)` and expire
+after a configurable time-to-live.
+
+The result caches store downloaded tabledap data and answer new requests
+locally, when possible, instead of going to the network.
+"""
+
+from __future__ import annotations
+
+import copy
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from erddapy.core.constraints import (
+    _contains,
+    _filter_frame,
+    _parse_constraints,
+    _Query,
+    _seconds,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+
+# One day is a good compromise for metadata, it rarely changes
+# and users can always call `clear` to force a new request.
+DEFAULT_TTL = 86_400
+
+# Entries of the in-memory layer, like the `lru_cache` it replaced.
+DEFAULT_MAXSIZE = 128
+
+
+def _cache_dir() -> Path:
+    """Return erddapy's cache directory.
+
+    Defaults to `~/.cache/erddapy` and can be changed with the
+    `ERDDAPY_CACHE_DIR` environment variable.
+    """
+    path = os.environ.get("ERDDAPY_CACHE_DIR")
+    if path:
+        return Path(path)
+    return Path.home().joinpath(".cache", "erddapy")
+
+
+class MetadataCache:
+    """Cache metadata keyed by server, dataset_id, and the metadata kind.
+
+    Args:
+    ----
+        path: SQLite file for the persistent layer.
+            If None only the in-memory layer is used.
+        ttl: time-to-live, in seconds, of the entries.
+            Use None for entries that never expire.
+        maxsize: number of entries of the in-memory layer,
+            the least recently used are dropped first.
+
+    Examples:
+    --------
+        Share the metadata between processes on the same host:
+
+        >>> from erddapy.core.cache import MetadataCache, set_metadata_cache
+        >>> set_metadata_cache(MetadataCache(path="erddapy.sqlite", ttl=3600))
+
+    """
+
+    def __init__(
+        self: MetadataCache,
+        path: str | Path | None = None,
+        ttl: float | None = DEFAULT_TTL,
+        maxsize: int = DEFAULT_MAXSIZE,
+    ) -> None:
+        """Instantiate the memory layer and create the SQLite table."""
+        self.path = Path(path) if path is not None else None
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._memory: OrderedDict[tuple[str, str, str], tuple[float, Any]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(self._connect()) as con, con:
+                con.execute(
+                    "CREATE TABLE IF NOT EXISTS metadata ("
+                    "server TEXT, dataset_id TEXT, kind TEXT, "
+                    "created REAL, value TEXT, "
+                    "PRIMARY KEY (server, dataset_id, kind))",
+                )
+
+    def _connect(self: MetadataCache) -> sqlite3.Connection:
+        # A connection per operation is cheap and safe across threads.
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _expired(self: MetadataCache, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _remember(
+        self: MetadataCache,
+        key: tuple[str, str, str],
+        entry: tuple[float, Any],
+    ) -> None:
+        """Add an entry to the memory layer, dropping the least recent."""
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def get(
+        self: MetadataCache,
+        server: str,
+        dataset_id: str | None,
+        kind: str,
+    ) -> Any:
+        """Return the cached value or None if missing or expired.
+
+        The value is a copy, changing it does not change the cache.
+        """
+        key = (server.rstrip("/"), dataset_id or "", kind)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is not None:
+            created, value = entry
+            if not self._expired(created):
+                return _copy(value)
+            with self._lock:
+                self._memory.pop(key, None)
+
+        if self.path is None:
+            return None
+        with closing(self._connect()) as con:
+            row = con.execute(
+                "SELECT created, value FROM metadata "
+                "WHERE server=? AND dataset_id=? AND kind=?",
+                key,
+            ).fetchone()
+        if row is None or self._expired(row[0]):
+            return None
+        value = _loads(row[1])
+        self._remember(key, (row[0], value))
+        return _copy(value)
+
+    def set(
+        self: MetadataCache,
+        server: str,
+        dataset_id: str | None,
+        kind: str,
+        value: Any,
+    ) -> None:
+        """Store a JSON serializable `value` in all the cache layers.
+
+        Numpy arrays are stored read-only in memory and in the binary
+        `.npy` format on disk.
+        """
+        key = (server.rstrip("/"), dataset_id or "", kind)
+        created = time.time()
+        value = (
+            _read_only(value)
+            if isinstance(value, np.ndarray)
+            else copy.deepcopy(value)
+        )
+        self._remember(key, (created, value))
+        if self.path is None:
+            return
+        dumped = _dumps(value)
+        with closing(self._connect()) as con, con:
+            con.execute(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?)",
+                (*key, created, dumped),
+            )
+
+    def clear(self: MetadataCache) -> None:
+        """Remove all entries from all the cache layers."""
+        with self._lock:
+            self._memory.clear()
+        if self.path is None:
+            return
+        with closing(self._connect()) as con, con:
+            con.execute("DELETE FROM metadata")
+
+
+def _copy(value: Any) -> Any:
+    """Return a copy of a cached value, read-only arrays are shared."""
+    if isinstance(value, np.ndarray):
+        return value
+    return copy.deepcopy(value)
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    """Return `array`, or a copy of it, that cannot be modified."""
+    if array.flags.writeable:
+        array = array.copy()
+        array.flags.writeable = False
+    return array
+
+
+def _dumps(value: Any) -> str | bytes:
+    """Serialize a value of the persistent layer, arrays as `.npy` bytes."""
+    if isinstance(value, np.ndarray):
+        buffer = io.BytesIO()
+        np.save(buffer, value, allow_pickle=False)
+        return buffer.getvalue()
+    return json.dumps(value, default=_json_default)
+
+
+def _loads(dumped: str | bytes) -> Any:
+    """Deserialize a value of the persistent layer, see `_dumps`."""
+    if isinstance(dumped, bytes):
+        return _read_only(np.load(io.BytesIO(dumped), allow_pickle=False))
+    return json.loads(dumped)
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize numpy scalars that pandas may leave in the metadata."""
+    if hasattr(obj, "item"):
+        return obj.item()
+    return str(obj)
+
+
+def _default_metadata_cache() -> MetadataCache:
+    """Only persist to disk when the user opted in via ERDDAPY_CACHE_DIR."""
+    if os.environ.get("ERDDAPY_CACHE_DIR"):
+        return MetadataCache(path=_cache_dir().joinpath("metadata.sqlite"))
+    return MetadataCache()
+
+
+_metadata_cache = _default_metadata_cache()
+
+
+def get_metadata_cache() -> MetadataCache:
+    """Return the metadata cache shared by all ERDDAP instances."""
+    return _metadata_cache
+
+
+def set_metadata_cache(cache: MetadataCache) -> None:
+    """Replace the metadata cache shared by all ERDDAP instances."""
+    global _metadata_cache  # noqa: PLW0603
+    _metadata_cache = cache
+
+
+class _Partition(NamedTuple):
+    """Rows of a tabledap request covering the closed interval start-stop."""
+
+    start: float
+    stop: float
+    df: pd.DataFrame
+    seconds: np.ndarray
+
+
+class TimePartitionCache:
+    """Cache tabledap results as time partitions.
+
+    Results are keyed by server, dataset_id, variables, and the non-time
+    constraints. Each entry stores the intervals already downloaded,
+    so a new request only fetches the missing intervals and the answer
+    is assembled locally.
+
+    Examples
+    --------
+        >>> from erddapy.core.cache import TimePartitionCache
+        >>> e.partition_cache = TimePartitionCache()
+
+    """
+
+    def __init__(self: TimePartitionCache) -> None:
+        """Instantiate an empty cache."""
+        self._partitions: dict[Hashable, list[_Partition]] = {}
+        self._lock = threading.Lock()
+
+    def _coverage(self: TimePartitionCache, key: Hashable) -> list[list]:
+        """Return the merged closed intervals covered for `key`."""
+        with self._lock:
+            partitions = sorted(
+                self._partitions.get(key, []),
+                key=lambda p: (p.start, p.stop),
+            )
+        merged: list[list] = []
+        for partition in partitions:
+            if merged and partition.start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], partition.stop)
+            else:
+                merged.append([partition.start, partition.stop])
+        return merged
+
+    def missing(
+        self: TimePartitionCache,
+        key: Hashable,
+        start: float,
+        stop: float,
+    ) -> list[tuple[float, float, bool, bool]]:
+        """Return the intervals of `start`-`stop` that are not cached.
+
+        Each interval is (start, stop, closed_start, closed_stop),
+        the edges shared with cached intervals are open.
+        """
+        gaps = []
+        lower, closed = start, True
+        for covered_start, covered_stop in self._coverage(key):
+            if covered_start > stop:
+                break
+            if covered_stop < lower:
+                continue
+            if covered_start > lower:
+                gaps.append((lower, covered_start, closed, False))
+            lower, closed = max(lower, covered_stop), False
+        if lower < stop or (lower == stop and closed):
+            gaps.append((lower, stop, closed, True))
+        return gaps
+
+    def add(
+        self: TimePartitionCache,
+        key: Hashable,
+        start: float,
+        stop: float,
+        df: pd.DataFrame,
+        time_column: str,
+    ) -> None:
+        """Store the rows downloaded for the interval `start`-`stop`.
+
+        The rows already stored by an overlapping partition, e.g. when two
+        requests fetched the same gap, are dropped so `assemble` returns
+        each row once.
+        """
+        seconds = _seconds(df[time_column]) if not df.empty else np.array([])
+        with self._lock:
+            partitions = self._partitions.setdefault(key, [])
+            stored = np.zeros(len(seconds), dtype=bool)
+            for partition in partitions:
+                stored |= (seconds >= partition.start) & (
+                    seconds <= partition.stop
+                )
+            if stored.any():
+                df, seconds = df[~stored], seconds[~stored]
+            partitions.append(_Partition(start, stop, df, seconds))
+
+    def assemble(
+        self: TimePartitionCache,
+        key: Hashable,
+        start: float,
+        stop: float,
+    ) -> pd.DataFrame:
+        """Return the cached rows between `start` and `stop`, inclusive."""
+        with self._lock:
+            partitions = sorted(
+                self._partitions.get(key, []),
+                key=lambda p: (p.start, p.stop),
+            )
+        frames = [
+            partition.df[
+                (partition.seconds >= start) & (partition.seconds <= stop)
+            ]
+            for partition in partitions
+            if partition.stop >= start
+            and partition.start <= stop
+            and not partition.df.empty
+        ]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def clear(self: TimePartitionCache) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._partitions.clear()
+
+
+class ResultCache:
+    """Answer tabledap requests from the cached result of a superset.
+
+    Results are keyed by server, dataset_id, and variables.
+    A request whose constraints are contained in the constraints of a
+    cached result, e.g. a smaller bounding box or time range,
+    is answered by filtering the cached DataFrame locally.
+    Requests with relative constraints, like `now-7days` or `max(depth)`,
+    always go to the server.
+
+    Args:
+    ----
+        max_entries: number of results kept, the least recently used
+            results are dropped first.
+
+    Examples:
+    --------
+        >>> from erddapy.core.cache import ResultCache
+        >>> e.result_cache = ResultCache()
+
+    """
+
+    def __init__(self: ResultCache, max_entries: int = 32) -> None:
+        """Instantiate an empty cache."""
+        self.max_entries = max_entries
+        # Least recently used first.
+        self._results: list[tuple[Hashable, _Query, pd.DataFrame]] = []
+        self._lock = threading.Lock()
+
+    def get(
+        self: ResultCache,
+        key: Hashable,
+        constraints: dict[str, Any] | None,
+    ) -> pd.DataFrame | None:
+        """Return the rows matching `constraints` or None on a cache miss."""
+        query = _parse_constraints(constraints)
+        if query is None:
+            return None
+        with self._lock:
+            entries = list(reversed(self._results))
+        for entry in entries:
+            entry_key, outer, df = entry
+            if entry_key != key or not _contains(outer, query):
+                continue
+            result = _filter_frame(df, query)
+            if result is not None:
+                with self._lock:
+                    # Compare by identity, DataFrames have no truth value.
+                    for k, item in enumerate(self._results):
+                        if item is entry:
+                            self._results.append(self._results.pop(k))
+                            break
+                return result
+        return None
+
+    def add(
+        self: ResultCache,
+        key: Hashable,
+        constraints: dict[str, Any] | None,
+        df: pd.DataFrame,
+    ) -> None:
+        """Store the result of a request."""
+        query = _parse_constraints(constraints)
+        if query is None:
+            return
+        with self._lock:
+            self._results.append((key, query, df))
+            del self._results[: -self.max_entries]
+
+    def clear(self: ResultCache) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._results.clear()
@@ -0,0 +1,187 @@
+"""Chunked griddap downloads written directly to a Zarr store.
+
+The request is split in index pieces that match the Zarr chunks, so each
+piece is downloaded, written to its region of the store, and released.
+The pieces already written are recorded next to the store to resume
+interrupted downloads.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import math
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from erddapy.core.url import _urlretrieve
+
+if TYPE_CHECKING:
+    import numpy as np
+    import xarray as xr
+
+# Chunk size, in number of points, of the dimensions not in `chunks`.
+DEFAULT_CHUNK_SIZE = 512
+
+# Encodings of the netCDF pieces that are kept in the Zarr store.
+_zarr_encodings = ("dtype", "_FillValue", "scale_factor", "add_offset")
+
+_progress_file = ".erddapy-chunks.json"
+
+
+def _zarr_chunks(
+    indices: dict[str, tuple[int, int, int]],
+    chunks: dict[str, int] | None,
+) -> dict[str, int]:
+    """Return the chunk size of each dimension of the request."""
+    chunks = {"time": 1} if chunks is None else chunks
+    shape = _request_shape(indices)
+    return {
+        dim: min(chunks.get(dim, DEFAULT_CHUNK_SIZE), size)
+        for dim, size in shape.items()
+    }
+
+
+def _request_shape(
+    indices: dict[str, tuple[int, int, int]],
+) -> dict[str, int]:
+    """Return the number of points of each dimension of the request."""
+    return {
+        dim: (stop - start) // step + 1
+        for dim, (start, step, stop) in indices.items()
+    }
+
+
+def _chunk_grid(
+    indices: dict[str, tuple[int, int, int]],
+    chunks: dict[str, int],
+) -> list[tuple[int, ...]]:
+    """Return the positions of all the chunks of the request."""
+    shape = _request_shape(indices)
+    return list(
+        itertools.product(
+            *(range(math.ceil(shape[dim] / chunks[dim])) for dim in shape),
+        ),
+    )
+
+
+def _chunk_region(
+    chunk: tuple[int, ...],
+    indices: dict[str, tuple[int, int, int]],
+    chunks: dict[str, int],
+) -> tuple[dict[str, slice], dict[str, tuple[int, int, int]]]:
+    """Return a chunk's region in the store and its dataset indices."""
+    shape = _request_shape(indices)
+    region, piece = {}, {}
+    for k, (dim, (start, step, _)) in zip(chunk, indices.items(), strict=True):
+        first = k * chunks[dim]
+        last = min(first + chunks[dim], shape[dim]) - 1
+        region[dim] = slice(first, last + 1)
+        piece[dim] = (start + first * step, step, start + last * step)
+    return region, piece
+
+
+def _load_progress(
+    store: Path,
+    url: str,
+) -> tuple[set[tuple[int, ...]], bool]:
+    """Return the chunks already written to `store` for the request `url`.
+
+    And whether the layout of the store, the template, was written.
+    The progress is recorded before the template, a store without it
+    was not created by `to_zarr`.
+    """
+    path = store / _progress_file
+    if not path.exists():
+        if store.exists() and any(store.iterdir()):
+            msg = f"{store} was not created by to_zarr. Use a new store."
+            raise ValueError(msg)
+        return set(), False
+    progress = json.loads(path.read_text())
+    if progress["url"] != url:
+        msg = (
+            f"{store} was created for another request: {progress['url']}. "
+            "Use a new store."
+        )
+        raise ValueError(msg)
+    return (
+        {tuple(chunk) for chunk in progress["done"]},
+        progress.get("template", True),
+    )
+
+
+def _save_progress(
+    store: Path,
+    url: str,
+    done: set[tuple[int, ...]],
+    *,
+    template: bool = True,
+) -> None:
+    """Record the chunks written to `store` atomically."""
+    store.mkdir(parents=True, exist_ok=True)
+    path = store / _progress_file
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(
+        json.dumps({"url": url, "done": sorted(done), "template": template}),
+    )
+    tmp.replace(path)
+
+
+def _fetch_piece(url: str, requests_kwargs: dict | None) -> xr.Dataset:
+    """Download the `.nc` piece `url` and load it.
+
+    The response is streamed to a temporary file, instead of the in memory
+    `urlopen` cache, and the file is removed once the piece is loaded.
+    """
+    import xarray as xr  # noqa: PLC0415
+
+    with tempfile.TemporaryDirectory(prefix="erddapy_") as tmp:
+        path = _urlretrieve(url, Path(tmp, "piece.nc"), requests_kwargs)
+        with xr.open_dataset(path, engine="netcdf4") as ds:
+            return ds.load()
+
+
+def _zarr_template(
+    piece: xr.Dataset,
+    axes: dict[str, np.ndarray],
+    indices: dict[str, tuple[int, int, int]],
+    chunks: dict[str, int],
+) -> xr.Dataset:
+    """Build a lazy dataset with the layout of the whole request.
+
+    The data variables are lazy dask arrays so the template can be written
+    to the store, with `compute=False`, without holding the data in memory.
+    """
+    import dask.array  # noqa: PLC0415
+    import xarray as xr  # noqa: PLC0415
+
+    shape = _request_shape(indices)
+    coords = {}
+    for dim, (start, step, stop) in indices.items():
+        # `_griddap_get_axis` stores times as seconds since 1970.
+        attrs = (
+            {"units": "seconds since 1970-01-01T00:00:00Z"}
+            if dim == "time"
+            else {}
+        )
+        coords[dim] = (dim, axes[dim][start : stop + 1 : step], attrs)
+
+    data_vars = {}
+    for var, values in piece.data_vars.items():
+        data = dask.array.zeros(
+            tuple(shape[dim] for dim in values.dims),
+            chunks=tuple(chunks[dim] for dim in values.dims),
+            dtype=values.dtype,
+        )
+        data_vars[var] = xr.Variable(
+            values.dims,
+            data,
+            attrs=values.attrs,
+            encoding={
+                k: v
+                for k, v in values.encoding.items()
+                if k in _zarr_encodings
+            },
+        )
+    return xr.Dataset(data_vars=data_vars, coords=coords, attrs=piece.attrs)
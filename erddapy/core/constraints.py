@@ -0,0 +1,208 @@
+"""Constraint algebra over the tabledap `constraints` dictionaries.
+
+The constraints understood by `get_download_url`, e.g. `{"time>=": ...}`,
+are parsed into per-variable ranges, and exact matches for the non-numeric
+ones, so that we can check whether a query contains another and answer the
+contained query by filtering the result of the larger one locally.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from typing import Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from erddapy.core.url import _check_substrings, parse_dates
+
+_operator = re.compile(r"^(.*?)(<=|>=|!=|=~|=|<|>)$")
+
+
+class _Range(NamedTuple):
+    """Closed or open interval of a numeric variable."""
+
+    lower: float = -math.inf
+    lower_closed: bool = True
+    upper: float = math.inf
+    upper_closed: bool = True
+
+
+class _Query(NamedTuple):
+    """Parsed constraints.
+
+    ranges: numeric and time constraints as intervals.
+    exact: the other constraints, as (operator, value) pairs.
+    """
+
+    ranges: dict[str, _Range]
+    exact: dict[str, set[tuple[str, str]]]
+
+
+def _seconds(values: pd.Series) -> np.ndarray:
+    """Convert ISO 8601 times to seconds since 1970-01-01T00:00:00Z."""
+    times = pd.to_datetime(values, utc=True)
+    return (
+        (times - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(seconds=1)
+    ).to_numpy()
+
+
+def _number(variable: str, value: Any) -> float | None:
+    """Return `value` as a number, times as seconds, or None."""
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    if variable == "time":
+        return parse_dates(value)
+    return None
+
+
+def _tighter_lower(bounds: _Range, value: float, *, closed: bool) -> _Range:
+    """Return `bounds` with the tighter of the two lower bounds."""
+    if value > bounds.lower or (value == bounds.lower and not closed):
+        return bounds._replace(lower=value, lower_closed=closed)
+    return bounds
+
+
+def _tighter_upper(bounds: _Range, value: float, *, closed: bool) -> _Range:
+    """Return `bounds` with the tighter of the two upper bounds."""
+    if value < bounds.upper or (value == bounds.upper and not closed):
+        return bounds._replace(upper=value, upper_closed=closed)
+    return bounds
+
+
+def _parse_constraints(constraints: dict[str, Any] | None) -> _Query | None:
+    """Parse the constraints into ranges and exact matches.
+
+    Returns None for relative constraints, like `now-7days` or
+    `min(longitude)`, that can only be resolved by the server.
+    """
+    ranges: dict[str, _Range] = {}
+    exact: dict[str, set[tuple[str, str]]] = {}
+    for key, value in (constraints or {}).items():
+        if _check_substrings(value) or str(value).strip() == "now":
+            return None
+        match = _operator.match(key)
+        if match is None:
+            return None
+        variable, op = match.groups()
+        number = _number(variable, value) if op not in ("!=", "=~") else None
+        if number is None:
+            exact.setdefault(variable, set()).add((op, str(value)))
+            continue
+        bounds = ranges.get(variable, _Range())
+        if op in (">=", ">", "="):
+            bounds = _tighter_lower(bounds, number, closed=op != ">")
+        if op in ("<=", "<", "="):
+            bounds = _tighter_upper(bounds, number, closed=op != "<")
+        ranges[variable] = bounds
+    return _Query(ranges, exact)
+
+
+def _contains(outer: _Query, inner: _Query) -> bool:
+    """Return True if all the rows matching `inner` also match `outer`."""
+    for variable, bounds in outer.ranges.items():
+        other = inner.ranges.get(variable)
+        if other is None:
+            return False
+        if other.lower < bounds.lower or (
+            other.lower == bounds.lower
+            and other.lower_closed
+            and not bounds.lower_closed
+        ):
+            return False
+        if other.upper > bounds.upper or (
+            other.upper == bounds.upper
+            and other.upper_closed
+            and not bounds.upper_closed
+        ):
+            return False
+    # Whether a regex matches a subset of another cannot be decided,
+    # only the same regular expressions are contained.
+    variables = outer.exact.keys() | inner.exact.keys()
+    if any(
+        _regexes(outer, variable) != _regexes(inner, variable)
+        for variable in variables
+    ):
+        return False
+    return all(
+        matches <= inner.exact.get(variable, set())
+        for variable, matches in outer.exact.items()
+    )
+
+
+def _regexes(query: _Query, variable: str) -> set[tuple[str, str]]:
+    """Return the `=~` constraints of `variable`."""
+    return {
+        match for match in query.exact.get(variable, set()) if match[0] == "=~"
+    }
+
+
+def _column(df: pd.DataFrame, variable: str) -> str | None:
+    """Return the column of `variable`, with or without units, or None."""
+    for column in df.columns:
+        if column == variable or column.startswith(f"{variable} ("):
+            return column
+    return None
+
+
+def _filter_frame(df: pd.DataFrame, query: _Query) -> pd.DataFrame | None:
+    """Return the rows of `df` matching `query`.
+
+    Returns None if a constrained variable is not in `df`.
+    """
+    keep = np.ones(len(df), dtype=bool)
+    for variable, bounds in query.ranges.items():
+        column = _column(df, variable)
+        if column is None:
+            return None
+        try:
+            values = (
+                _seconds(df[column])
+                if variable == "time"
+                else df[column].to_numpy(dtype="float64")
+            )
+        except (TypeError, ValueError):
+            return None
+        with np.errstate(invalid="ignore"):
+            keep &= (
+                values >= bounds.lower
+                if bounds.lower_closed
+                else values > bounds.lower
+            )
+            keep &= (
+                values <= bounds.upper
+                if bounds.upper_closed
+                else values < bounds.upper
+            )
+    for variable, matches in query.exact.items():
+        column = _column(df, variable)
+        if column is None:
+            return None
+        values = df[column].astype(str)
+        for op, value in matches:
+            value = value.strip('"')  # noqa: PLW2901
+            if op == "=":
+                keep &= (values == value).to_numpy()
+            elif op == "!=":
+                keep &= (values != value).to_numpy()
+            # The regexes are the same as the ones of the cached result,
+            # ERDDAP already applied them, with Java's regex semantics.
+    return df[keep].reset_index(drop=True)
+
+
+def _select_columns(
+    df: pd.DataFrame,
+    variables: list[str] | tuple[str] | None,
+) -> pd.DataFrame:
+    """Return the columns of `variables`, in that order, when all exist."""
+    if not variables:
+        return df
+    columns = [_column(df, variable) for variable in variables]
+    if None in columns or columns == list(df.columns):
+        return df
+    return df[columns]
@@ -0,0 +1,418 @@
+"""Decoder of the DAP2 `.dods` binary responses.
+
+A `.dods` response is the DDS, the text description of the variables,
+followed by `Data:` and the values encoded with XDR (big-endian).
+The arrays and the sequences without strings are mapped directly to NumPy
+with `frombuffer`, only the strings are decoded one by one.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    import xarray as xr
+
+# XDR has no 8 or 16 bit integers in scalars, they use 4 bytes.
+_dap_dtypes = {
+    "Byte": (">u4", "u1"),
+    "Int16": (">i4", "i2"),
+    "UInt16": (">u4", "u2"),
+    "Int32": (">i4", "i4"),
+    "UInt32": (">u4", "u4"),
+    "Float32": (">f4", "f4"),
+    "Float64": (">f8", "f8"),
+}
+
+_string_types = ("String", "Url")
+
+_constructors = ("Dataset", "Sequence", "Structure", "Grid")
+
+_start_of_instance = 0x5A000000
+_end_of_sequence = 0xA5000000
+
+_dds_token = re.compile(r"[{}\[\];=:]|[^\s{}\[\];=:]+")
+
+_data_separator = re.compile(rb"\r?\nData:\r?\n")
+
+_dds_byte = re.compile(rb"\bByte\b")
+
+_das_signed = re.compile(r'^\w+\s+_Unsigned\s+"?false"?\s*;$', re.IGNORECASE)
+
+
+class _Variable(NamedTuple):
+    """A DDS declaration.
+
+    type: the DAP type, or the constructor, e.g. `Float32` or `Sequence`.
+    dims: the (name, size) of each dimension of arrays.
+    children: the members of constructors, for grids the array and maps.
+    """
+
+    name: str
+    type: str
+    dims: tuple[tuple[str, int], ...] = ()
+    children: tuple[_Variable, ...] = ()
+
+
+class _Tokens:
+    """Cursor over the DDS tokens."""
+
+    def __init__(self: _Tokens, text: str) -> None:
+        self.tokens = _dds_token.findall(text)
+        self.position = 0
+
+    def next(self: _Tokens) -> str:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def peek(self: _Tokens) -> str:
+        return self.tokens[self.position]
+
+    def expect(self: _Tokens, expected: str) -> None:
+        token = self.next()
+        if token.lower() != expected.lower():
+            msg = f"Invalid DDS, expected {expected!r} got {token!r}."
+            raise ValueError(msg)
+
+
+def _parse_declaration(tokens: _Tokens) -> _Variable:
+    """Parse a DDS declaration, recursively for constructors."""
+    kind = tokens.next()
+    if kind.capitalize() in _constructors:
+        kind = kind.capitalize()
+        tokens.expect("{")
+        children = []
+        while tokens.peek() != "}":
+            if tokens.peek().upper() in ("ARRAY", "MAPS"):
+                tokens.next()
+                tokens.expect(":")
+                continue
+            children.append(_parse_declaration(tokens))
+        tokens.expect("}")
+        name = tokens.next()
+        tokens.expect(";")
+        return _Variable(name, kind, children=tuple(children))
+
+    if kind not in _dap_dtypes and kind not in _string_types:
+        msg = f"Unsupported DAP type {kind!r}."
+        raise ValueError(msg)
+    name = tokens.next()
+    dims = []
+    while tokens.peek() == "[":
+        tokens.next()
+        dim = tokens.next()
+        if tokens.peek() == "=":
+            tokens.next()
+            size = tokens.next()
+        else:
+            dim, size = name, dim
+        tokens.expect("]")
+        dims.append((dim, int(size)))
+    tokens.expect(";")
+    return _Variable(name, kind, tuple(dims))
+
+
+def _parse_dds(text: str) -> _Variable:
+    """Parse a DDS into its dataset declaration."""
+    return _parse_declaration(_Tokens(text))
+
+
+class _Decoder:
+    """Decode the XDR values of DDS declarations from a buffer."""
+
+    def __init__(
+        self: _Decoder,
+        data: bytes,
+        offset: int,
+        signed: frozenset[str] = frozenset(),
+    ) -> None:
+        self.data = data
+        self.offset = offset
+        self.signed = signed
+
+    def dtype(self: _Decoder, var: _Variable) -> str:
+        """Return the NumPy dtype of the values of a numeric variable.
+
+        DAP2 bytes are unsigned, ERDDAP sends its signed bytes as `Byte`
+        with the `_Unsigned="false"` attribute, those are in `signed`.
+        """
+        if var.type == "Byte" and var.name in self.signed:
+            return "i1"
+        return _dap_dtypes[var.type][1]
+
+    def uint32(self: _Decoder) -> int:
+        value = int.from_bytes(self.data[self.offset : self.offset + 4], "big")
+        self.offset += 4
+        return value
+
+    def string(self: _Decoder) -> str:
+        size = self.uint32()
+        value = self.data[self.offset : self.offset + size]
+        self.offset += size + (-size % 4)
+        return value.decode("utf-8", errors="replace")
+
+    def array(self: _Decoder, var: _Variable) -> np.ndarray:
+        """Decode an array, XDR arrays are preceded by their length."""
+        count = self.uint32()
+        shape = tuple(size for _, size in var.dims)
+        if var.type in _string_types:
+            values = np.array(
+                [self.string() for _ in range(count)], dtype=object
+            )
+            return values.reshape(shape)
+        # The length is repeated for all the numeric types.
+        self.uint32()
+        if var.type == "Byte":
+            values = np.frombuffer(
+                self.data,
+                dtype=self.dtype(var),
+                count=count,
+                offset=self.offset,
+            )
+            self.offset += count + (-count % 4)
+            return values.copy().reshape(shape)
+        wire, _ = _dap_dtypes[var.type]
+        values = np.frombuffer(
+            self.data,
+            dtype=wire,
+            count=count,
+            offset=self.offset,
+        )
+        self.offset += count * values.itemsize
+        return values.astype(self.dtype(var)).reshape(shape)
+
+    def scalar(self: _Decoder, var: _Variable) -> object:
+        if var.type in _string_types:
+            return self.string()
+        wire, _ = _dap_dtypes[var.type]
+        value = np.frombuffer(
+            self.data,
+            dtype=wire,
+            count=1,
+            offset=self.offset,
+        )
+        self.offset += value.itemsize
+        return value.astype(self.dtype(var))[0]
+
+    def sequence(self: _Decoder, var: _Variable) -> dict[str, np.ndarray]:
+        """Decode a flat sequence as columns."""
+        if any(
+            child.type in _constructors or child.dims for child in var.children
+        ):
+            msg = f"Nested sequences are not supported, got {var.name}."
+            raise ValueError(msg)
+        if not any(child.type in _string_types for child in var.children):
+            return self._fixed_sequence(var)
+
+        rows = []
+        while self.uint32() == _start_of_instance:
+            rows.append([self.scalar(child) for child in var.children])
+        columns = list(zip(*rows, strict=True)) or [()] * len(var.children)
+        return {
+            child.name: np.array(
+                column,
+                dtype=object
+                if child.type in _string_types
+                else self.dtype(child),
+            )
+            for child, column in zip(var.children, columns, strict=True)
+        }
+
+    def _fixed_sequence(
+        self: _Decoder, var: _Variable
+    ) -> dict[str, np.ndarray]:
+        """Map a sequence with fixed size rows with a structured dtype."""
+        row = np.dtype(
+            [("_marker", ">u4")]
+            + [
+                (child.name, _dap_dtypes[child.type][0])
+                for child in var.children
+            ],
+        )
+        # The row markers are at every row size from the first one.
+        words = np.frombuffer(
+            self.data,
+            dtype=">u4",
+            count=(len(self.data) - self.offset) // 4,
+            offset=self.offset,
+        )
+        markers = words[:: row.itemsize // 4]
+        ends = np.flatnonzero(markers != _start_of_instance)
+        count = int(ends[0]) if ends.size else markers.size
+        rows = np.frombuffer(
+            self.data,
+            dtype=row,
+            count=count,
+            offset=self.offset,
+        )
+        self.offset += count * row.itemsize
+        if self.uint32() != _end_of_sequence:
+            msg = f"Invalid sequence {var.name}, the end marker is missing."
+            raise ValueError(msg)
+        return {
+            child.name: rows[child.name].astype(self.dtype(child))
+            for child in var.children
+        }
+
+    def decode(self: _Decoder, var: _Variable) -> object:
+        """Decode a declaration.
+
+        Returns arrays, or dictionaries of arrays for constructors.
+        """
+        if var.type == "Sequence":
+            return self.sequence(var)
+        if var.type in _constructors:
+            return {child.name: self.decode(child) for child in var.children}
+        if var.dims:
+            return self.array(var)
+        return self.scalar(var)
+
+
+def _decode_dods(
+    data: bytes,
+    signed: frozenset[str] = frozenset(),
+) -> tuple[_Variable, dict]:
+    """Decode a `.dods` response into its DDS and values.
+
+    The `Byte` variables in `signed` are decoded as signed bytes.
+    """
+    match = _data_separator.search(data)
+    if match is None:
+        msg = f"Not a valid .dods response: {data[:200]!r}"
+        raise ValueError(msg)
+    dataset = _parse_dds(data[: match.start()].decode("utf-8"))
+    decoder = _Decoder(data, match.end(), signed)
+    return dataset, decoder.decode(dataset)
+
+
+def _dods_has_bytes(data: bytes) -> bool:
+    """Return True if the DDS of a `.dods` response declares bytes."""
+    match = _data_separator.search(data)
+    header = data[: match.start()] if match is not None else b""
+    return _dds_byte.search(header) is not None
+
+
+def _parse_das_signed(text: str) -> frozenset[str]:
+    """Return the variables of a DAS with the `_Unsigned="false"` attribute.
+
+    Those are ERDDAP's signed bytes, sent as DAP2 unsigned `Byte`.
+    """
+    signed = set()
+    blocks: list[str] = []
+    for line in text.splitlines():
+        line = line.strip()  # noqa: PLW2901
+        if line.endswith("{"):
+            blocks.append(line[:-1].strip())
+        elif line == "}":
+            if blocks:
+                blocks.pop()
+        elif blocks and _das_signed.match(line):
+            signed.add(blocks[-1])
+    return frozenset(signed)
+
+
+def _dds_schema(dataset: _Variable) -> dict[str, dict]:
+    """Return the dtype, dimensions, and shape of each variable of a DDS.
+
+    The members of sequences, tabledap variables, have a `row` dimension
+    of unknown length.
+    """
+    schema = {}
+
+    def add(var: _Variable, dims: list, shape: list) -> None:
+        dtype = (
+            "str"
+            if var.type in _string_types
+            else str(np.dtype(_dap_dtypes[var.type][1]))
+        )
+        schema[var.name] = {"dtype": dtype, "dims": dims, "shape": shape}
+
+    for var in dataset.children:
+        if var.type == "Sequence":
+            for child in var.children:
+                add(child, ["row"], [None])
+        elif var.type in ("Grid", "Structure"):
+            for child in var.children:
+                if child.name not in schema:
+                    add(
+                        child,
+                        [dim for dim, _ in child.dims],
+                        [size for _, size in child.dims],
+                    )
+        else:
+            add(
+                var,
+                [dim for dim, _ in var.dims],
+                [size for _, size in var.dims],
+            )
+    return schema
+
+
+def _dods_to_pandas(
+    data: bytes,
+    signed: frozenset[str] = frozenset(),
+) -> pd.DataFrame:
+    """Convert a tabledap, or griddap, `.dods` response to a DataFrame.
+
+    Times are converted from seconds since 1970 to datetimes.
+    """
+    dataset, values = _decode_dods(data, signed)
+    sequences = [var for var in dataset.children if var.type == "Sequence"]
+    if not sequences:
+        ds = _dods_dataset(dataset, values)
+        return ds.to_dataframe().reset_index()
+    df = pd.DataFrame(values[sequences[0].name])
+    if "time" in df.columns:
+        df["time"] = pd.to_datetime(df["time"], unit="s", utc=True)
+    return df
+
+
+def _dods_to_xarray(
+    data: bytes,
+    signed: frozenset[str] = frozenset(),
+    xarray_kwargs: dict | None = None,
+) -> xr.Dataset:
+    """Convert a griddap, or tabledap, `.dods` response to a xarray Dataset.
+
+    The DDS has no attributes, only the time units are set to decode times.
+    `xarray_kwargs` are the `xr.decode_cf` arguments, and `chunks`.
+    """
+    dataset, values = _decode_dods(data, signed)
+    return _dods_dataset(dataset, values, **(xarray_kwargs or {}))
+
+
+def _dods_dataset(
+    dataset: _Variable,
+    values: dict,
+    chunks: dict | str | None = None,
+    **decode_kwargs: Any,
+) -> xr.Dataset:
+    """Build a xarray Dataset from the decoded values of a `.dods` response."""
+    import xarray as xr  # noqa: PLC0415
+
+    data_vars, coords = {}, {}
+    for var in dataset.children:
+        if var.type == "Sequence":
+            for child in var.children:
+                data_vars[child.name] = ("row", values[var.name][child.name])
+        elif var.type == "Grid":
+            array, *maps = var.children
+            data_vars[var.name] = (
+                [dim for dim, _ in array.dims],
+                values[var.name][array.name],
+            )
+            for axis in maps:
+                coords[axis.name] = (axis.name, values[var.name][axis.name])
+        elif var.dims:
+            target = coords if var.dims[0][0] == var.name else data_vars
+            target[var.name] = ([dim for dim, _ in var.dims], values[var.name])
+    ds = xr.Dataset(data_vars=data_vars, coords=coords)
+    if "time" in ds.variables:
+        ds["time"].attrs["units"] = "seconds since 1970-01-01T00:00:00Z"
+    ds = xr.decode_cf(ds, **decode_kwargs)
+    return ds if chunks is None else ds.chunk(chunks)
@@ -0,0 +1,134 @@
+"""Automatic choice of the response format.
+
+With `response="auto"` the most efficient format the server and the
+installed decoders support is requested, the binary formats are smaller and
+faster to decode than the text ones, see `erddapy.benchmarks.formats`.
+The server version is requested once per server and kept in the metadata
+cache.
+"""
+
+from __future__ import annotations
+
+import functools
+import importlib.util
+import re
+from typing import TYPE_CHECKING
+
+import requests
+
+from erddapy.core.cache import get_metadata_cache
+from erddapy.core.url import urlopen
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Results estimated smaller than this are requested as csvp,
+# the binary formats gain little and their decoders are slower to import.
+AUTO_TEXT_BYTES = 1_000_000
+
+# The first ERDDAP version that supports each format, if not all of them.
+_format_versions = {
+    "parquet": (2, 22),
+}
+
+# The optional modules needed to decode each format to pandas.
+_format_modules = {
+    "parquet": ("pyarrow",),
+    "nc": ("netCDF4", "xarray"),
+}
+
+_version_pattern = re.compile(r"ERDDAP_version=(\d+)\.(\d+)")
+
+_units_suffix = re.compile(r" \([^()]*\)$")
+
+
+def _parse_version(text: str) -> tuple[int, ...] | None:
+    """Parse the `/version` response, e.g. `ERDDAP_version=2.23`."""
+    match = _version_pattern.search(text)
+    if match is None:
+        return None
+    return tuple(int(part) for part in match.groups())
+
+
+def server_version(
+    server: str,
+    requests_kwargs: dict | None = None,
+) -> tuple[int, ...] | None:
+    """Return the ERDDAP version of `server`, or None if it is unknown.
+
+    The version is cached, servers that do not answer are not asked again
+    while the cache entry lasts.
+    """
+    cache = get_metadata_cache()
+    version = cache.get(server, None, "version")
+    if version is None:
+        try:
+            data = urlopen(
+                f"{server.rstrip('/')}/version",
+                requests_kwargs=requests_kwargs,
+            )
+            version = list(_parse_version(data.read().decode()) or [])
+        except requests.exceptions.RequestException:
+            version = []
+        cache.set(server, None, "version", version)
+    return tuple(version) or None
+
+
+@functools.cache
+def _has_modules(*modules: str) -> bool:
+    return all(importlib.util.find_spec(module) for module in modules)
+
+
+def _supported(response: str, version: tuple[int, ...] | None) -> bool:
+    """Return True if the server and the installed decoders support it."""
+    minimum = _format_versions.get(response)
+    if minimum is not None and (version is None or version < minimum):
+        return False
+    return _has_modules(*_format_modules.get(response, ()))
+
+
+def _auto_responses(
+    server: str,
+    protocol: str,
+    nbytes: int | None = None,
+    requests_kwargs: dict | None = None,
+) -> list[str]:
+    """Return the formats to try for a DataFrame, the preferred one first.
+
+    The order is parquet, tabledap only, nc, and csvp, which always works
+    and is the last resort. Small results, `nbytes` below `AUTO_TEXT_BYTES`,
+    go straight to csvp. The server version is only requested when a binary
+    format is an option.
+    """
+    if nbytes is not None and nbytes < AUTO_TEXT_BYTES:
+        return ["csvp"]
+    candidates = ["parquet", "nc"] if protocol == "tabledap" else ["nc"]
+    candidates = [
+        response
+        for response in candidates
+        if _has_modules(*_format_modules[response])
+    ]
+    if "parquet" in candidates:
+        version = server_version(server, requests_kwargs)
+        candidates = [
+            response
+            for response in candidates
+            if _supported(response, version)
+        ]
+    return [*candidates, "csvp"]
+
+
+def _auto_xarray_response(protocol: str) -> str:
+    """Return the format for a xarray Dataset, netCDF if it can be read."""
+    if not _has_modules("netCDF4"):
+        return "dods"
+    return "nc" if protocol == "griddap" else "ncCF"
+
+
+def _strip_units(df: pd.DataFrame) -> pd.DataFrame:
+    """Rename the csvp `name (units)` columns to the variable names."""
+    return df.rename(
+        columns={
+            column: _units_suffix.sub("", column) for column in df.columns
+        },
+    )
@@ -1,52 +1,112 @@
 """Griddap handling."""
 
 import xml.etree.ElementTree as ET
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, BinaryIO
+
+import numpy as np
+import pandas as pd
 
 if TYPE_CHECKING:
     from collections.abc import Hashable
 
-from erddapy.core.url import urlopen
+from erddapy.core.cache import get_metadata_cache
+from erddapy.core.url import parse_dates, urlopen
 
 
-def _griddap_get_constraints(
-    dataset_url: str,
-    step: int,
-) -> tuple[dict, list, list]:
-    """Fetch metadata of griddap dataset and set initial constraints.
+def _griddap_parse_ncml(data: BinaryIO) -> dict:
+    """Extract dimensions, variables, and axes metadata from a NcML response.
 
-    Step size is applied to all dimensions.
+    The NcML is parsed incrementally and every element is discarded after
+    being read, only the information needed to build the constraints,
+    and the attributes of the axes, is kept.
     """
-    xmlns = "https://www.unidata.ucar.edu/namespaces/netcdf/ncml-2.2"
+    dimensions: dict[str, int] = {}
+    variables: dict[str, dict] = {}
+    actual_range: dict[str, list[str]] = {}
+    attributes: dict[str, dict] = {}
 
-    ncml_url = f"{dataset_url}.ncml"
-    res = urlopen(ncml_url)
-    xml = res.read().decode("utf-8")
-    root = ET.fromstring(xml)  # noqa: S314
+    variable = None
+    for event, element in ET.iterparse(data, events=("start", "end")):  # noqa: S314
+        tag = element.tag.rsplit("}", maxsplit=1)[-1]
+        if event == "start":
+            if tag == "variable":
+                variable = element.attrib["name"]
+                variables[variable] = {
+                    "type": element.attrib.get("type"),
+                    "shape": element.attrib.get("shape", "").split(),
+                }
+            continue
 
-    variables = root.findall(f"{{{xmlns}}}variable")
-    dimensions = root.findall(f"{{{xmlns}}}dimension")
+        if tag == "dimension":
+            dimensions[element.attrib["name"]] = int(
+                element.attrib.get("length", 0),
+            )
+        elif tag == "attribute" and variable is not None:
+            name = element.attrib.get("name")
+            if name == "actual_range":
+                actual_range[variable] = element.attrib["value"].split()
+            # The dimensions come before the variables in ERDDAP's NcML.
+            if variable in dimensions:
+                attributes.setdefault(variable, {})[name] = _ncml_value(
+                    element.attrib,
+                )
+        elif tag == "variable":
+            variable = None
+        element.clear()
 
-    dimension_names = [dimension.attrib["name"] for dimension in dimensions]
-    variable_names = [variable.attrib["name"] for variable in variables]
-    variable_names = list(set(variable_names).difference(dimension_names))
+    return {
+        "dimensions": dimensions,
+        "variables": variables,
+        "actual_range": actual_range,
+        "attributes": attributes,
+    }
+
+
+def _ncml_value(attrib: dict[str, str]) -> str | float | list[float]:
+    """Return the value of a NcML attribute, numbers for numeric types."""
+    value = attrib.get("value", "")
+    if attrib.get("type", "String") == "String":
+        return value
+    try:
+        numbers = [float(number) for number in value.split()]
+    except ValueError:
+        return value
+    return numbers[0] if len(numbers) == 1 else numbers
+
+
+def _griddap_get_metadata(server: str, dataset_id: str) -> dict:
+    """Return the parsed NcML metadata from the shared metadata cache."""
+    cache = get_metadata_cache()
+    metadata = cache.get(server, dataset_id, "ncml")
+    if metadata is None:
+        res = urlopen(f"{server.rstrip('/')}/griddap/{dataset_id}.ncml")
+        metadata = _griddap_parse_ncml(res)
+        cache.set(server, dataset_id, "ncml", metadata)
+    return metadata
 
-    constraints_dict: dict[Hashable, str] = {}
 
-    ns = {"nc": "https://www.unidata.ucar.edu/namespaces/netcdf/ncml-2.2"}
+def _griddap_constraints_from_metadata(
+    metadata: dict,
+    step: int,
+) -> tuple[dict, list, list]:
+    """Set initial constraints from the parsed NcML metadata.
 
+    Step size is applied to all dimensions.
+    """
+    dimension_names = list(metadata["dimensions"])
+    variable_names = [
+        name for name in metadata["variables"] if name not in dimension_names
+    ]
+
+    constraints_dict: dict[Hashable, str] = {}
     for dimension_name in dimension_names:
-        element = root.find(
-            path=f'nc:variable[@name="{dimension_name}"]/nc:attribute[@name="actual_range"]',
-            namespaces=ns,
-        )
-        if element is None:
+        actual_range = metadata["actual_range"].get(dimension_name)
+        if actual_range is None:
             msg = (
                 f"Could not find actual_range for dimension {dimension_name}."
             )
             raise ValueError(msg)
-        actual_range = element.attrib["value"]
-        range_min, range_max = actual_range.split()
+        range_min, range_max = actual_range
         if dimension_name == "time":
             range_min = range_max
 
@@ -57,6 +117,132 @@ def _griddap_get_constraints(
     return constraints_dict, dimension_names, variable_names
 
 
+def _griddap_get_constraints(
+    dataset_url: str,
+    step: int,
+) -> tuple[dict, list, list]:
+    """Fetch metadata of griddap dataset and set initial constraints.
+
+    Step size is applied to all dimensions.
+    """
+    res = urlopen(f"{dataset_url}.ncml")
+    metadata = _griddap_parse_ncml(res)
+    return _griddap_constraints_from_metadata(metadata, step)
+
+
+def _griddap_cached_axis(
+    server: str,
+    dataset_id: str,
+    dim_name: str,
+) -> np.ndarray | None:
+    """Return the values of a griddap dimension if cached, None otherwise."""
+    return get_metadata_cache().get(server, dataset_id, f"axis:{dim_name}")
+
+
+def _griddap_get_axis(
+    server: str, dataset_id: str, dim_name: str
+) -> np.ndarray:
+    """Return the coordinate values of a griddap dimension.
+
+    Times are converted to seconds since 1970-01-01T00:00:00Z,
+    the same units used in the NcML `actual_range`.
+    The array is kept in the shared metadata cache, in memory and as
+    `.npy` bytes on disk, it is read-only.
+    """
+    cache = get_metadata_cache()
+    kind = f"axis:{dim_name}"
+    axis = cache.get(server, dataset_id, kind)
+    if axis is None:
+        url = f"{server.rstrip('/')}/griddap/{dataset_id}.csv0?{dim_name}"
+        column = pd.read_csv(urlopen(url), header=None).iloc[:, 0]
+        if not pd.api.types.is_numeric_dtype(column):
+            times = pd.to_datetime(column, utc=True)
+            column = (times - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(
+                seconds=1,
+            )
+        axis = column.to_numpy(dtype="float64")
+        axis.flags.writeable = False
+        cache.set(server, dataset_id, kind, axis)
+    return axis
+
+
+def _griddap_axis_value(value: str | float, axis: np.ndarray) -> float:
+    """Convert a griddap constraint value to the axis units."""
+    text = str(value).strip().strip("()")
+    if text == "last":
+        return float(axis[-1])
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return parse_dates(text)
+    except (ValueError, TypeError) as err:
+        msg = f"Cannot resolve the griddap constraint value {value!r} locally."
+        raise ValueError(msg) from err
+
+
+def _griddap_nearest_index(axis: np.ndarray, value: float) -> int:
+    """Return the index of the closest axis value, like ERDDAP does."""
+    if axis.size == 0:
+        msg = "Cannot resolve an index on an empty axis."
+        raise ValueError(msg)
+    ascending = axis.size < 2 or axis[-1] >= axis[0]  # noqa: PLR2004
+    ordered = axis if ascending else axis[::-1]
+    idx = int(np.searchsorted(ordered, value))
+    candidates = [i for i in (idx - 1, idx) if 0 <= i < ordered.size]
+    idx = min(candidates, key=lambda i: abs(ordered[i] - value))
+    return idx if ascending else axis.size - 1 - idx
+
+
+def _griddap_resolve_indices(
+    constraints: dict,
+    dim_names: list[str] | tuple[str],
+    axes: dict[str, np.ndarray],
+) -> dict[str, tuple[int, int, int]]:
+    """Resolve value constraints to (start, step, stop) index ranges."""
+    indices = {}
+    for dim in dim_names:
+        axis = axes[dim]
+        start = _griddap_nearest_index(
+            axis,
+            _griddap_axis_value(constraints[f"{dim}>="], axis),
+        )
+        stop = _griddap_nearest_index(
+            axis,
+            _griddap_axis_value(constraints[f"{dim}<="], axis),
+        )
+        start, stop = sorted((start, stop))
+        indices[dim] = (start, int(constraints[f"{dim}_step"]), stop)
+    return indices
+
+
+def _griddap_shape(
+    indices: dict[str, tuple[int, int, int]],
+) -> dict[str, int]:
+    """Return the number of points in each dimension of an index request."""
+    return {
+        dim: (stop - start) // step + 1
+        for dim, (start, step, stop) in indices.items()
+    }
+
+
+def _griddap_index_url(
+    server: str,
+    *,
+    dataset_id: str,
+    variables: list[str] | tuple[str],
+    indices: dict[str, tuple[int, int, int]],
+    response: str,
+) -> str:
+    """Build an index based griddap download URL."""
+    hyperslab = "".join(
+        f"[{start}:{step}:{stop}]" for start, step, stop in indices.values()
+    )
+    query = ",".join(f"{var}{hyperslab}" for var in variables)
+    return f"{server.rstrip('/')}/griddap/{dataset_id}.{response}?{query}"
+
+
 def _griddap_check_constraints(
     user_constraints: dict,
     original_constraints: dict,
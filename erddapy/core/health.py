@@ -0,0 +1,291 @@
+"""Health of the servers.
+
+Every request updates rolling statistics of its host: the latency, the
+time to the first byte, of the latest successful requests and the failures,
+timeouts, connection errors, and 5xx responses.
+
+The statistics drive adaptive timeouts and a circuit breaker: after
+`FAILURES_TO_OPEN` consecutive failures a host is skipped for a cooldown,
+doubled each time the trial request after the cooldown fails.
+Both are used by the multiple server searches, where a few dead servers
+would otherwise take most of the time.
+
+The statistics are kept in memory and persisted in `health.json` when the
+`ERDDAPY_CACHE_DIR` environment variable is set, like the metadata cache.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+# Latest successful latencies kept per host.
+WINDOW = 50
+
+# Successful requests needed before the timeout adapts.
+MIN_SAMPLES = 5
+
+# The timeout is this factor times the 95th percentile of the latency,
+# never shorter than MIN_TIMEOUT nor longer than the default timeout.
+TIMEOUT_FACTOR = 4.0
+MIN_TIMEOUT = 5.0
+
+FAILURES_TO_OPEN = 3
+COOLDOWN = 300.0
+MAX_COOLDOWN = 3600.0
+
+# Seconds between saves to disk, the last changes are saved at exit.
+SAVE_INTERVAL = 10.0
+
+
+class HostHealth:
+    """Rolling statistics of a host."""
+
+    def __init__(self: HostHealth, window: int = WINDOW) -> None:
+        """Start without requests."""
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.cooldown = COOLDOWN
+
+    def percentile(self: HostHealth, q: float) -> float | None:
+        """Return the `q` percentile of the latencies, None without any."""
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[
+            min(len(latencies) - 1, math.ceil(q * len(latencies)) - 1)
+        ]
+
+    def to_dict(self: HostHealth) -> dict[str, Any]:
+        """Return the statistics as JSON serializable values."""
+        return {
+            "latencies": list(self.latencies),
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "open_until": self.open_until,
+            "cooldown": self.cooldown,
+        }
+
+    @classmethod
+    def from_dict(
+        cls: type[HostHealth],
+        values: dict[str, Any],
+        window: int = WINDOW,
+    ) -> HostHealth:
+        """Restore the statistics saved with `to_dict`."""
+        health = cls(window)
+        health.latencies.extend(values.get("latencies", []))
+        for name in (
+            "requests",
+            "failures",
+            "consecutive_failures",
+            "open_until",
+            "cooldown",
+        ):
+            if name in values:
+                setattr(health, name, values[name])
+        return health
+
+
+class HealthRegistry:
+    """Statistics, adaptive timeouts, and circuit breakers of the hosts.
+
+    Args:
+    ----
+        path: JSON file where the statistics are persisted.
+            If None they are only kept in memory.
+        window: the latest successful latencies kept per host.
+
+    Examples:
+    --------
+        >>> from erddapy.core.health import HealthRegistry, set_health_registry
+        >>> set_health_registry(HealthRegistry(path="health.json"))
+
+    """
+
+    def __init__(
+        self: HealthRegistry,
+        path: str | Path | None = None,
+        window: int = WINDOW,
+    ) -> None:
+        """Load the persisted statistics, if any."""
+        self.path = Path(path) if path is not None else None
+        self.window = window
+        self.hosts: dict[str, HostHealth] = {}
+        self._lock = threading.Lock()
+        self._saved = time.monotonic()
+        self._dirty = False
+        if self.path is not None:
+            self._load()
+            atexit.register(self.save)
+
+    def _load(self: HealthRegistry) -> None:
+        try:
+            hosts = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        self.hosts = {
+            host: HostHealth.from_dict(values, self.window)
+            for host, values in hosts.items()
+        }
+
+    def _host(self: HealthRegistry, host: str) -> HostHealth:
+        health = self.hosts.get(host)
+        if health is None:
+            health = self.hosts[host] = HostHealth(self.window)
+        return health
+
+    def record(
+        self: HealthRegistry,
+        host: str,
+        latency: float,
+        *,
+        ok: bool,
+    ) -> None:
+        """Add a request to the statistics of `host`.
+
+        A failure that reaches `FAILURES_TO_OPEN` consecutive failures
+        opens the circuit, a success closes it.
+        """
+        with self._lock:
+            health = self._host(host)
+            health.requests += 1
+            if ok:
+                health.latencies.append(latency)
+                health.consecutive_failures = 0
+                health.open_until = 0.0
+                health.cooldown = COOLDOWN
+            else:
+                health.failures += 1
+                health.consecutive_failures += 1
+                if health.consecutive_failures >= FAILURES_TO_OPEN:
+                    now = time.time()
+                    # A failed trial, after a cooldown, doubles the next one.
+                    if health.open_until and now >= health.open_until:
+                        health.cooldown = min(
+                            2 * health.cooldown,
+                            MAX_COOLDOWN,
+                        )
+                    health.open_until = max(
+                        health.open_until,
+                        now + health.cooldown,
+                    )
+            self._dirty = True
+            save = time.monotonic() - self._saved > SAVE_INTERVAL
+        if save:
+            self.save()
+
+    def available(self: HealthRegistry, host: str) -> bool:
+        """Return False while the circuit of `host` is open.
+
+        After the cooldown the requests are let through again, the first
+        failure reopens the circuit for twice the cooldown.
+        """
+        with self._lock:
+            health = self.hosts.get(host)
+            return health is None or time.time() >= health.open_until
+
+    def latency(self: HealthRegistry, host: str, q: float) -> float | None:
+        """Return the `q` percentile of the latency of `host`.
+
+        None for hosts without `MIN_SAMPLES` successful requests.
+        """
+        with self._lock:
+            health = self.hosts.get(host)
+            if health is None or len(health.latencies) < MIN_SAMPLES:
+                return None
+            return health.percentile(q)
+
+    def timeout(self: HealthRegistry, host: str, default: float) -> float:
+        """Return a timeout adapted to the latency of `host`.
+
+        It is `TIMEOUT_FACTOR` times the 95th percentile of the latency,
+        between `MIN_TIMEOUT` and `default`, which is used for hosts
+        without enough requests.
+        """
+        p95 = self.latency(host, 0.95)
+        if p95 is None:
+            return default
+        return min(default, max(MIN_TIMEOUT, TIMEOUT_FACTOR * p95))
+
+    def stats(self: HealthRegistry) -> pd.DataFrame:
+        """Return the statistics of each host."""
+        now = time.time()
+        with self._lock:
+            rows = {
+                host: {
+                    "requests": health.requests,
+                    "failures": health.failures,
+                    "consecutive_failures": health.consecutive_failures,
+                    "p50": health.percentile(0.5),
+                    "p95": health.percentile(0.95),
+                    "open": now < health.open_until,
+                }
+                for host, health in self.hosts.items()
+            }
+        df = pd.DataFrame.from_dict(rows, orient="index")
+        df.index.name = "host"
+        return df
+
+    def save(self: HealthRegistry) -> None:
+        """Write the statistics to `path`, if any."""
+        with self._lock:
+            self._saved = time.monotonic()
+            if self.path is None or not self._dirty:
+                return
+            hosts = {host: h.to_dict() for host, h in self.hosts.items()}
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(
+            f".{os.getpid()}.{threading.get_ident()}.tmp",
+        )
+        tmp.write_text(json.dumps(hosts))
+        tmp.replace(self.path)
+
+    def clear(self: HealthRegistry) -> None:
+        """Forget the statistics of all the hosts."""
+        with self._lock:
+            self.hosts.clear()
+            self._dirty = True
+        self.save()
+
+
+_health_registry: HealthRegistry | None = None
+_health_registry_lock = threading.Lock()
+
+
+def get_health_registry() -> HealthRegistry:
+    """Return the health registry shared by all the requests."""
+    global _health_registry  # noqa: PLW0603
+    if _health_registry is not None:
+        return _health_registry
+    with _health_registry_lock:
+        if _health_registry is None:
+            if os.environ.get("ERDDAPY_CACHE_DIR"):
+                from erddapy.core.cache import _cache_dir  # noqa: PLC0415
+
+                _health_registry = HealthRegistry(
+                    path=_cache_dir().joinpath("health.json"),
+                )
+            else:
+                _health_registry = HealthRegistry()
+        return _health_registry
+
+
+def set_health_registry(registry: HealthRegistry) -> None:
+    """Replace the health registry shared by all the requests."""
+    global _health_registry  # noqa: PLW0603
+    _health_registry = registry
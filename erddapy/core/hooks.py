@@ -0,0 +1,199 @@
+"""Instrumentation hooks of the requests and of the decoding.
+
+Register a callable to receive a `RequestEvent` for each request, including
+the ones answered by the `urlopen` cache, and a `DecodeEvent` each time a
+response is converted to a pandas, netCDF4, xarray, or iris object.
+The hooks run in the thread that made the request, they should be fast
+and must not raise.
+
+Examples
+--------
+    >>> from erddapy.core.hooks import hooks
+    >>> events = []
+    >>> with hooks(request=events.append, decode=events.append):
+    ...     df = e.to_pandas()  # doctest: +SKIP
+    >>> [(type(ev).__name__, ev.elapsed) for ev in events]  # doctest: +SKIP
+
+"""
+
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from typing import TYPE_CHECKING, NamedTuple
+from urllib.parse import urlparse
+
+from erddapy.core.profiling import _phase
+from erddapy.core.tracing import _span
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+
+class RequestEvent(NamedTuple):
+    """A request to a server.
+
+    url: the requested URL.
+    host: the server host, e.g. `erddap.ioos.us`.
+    status: the HTTP status, None for cache hits and connection errors.
+    nbytes: the bytes of the response body.
+    ttfb: seconds until the response headers arrived.
+    elapsed: seconds until the body was read, or the error was raised.
+    cache_hit: True if the response came from the `urlopen` cache.
+    retries: the number of retried attempts.
+    error: the error message, None if the request succeeded.
+    """
+
+    url: str
+    host: str
+    status: int | None
+    nbytes: int
+    ttfb: float
+    elapsed: float
+    cache_hit: bool = False
+    retries: int = 0
+    error: str | None = None
+
+
+class DecodeEvent(NamedTuple):
+    """The conversion of a response.
+
+    url: the URL of the response.
+    decoder: the target, "pandas", "netcdf4", "xarray", or "iris".
+    nbytes: the bytes of the response, None if unknown.
+    elapsed: seconds spent decoding.
+    error: the error message, None if decoding succeeded.
+    """
+
+    url: str
+    decoder: str
+    nbytes: int | None
+    elapsed: float
+    error: str | None = None
+
+
+_hooks: dict[str, list[Callable]] = {"request": [], "decode": []}
+_lock = threading.Lock()
+
+
+def _check_kind(kind: str) -> None:
+    if kind not in _hooks:
+        msg = f"Hook kind must be one of {list(_hooks)}, got {kind!r}."
+        raise ValueError(msg)
+
+
+def add_hook(kind: str, func: Callable) -> Callable:
+    """Call `func` with the events of `kind`, "request" or "decode".
+
+    Returns `func`.
+    """
+    _check_kind(kind)
+    with _lock:
+        _hooks[kind] = [*_hooks[kind], func]
+    return func
+
+
+def remove_hook(kind: str, func: Callable) -> None:
+    """Stop calling `func` with the events of `kind`."""
+    _check_kind(kind)
+    with _lock:
+        _hooks[kind] = [hook for hook in _hooks[kind] if hook is not func]
+
+
+@contextlib.contextmanager
+def hooks(
+    request: Callable[[RequestEvent], object] | None = None,
+    decode: Callable[[DecodeEvent], object] | None = None,
+) -> Iterator[None]:
+    """Register the `request` and `decode` hooks inside a `with` block."""
+    registered = {
+        kind: func
+        for kind, func in (("request", request), ("decode", decode))
+        if func is not None
+    }
+    for kind, func in registered.items():
+        add_hook(kind, func)
+    try:
+        yield
+    finally:
+        for kind, func in registered.items():
+            remove_hook(kind, func)
+
+
+def _active(kind: str) -> bool:
+    return bool(_hooks[kind])
+
+
+def _emit(kind: str, event: RequestEvent | DecodeEvent) -> None:
+    # The list is replaced, never mutated, iterating it is thread safe.
+    for hook in _hooks[kind]:
+        hook(event)
+
+
+def _emit_request(  # noqa: PLR0913
+    url: str,
+    *,
+    status: int | None,
+    nbytes: int,
+    ttfb: float,
+    start: float,
+    cache_hit: bool = False,
+    retries: int = 0,
+    error: str | None = None,
+) -> None:
+    """Emit a `RequestEvent` for a request started at `start`."""
+    if not _active("request"):
+        return
+    _emit(
+        "request",
+        RequestEvent(
+            url=url,
+            host=urlparse(url).netloc,
+            status=status,
+            nbytes=nbytes,
+            ttfb=ttfb,
+            elapsed=time.perf_counter() - start,
+            cache_hit=cache_hit,
+            retries=retries,
+            error=error,
+        ),
+    )
+
+
+@contextlib.contextmanager
+def _timed_decode(
+    url: str,
+    decoder: str,
+    nbytes: int | None = None,
+) -> Iterator[None]:
+    """Emit a `DecodeEvent` with the time spent in the `with` block.
+
+    The block is also traced as the `erddapy.decode` span,
+    and profiled as the `parse` phase.
+    """
+    with (
+        _span("decode", url=url, decoder=decoder, payload_bytes=nbytes),
+        _phase("parse"),
+    ):
+        if not _active("decode"):
+            yield
+            return
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as err:
+            error = str(err)
+            raise
+        finally:
+            _emit(
+                "decode",
+                DecodeEvent(
+                    url=url,
+                    decoder=decoder,
+                    nbytes=nbytes,
+                    elapsed=time.perf_counter() - start,
+                    error=error,
+                ),
+            )
@@ -6,19 +6,39 @@ to Pandas, XArray, Iris, etc. objects.
 
 from __future__ import annotations
 
+import json
 from typing import TYPE_CHECKING
+from urllib.parse import urlparse
 
 import pandas as pd
 
-from erddapy.core.netcdf import _nc_dataset, _tempnc
-from erddapy.core.url import urlopen
+from erddapy.core.dods import (
+    _dods_has_bytes,
+    _dods_to_pandas,
+    _dods_to_xarray,
+    _parse_das_signed,
+)
+from erddapy.core.hooks import _timed_decode
+from erddapy.core.nccsv import _parse_nccsv
+from erddapy.core.netcdf import _nc_dataset, _nc_from_data, _tempnc
+from erddapy.core.url import _urliterlines, urlopen
 
 if TYPE_CHECKING:
+    import io
+    from collections.abc import Iterator
+
     import iris.cube
     import netCDF4
     import xarray as xr
 
 
+# Binary responses decoded without `pandas.read_csv`.
+_binary_responses = (".dods", ".nccsv", ".parquet", ".nc")
+
+# `pandas.read_csv` kwargs that can be applied to a DataFrame already parsed.
+_frame_kwargs = {"usecols", "nrows", "dtype", "index_col", "parse_dates"}
+
+
 def to_pandas(
     url: str,
     requests_kwargs: dict | None = None,
@@ -29,14 +49,172 @@ def to_pandas(
     url: URL to request data from.
     requests_kwargs: arguments to be passed to urlopen method.
     **pandas_kwargs: kwargs to be passed to third-party library (pandas).
+
+    The binary responses, dods, nccsv, parquet, and nc, accept the
+    `pandas.read_csv` kwargs that `_applies_to_frame`, with the others
+    the csvp response of the same request is read instead.
     """
     requests_kwargs = requests_kwargs or {}
+    pandas_kwargs = pandas_kwargs or {}
+    path = urlparse(url).path
+    if path.endswith(_binary_responses) and not _applies_to_frame(
+        pandas_kwargs,
+    ):
+        url = _csvp_url(url)
+        path = urlparse(url).path
     data = urlopen(url, requests_kwargs=requests_kwargs)
-    try:
-        return pd.read_csv(data, **(pandas_kwargs or {}))
-    except Exception as e:
-        msg = f"Could not read url {url} with Pandas.read_csv."
-        raise ValueError(msg) from e
+    if path.endswith(".dods"):
+        signed = _dods_signed(url, data, requests_kwargs)
+    with _timed_decode(url, "pandas", data.getbuffer().nbytes):
+        if path.endswith(_binary_responses):
+            if path.endswith(".dods"):
+                df = _dods_to_pandas(data.getvalue(), signed)
+            elif path.endswith(".nccsv"):
+                df = _parse_nccsv(data.getvalue())
+            elif path.endswith(".parquet"):
+                df = pd.read_parquet(data)
+            else:
+                df = _nc_to_pandas(url, data)
+            return _apply_pandas_kwargs(df, pandas_kwargs)
+        try:
+            return pd.read_csv(data, **pandas_kwargs)
+        except Exception as e:
+            msg = f"Could not read url {url} with Pandas.read_csv."
+            raise ValueError(msg) from e
+
+
+def _dods_signed(
+    url: str,
+    data: io.BytesIO,
+    requests_kwargs: dict | None = None,
+) -> frozenset[str]:
+    """Return the signed bytes of a `.dods` response.
+
+    The DDS has no attributes, `_Unsigned` is read from the dataset DAS,
+    only when the response has bytes.
+    """
+    if not _dods_has_bytes(data.getvalue()):
+        return frozenset()
+    parts = urlparse(url)
+    path = parts.path.rsplit(".", maxsplit=1)[0]
+    das = parts._replace(path=f"{path}.das", query="").geturl()
+    text = urlopen(das, requests_kwargs=requests_kwargs).getvalue()
+    return _parse_das_signed(text.decode("utf-8"))
+
+
+def _csvp_url(url: str) -> str:
+    """Return `url` with the csvp response instead of its file type."""
+    parts = urlparse(url)
+    path = parts.path.rsplit(".", maxsplit=1)[0]
+    return parts._replace(path=f"{path}.csvp").geturl()
+
+
+def _nc_to_pandas(url: str, data: io.BytesIO) -> pd.DataFrame:
+    """Convert a `.nc` response to a DataFrame with a column per variable.
+
+    The dimensions without a coordinate, like tabledap's `row`, are dropped.
+    """
+    import xarray as xr  # noqa: PLC0415
+
+    nc = _nc_from_data(url, data)
+    ds = xr.open_dataset(xr.backends.NetCDF4DataStore(nc))
+    df = ds.to_dataframe().reset_index()
+    return df.drop(columns=[dim for dim in ds.dims if dim not in ds.variables])
+
+
+def _applies_to_frame(pandas_kwargs: dict) -> bool:
+    """Return True if `_apply_pandas_kwargs` supports all `pandas_kwargs`.
+
+    Those are `_frame_kwargs` with column names or positions, and
+    `parse_dates` as a list of columns or a boolean.
+    """
+    parse_dates = pandas_kwargs.get("parse_dates", False)
+    return (
+        set(pandas_kwargs) <= _frame_kwargs
+        and not callable(pandas_kwargs.get("usecols"))
+        and isinstance(parse_dates, (bool, list, tuple))
+        and all(isinstance(col, (str, int)) for col in _as_list(parse_dates))
+    )
+
+
+def _as_list(value: object) -> list:
+    """Return a kwarg that can be a single column as a list."""
+    if value is None or isinstance(value, bool):
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def _to_datetime(series: pd.Series) -> pd.Series:
+    """Parse times like `pandas.read_csv` does with the ERDDAP ISO strings.
+
+    Numeric times are seconds since 1970, as in the dods response.
+    """
+    unit = "s" if pd.api.types.is_numeric_dtype(series) else None
+    return pd.to_datetime(series, unit=unit, utc=True)
+
+
+def _apply_pandas_kwargs(
+    df: pd.DataFrame,
+    pandas_kwargs: dict,
+) -> pd.DataFrame:
+    """Apply `pandas.read_csv` kwargs to a DataFrame that is already parsed.
+
+    Used for the binary responses and the local caches, see
+    `_applies_to_frame` for the kwargs supported.
+    """
+    if not pandas_kwargs:
+        return df
+    attrs = df.attrs
+
+    def column(col: str | int) -> str:
+        return df.columns[col] if isinstance(col, int) else col
+
+    usecols = _as_list(pandas_kwargs.get("usecols"))
+    if usecols:
+        # Like `read_csv`, the columns keep their order in the response.
+        wanted = {column(col) for col in usecols}
+        df = df[[col for col in df.columns if col in wanted]]
+    if pandas_kwargs.get("nrows") is not None:
+        df = df.iloc[: pandas_kwargs["nrows"]]
+    if pandas_kwargs.get("dtype") is not None:
+        df = df.astype(pandas_kwargs["dtype"])
+    df = df.copy()
+    for col in _as_list(pandas_kwargs.get("parse_dates")):
+        df[column(col)] = _to_datetime(df[column(col)])
+    index_col = _as_list(pandas_kwargs.get("index_col"))
+    if index_col:
+        df = df.set_index([column(col) for col in index_col])
+        if pandas_kwargs.get("parse_dates") is True and len(index_col) == 1:
+            df.index = _to_datetime(df.index.to_series())
+    df.attrs = attrs
+    return df
+
+
+def to_records(
+    url: str,
+    requests_kwargs: dict | None = None,
+) -> Iterator[tuple | dict]:
+    """Stream a jsonlCSV, jsonlCSV1, or jsonlKVP URL one record at a time.
+
+    The response is read line by line as it arrives, memory use does not
+    grow with the size of the response.
+
+    url: URL to request data from.
+    requests_kwargs: arguments to be passed to urlopen method.
+
+    Yields tuples for jsonlCSV and jsonlCSV1, without the header line,
+    and dictionaries for jsonlKVP.
+    """
+    lines = _urliterlines(url, requests_kwargs)
+    if urlparse(url).path.endswith(".jsonlCSV1"):
+        next(lines, None)
+    for line in lines:
+        if not line:
+            continue
+        record = json.loads(line)
+        yield tuple(record) if isinstance(record, list) else record
 
 
 def to_ncCF(  # noqa: N802
@@ -72,7 +250,16 @@ def to_xarray(
     response: type of response to be requested from the server.
     requests_kwargs: arguments to be passed to urlopen method.
     xarray_kwargs: kwargs to be passed to third-party library (xarray).
+
+    With the dods response `xarray_kwargs` are passed to `xr.decode_cf`,
+    except `chunks`, used to chunk the dataset.
     """
+    if response == "dods":
+        data = urlopen(url, requests_kwargs=requests_kwargs)
+        signed = _dods_signed(url, data, requests_kwargs)
+        with _timed_decode(url, "xarray", data.getbuffer().nbytes):
+            return _dods_to_xarray(data.getvalue(), signed, xarray_kwargs)
+
     # NB: This is b/c xarray 2025.11.0 requires an explicit engine and we will
     # rely on `ImportError`` as the message for the user to install this
     # optional dependency.
@@ -81,12 +268,12 @@ def to_xarray(
 
     if response == "opendap":
         return xr.open_dataset(url, engine="netcdf4", **(xarray_kwargs or {}))
-
     nc = _nc_dataset(url, requests_kwargs)
-    return xr.open_dataset(
-        xr.backends.NetCDF4DataStore(nc),
-        **(xarray_kwargs or {}),
-    )
+    with _timed_decode(url, "xarray"):
+        return xr.open_dataset(
+            xr.backends.NetCDF4DataStore(nc),
+            **(xarray_kwargs or {}),
+        )
 
 
 def to_iris(
@@ -103,7 +290,10 @@ def to_iris(
     import iris  # noqa: PLC0415
 
     data = urlopen(url, **(requests_kwargs or {}))
-    with _tempnc(data) as tmp:
+    with (
+        _timed_decode(url, "iris", data.getbuffer().nbytes),
+        _tempnc(data) as tmp,
+    ):
         cubes = iris.load_raw(tmp, **(iris_kwargs or {}))
         _ = [cube.data for cube in cubes]
         return cubes
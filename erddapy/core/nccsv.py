@@ -0,0 +1,108 @@
+"""Reader of the NCCSV responses.
+
+A `.nccsv` response has the global and variable attributes, ended by
+`*END_METADATA*`, followed by the data table, ended by `*END_DATA*`.
+Both are read from the same response, avoiding the info request.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import re
+
+import pandas as pd
+
+from erddapy.core.url import parse_dates
+
+_end_metadata = "*END_METADATA*"
+_end_data = "*END_DATA*"
+
+# Numeric attributes have a type suffix, e.g. `1.5f` or `-1b`.
+_numeric_suffix = re.compile(
+    r"^([-+]?(?:[\d.]+(?:[eE][-+]?\d+)?|NaN|Infinity))(?:u?[bsiL]|[fd])$",
+)
+
+_string_types = ("String", "char")
+
+# Units of the times of the info response, the data and the attributes
+# of the nccsv response have ISO 8601 strings.
+_time_units = "seconds since 1970-01-01T00:00:00Z"
+
+
+def _attribute_value(values: list[str]) -> str:
+    """Format attribute values like the info response, e.g. `1.5, 30.2`."""
+    values = [_numeric_suffix.sub(r"\1", value.strip()) for value in values]
+    return ", ".join(
+        value.replace("\\n", "\n").replace("\\t", "\t").replace("\\\\", "\\")
+        for value in values
+    )
+
+
+def _parse_nccsv(data: bytes) -> pd.DataFrame:
+    """Parse an NCCSV response into a DataFrame with the metadata in `attrs`.
+
+    `df.attrs` maps each variable, and `NC_GLOBAL`, to its attributes,
+    with the values formatted like the info response that fills the
+    `_get_variables` metadata.
+    """
+    text = data.decode("utf-8")
+    metadata_text, separator, data_text = text.partition(f"\n{_end_metadata}")
+    if not separator:
+        msg = f"Not a valid .nccsv response: {text[:200]!r}"
+        raise ValueError(msg)
+
+    metadata: dict[str, dict] = {}
+    dtypes: dict[str, str] = {}
+    for row in csv.reader(io.StringIO(metadata_text)):
+        if len(row) < 3:  # noqa: PLR2004
+            continue
+        variable, name, *values = row
+        variable = "NC_GLOBAL" if variable == "*GLOBAL*" else variable
+        if name == "*DATA_TYPE*":
+            dtypes[variable] = values[0]
+            continue
+        metadata.setdefault(variable, {})[name] = _attribute_value(values)
+
+    data_text = data_text.strip().removesuffix(_end_data)
+    df = pd.read_csv(
+        io.StringIO(data_text),
+        dtype={
+            var: str for var, dtype in dtypes.items() if dtype in _string_types
+        },
+        keep_default_na=False,
+        na_values={
+            var: ["NaN", ""]
+            for var, dtype in dtypes.items()
+            if dtype not in _string_types
+        },
+    )
+    for var, dtype in dtypes.items():
+        # Longs may have the `L` suffix in the data section too.
+        if dtype in ("long", "ulong") and not pd.api.types.is_numeric_dtype(
+            df[var],
+        ):
+            df[var] = pd.to_numeric(df[var].str.removesuffix("L"))
+    df.attrs = metadata
+    return df
+
+
+def _info_attributes(attrs: dict[str, dict]) -> dict[str, dict]:
+    """Return the nccsv `attrs` as the info response has them.
+
+    The time variables, with an ERDDAP time format as units, e.g.
+    `yyyy-MM-dd'T'HH:mm:ssZ`, have seconds since 1970 units
+    and `actual_range`, like in the info response.
+    """
+    info = {
+        variable: dict(attributes) for variable, attributes in attrs.items()
+    }
+    for attributes in info.values():
+        if "yyyy" in attributes.get("units", ""):
+            attributes["units"] = _time_units
+            if "actual_range" in attributes:
+                attributes["actual_range"] = ", ".join(
+                    str(parse_dates(value.strip()))
+                    for value in attributes["actual_range"].split(",")
+                )
+    return info
@@ -11,9 +11,12 @@ from urllib.parse import urlparse
 
 # Maybe _is_quoted should be lower in the stack call,
 # but I'm restricting it to netCDF for now.
+from erddapy.core.hooks import _timed_decode
+from erddapy.core.profiling import _phase
 from erddapy.core.url import _is_quoted, urlopen
 
 if TYPE_CHECKING:
+    import io
     from collections.abc import Generator
 
     import netCDF4
@@ -27,8 +30,6 @@ def _nc_dataset(
     and fallbacks to disk if that fails.
 
     """
-    from netCDF4 import Dataset  # noqa: PLC0415
-
     quote = False
     if not _is_quoted(url):
         quote = True
@@ -38,13 +39,24 @@ def _nc_dataset(
         quote=quote,
         requests_kwargs=requests_kwargs,
     )
-    try:
-        return Dataset(Path(urlparse(url).path).name, memory=data.read())
-    except OSError:
-        # if libnetcdf is not compiled with in-memory support fallback tmp file
-        data.seek(0)
-        with _tempnc(data) as _nc:
-            return Dataset(_nc)
+    return _nc_from_data(url, data)
+
+
+def _nc_from_data(url: str, data: io.BytesIO) -> netCDF4.Dataset:
+    """Return a netCDF4-python Dataset of the `url` response `data`."""
+    from netCDF4 import Dataset  # noqa: PLC0415
+
+    with _timed_decode(url, "netcdf4", data.getbuffer().nbytes):
+        try:
+            with _phase("copy"):
+                memory = data.read()
+            return Dataset(Path(urlparse(url).path).name, memory=memory)
+        except OSError:
+            # if libnetcdf is not compiled with in-memory support
+            # fallback tmp file
+            data.seek(0)
+            with _tempnc(data) as _nc:
+                return Dataset(_nc)
 
 
 @contextmanager
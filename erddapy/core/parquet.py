@@ -0,0 +1,79 @@
+"""Local parquet datasets of tabledap responses.
+
+Partitions are written to a temporary file and atomically renamed,
+so readers never see a partial file and an interrupted write leaves
+the dataset unchanged.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+from typing import TYPE_CHECKING, Any
+
+import pandas as pd
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+_time_constraints = ("time>=", "time>", "time=")
+
+_time_format = "%Y%m%dT%H%M%S%fZ"
+
+
+def _query_key(url: str) -> str:
+    """Return a short hash identifying a query URL."""
+    return hashlib.shake_256(url.encode()).hexdigest(5)
+
+
+def _time_column(df: pd.DataFrame) -> str:
+    """Return the name of the time column, with or without units."""
+    for column in df.columns:
+        if column == "time" or column.startswith("time ("):
+            return column
+    msg = f"Could not find a time column in {list(df.columns)}."
+    raise ValueError(msg)
+
+
+def _partition_name(key: str, max_time: pd.Timestamp) -> str:
+    """Name a partition after its query and the last time it stores."""
+    return f"part-{key}-{max_time.strftime(_time_format)}.parquet"
+
+
+def _stored_max_time(store: Path, key: str) -> pd.Timestamp | None:
+    """Return the last time stored for the query `key` or None."""
+    times = [
+        dt.datetime.strptime(
+            path.stem.rsplit("-", maxsplit=1)[-1],
+            _time_format,
+        ).replace(tzinfo=dt.UTC)
+        for path in store.glob(f"part-{key}-*.parquet")
+    ]
+    return pd.Timestamp(max(times)) if times else None
+
+
+def _incremental_constraints(
+    constraints: dict[str, Any] | None,
+    max_time: pd.Timestamp | None,
+) -> dict[str, Any]:
+    """Replace the lower time bound with `time>` the last stored time."""
+    constraints = dict(constraints or {})
+    if max_time is None:
+        return constraints
+    constraints = {
+        k: v for k, v in constraints.items() if k not in _time_constraints
+    }
+    constraints["time>"] = max_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    return constraints
+
+
+def _write_partition(df: pd.DataFrame, path: Path) -> Path:
+    """Write `df` to `path` atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        df.to_parquet(tmp, index=False)
+        tmp.replace(path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return path
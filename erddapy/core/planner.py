@@ -0,0 +1,267 @@
+"""Request size estimation and planning.
+
+Estimate the size of a request before downloading it and split requests that
+are too big into smaller pieces that ERDDAP, and the client, can handle.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import math
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import numpy as np
+
+from erddapy.core.griddap import _griddap_axis_value
+from erddapy.core.url import parse_dates
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+# Requests larger than this are split by the planner.
+MAX_REQUEST_BYTES = 100_000_000
+
+# Rough size of a value, and its separator, in the text responses.
+TEXT_BYTES_PER_VALUE = 12
+
+binary_responses = [
+    "dods",
+    "mat",
+    "nc",
+    "ncCF",
+    "ncCFMA",
+    "parquet",
+    "parquetWMeta",
+    "wav",
+]
+
+_itemsize = {
+    "byte": 1,
+    "ubyte": 1,
+    "char": 1,
+    "short": 2,
+    "ushort": 2,
+    "int": 4,
+    "uint": 4,
+    "long": 8,
+    "ulong": 8,
+    "float": 4,
+    "double": 8,
+    "String": 16,
+}
+
+_time_lower = ("time>=", "time>")
+_time_upper = ("time<=", "time<")
+
+
+class SizeEstimate(NamedTuple):
+    """Predicted size of a request.
+
+    rows: number of rows, or grid points for griddap.
+    cells: number of values, rows times the number of variables.
+    nbytes: approximate size of the response in bytes.
+    exact: True if the rows are known exactly.
+    """
+
+    rows: int
+    cells: int
+    nbytes: int
+    exact: bool
+
+
+class RequestPlan(NamedTuple):
+    """How a request should be fetched.
+
+    strategy: "single", "time-split", or "tiled".
+    constraints: the constraints of each request.
+    estimate: the size estimate of the whole request.
+    """
+
+    strategy: str
+    constraints: list[dict[str, Any]]
+    estimate: SizeEstimate
+
+
+def _response_nbytes(cells: int, itemsize: int, response: str) -> int:
+    """Approximate the response size from the number of values."""
+    if response in binary_responses:
+        return cells * itemsize
+    return cells * TEXT_BYTES_PER_VALUE
+
+
+def _griddap_estimate(  # noqa: PLR0913
+    metadata: dict,
+    *,
+    constraints: dict,
+    dim_names: list[str] | tuple[str],
+    variables: list[str] | tuple[str],
+    response: str,
+    shape: dict[str, int] | None = None,
+    axes: Mapping[str, np.ndarray | None] | None = None,
+) -> SizeEstimate:
+    """Estimate a griddap request size from the NcML metadata.
+
+    The number of points in each dimension is estimated from the fraction of
+    the `actual_range` requested, assuming an evenly spaced axis,
+    unless the exact `shape` is given.
+    Bounds like `last` or `(2020-01-01T00:00:00Z)` are resolved on the
+    `axes` values, when given, or on the `actual_range`.
+    """
+    exact = shape is not None
+    axes = axes or {}
+    if shape is None:
+        shape = {}
+        for dim in dim_names:
+            length = metadata["dimensions"][dim]
+            range_min, range_max = (
+                _to_number(value) for value in metadata["actual_range"][dim]
+            )
+            axis = axes.get(dim)
+            if axis is None:
+                axis = np.array([range_min, range_max])
+            start = _griddap_axis_value(constraints[f"{dim}>="], axis)
+            stop = _griddap_axis_value(constraints[f"{dim}<="], axis)
+            span = range_max - range_min
+            fraction = abs(stop - start) / span if span else 0.0
+            points = min(length, round(fraction * (length - 1)) + 1)
+            step = int(constraints[f"{dim}_step"])
+            shape[dim] = math.ceil(points / step)
+
+    rows = math.prod(shape.values())
+    if response in binary_responses:
+        cells = rows * len(variables)
+        itemsize = max(
+            (
+                _itemsize.get(metadata["variables"][var]["type"], 8)
+                for var in variables
+            ),
+            default=8,
+        )
+    else:
+        # Text responses repeat the coordinates in every row.
+        cells = rows * (len(variables) + len(dim_names))
+        itemsize = TEXT_BYTES_PER_VALUE
+    nbytes = _response_nbytes(cells, itemsize, response)
+    return SizeEstimate(rows=rows, cells=cells, nbytes=nbytes, exact=exact)
+
+
+def _tabledap_estimate(counts: dict[str, int], response: str) -> SizeEstimate:
+    """Estimate a tabledap request size from an `orderByCount` probe.
+
+    The counts are the number of non-missing values of each variable,
+    the largest one is used as the number of rows.
+    """
+    rows = max(counts.values(), default=0)
+    cells = rows * len(counts)
+    nbytes = _response_nbytes(cells, 8, response)
+    return SizeEstimate(rows=rows, cells=cells, nbytes=nbytes, exact=True)
+
+
+def _to_number(value: str | float | dt.datetime) -> float:
+    """Convert a constraint value to a number, dates to seconds since 1970."""
+    if isinstance(value, dt.datetime):
+        return parse_dates(value)
+    try:
+        return float(value)
+    except ValueError:
+        return parse_dates(value)
+
+
+def _isoformat(seconds: float) -> str:
+    """Format seconds since 1970 as an ISO 8601 UTC string."""
+    return dt.datetime.fromtimestamp(seconds, tz=dt.UTC).strftime(
+        "%Y-%m-%dT%H:%M:%S.%fZ",
+    )
+
+
+def _split_time_constraints(
+    constraints: dict[str, Any],
+    pieces: int,
+) -> list[dict[str, Any]]:
+    """Split tabledap constraints in `pieces` contiguous time windows.
+
+    The windows are half-open, `time>=start&time<stop`,
+    except for the edges, which keep the user's operators.
+    Returns the original constraints if they lack absolute time bounds.
+    """
+    lower = next((k for k in _time_lower if k in constraints), None)
+    upper = next((k for k in _time_upper if k in constraints), None)
+    if pieces < 2 or lower is None or upper is None:  # noqa: PLR2004
+        return [constraints]
+    try:
+        start = _to_number(constraints[lower])
+        stop = _to_number(constraints[upper])
+    except (ValueError, TypeError):
+        # Relative constraints, like now-7days, are resolved by the server.
+        return [constraints]
+
+    others = {
+        k: v
+        for k, v in constraints.items()
+        if k not in _time_lower + _time_upper
+    }
+    edges = [start + (stop - start) * i / pieces for i in range(pieces + 1)]
+    split = []
+    for i in range(pieces):
+        piece = dict(others)
+        if i == 0:
+            piece[lower] = constraints[lower]
+        else:
+            piece["time>="] = _isoformat(edges[i])
+        if i == pieces - 1:
+            piece[upper] = constraints[upper]
+        else:
+            piece["time<"] = _isoformat(edges[i + 1])
+        split.append(piece)
+    return split
+
+
+def _griddap_split_constraints(
+    constraints: dict[str, Any],
+    indices: dict[str, tuple[int, int, int]],
+    axes: dict[str, np.ndarray],
+    pieces: int,
+) -> tuple[str, list[dict[str, Any]]]:
+    """Split griddap constraints in at least `pieces` hyperslabs.
+
+    Time is split first, the other dimensions are tiled, largest first,
+    only when there are not enough time steps.
+    The pieces are aligned with the axes values so they do not overlap.
+    """
+    selected = {
+        dim: list(range(start, stop + 1, step))
+        for dim, (start, step, stop) in indices.items()
+    }
+    order = sorted(
+        selected,
+        key=lambda dim: (dim != "time", -len(selected[dim])),
+    )
+    splits = dict.fromkeys(selected, 1)
+    for dim in order:
+        remaining = math.ceil(pieces / math.prod(splits.values()))
+        if remaining <= 1:
+            break
+        splits[dim] = min(remaining, len(selected[dim]))
+
+    tiled = any(splits[dim] > 1 for dim in selected if dim != "time")
+    strategy = "tiled" if tiled else "time-split"
+
+    chunks = {}
+    for dim, values in selected.items():
+        size = math.ceil(len(values) / splits[dim])
+        chunks[dim] = [
+            values[i : i + size] for i in range(0, len(values), size)
+        ]
+
+    split = [dict(constraints)]
+    for dim, dim_chunks in chunks.items():
+        split = [
+            {
+                **piece,
+                f"{dim}>=": str(axes[dim][chunk[0]]),
+                f"{dim}<=": str(axes[dim][chunk[-1]]),
+            }
+            for piece in split
+            for chunk in dim_chunks
+        ]
+    return strategy, split
@@ -0,0 +1,232 @@
+"""Profiling of the data requests.
+
+`profile()` collects a CPU profile, with cProfile, and the time and the
+peak memory allocated, with tracemalloc, of each phase of the requests:
+
+- fetch: the HTTP requests, including the copy of the content;
+- copy: the copies of the responses into new buffers;
+- parse: the conversion of the responses to pandas, xarray, etc.
+
+Phases can be nested, e.g. `copy` inside `fetch`, their numbers include the
+nested ones. Setting the `ERDDAPY_PROFILE` environment variable profiles
+every `ERDDAP.to_*` and `download_file` call.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import IO, TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+T = TypeVar("T")
+
+PROFILE_ENV = "ERDDAPY_PROFILE"
+
+
+class Profile:
+    """The results of a `profile()` block.
+
+    phases: the calls, seconds, and peak bytes allocated by each phase.
+    stats: the cProfile statistics of the whole block.
+    elapsed: the seconds spent in the block.
+    peak: the peak bytes allocated in the block.
+    """
+
+    def __init__(self: Profile, label: str = "erddapy") -> None:
+        """Start with empty results."""
+        self.label = label
+        self.phases: dict[str, dict[str, float]] = {}
+        self.stats: pstats.Stats | None = None
+        self.elapsed = 0.0
+        self.peak = 0
+        self._lock = threading.Lock()
+        # False when the profile started tracemalloc and has to stop it.
+        self._tracing = True
+
+    def _add(self: Profile, phase: str, seconds: float, peak: int) -> None:
+        with self._lock:
+            stats = self.phases.setdefault(
+                phase,
+                {"calls": 0, "seconds": 0.0, "peak": 0},
+            )
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["peak"] = max(stats["peak"], peak)
+
+    def report(self: Profile, top: int = 10) -> str:
+        """Return the phases and the `top` functions by internal time."""
+        lines = [
+            (
+                f"{self.label}: {self.elapsed:.3f} s, "
+                f"peak {self.peak / 2**20:.1f} MiB"
+            ),
+            f"{'phase':<8} {'calls':>6} {'seconds':>9} {'peak MiB':>9}",
+        ]
+        lines.extend(
+            f"{phase:<8} {stats['calls']:>6} {stats['seconds']:>9.3f} "
+            f"{stats['peak'] / 2**20:>9.1f}"
+            for phase, stats in self.phases.items()
+        )
+        if self.stats is not None:
+            stream = io.StringIO()
+            self.stats.stream = stream
+            self.stats.sort_stats("tottime").print_stats(top)
+            # Skip the pstats header, up to the table.
+            table = stream.getvalue().split("   ncalls", maxsplit=1)
+            if len(table) == 2:  # noqa: PLR2004
+                lines.append("   ncalls" + table[1].rstrip())
+        return "\n".join(lines)
+
+
+# The active profile, only one at a time, and the phases open in any thread.
+# tracemalloc has a single peak for the process, `_lock` makes reading and
+# resetting it atomic, and the peak is added to all the open phases first.
+_active: Profile | None = None
+_frames: list[dict[str, int]] = []
+_lock = threading.Lock()
+
+
+def _observe_peak() -> tuple[int, int]:
+    """Add the traced peak to the open phases and the profile, then reset it.
+
+    Must be called with `_lock` held.
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    for frame in _frames:
+        frame["peak"] = max(frame["peak"], peak)
+    if _active is not None:
+        _active.peak = max(_active.peak, peak)
+    tracemalloc.reset_peak()
+    return current, peak
+
+
+def _claim(label: str) -> Profile | None:
+    """Start a profile and return it, None if another one is active."""
+    global _active  # noqa: PLW0603
+    with _lock:
+        if _active is not None:
+            return None
+        _active = Profile(label)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _active._tracing = False  # noqa: SLF001
+        tracemalloc.reset_peak()
+        return _active
+
+
+@contextlib.contextmanager
+def _profiling(
+    result: Profile,
+    top: int,
+    file: IO[str] | None,
+    *,
+    report: bool,
+) -> Iterator[Profile]:
+    """Profile the `with` block into `result`, claimed with `_claim`."""
+    global _active  # noqa: PLW0603
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        result.elapsed = time.perf_counter() - start
+        with _lock:
+            _observe_peak()
+            _active = None
+            if not result._tracing:  # noqa: SLF001
+                tracemalloc.stop()
+        result.stats = pstats.Stats(profiler)
+        if report:
+            print(result.report(top), file=file or sys.stderr)
+
+
+@contextlib.contextmanager
+def profile(
+    label: str = "erddapy",
+    *,
+    top: int = 10,
+    file: IO[str] | None = None,
+    report: bool = True,
+) -> Iterator[Profile]:
+    """Profile the erddapy calls inside the `with` block.
+
+    Args:
+    ----
+        label: the name of the block in the report.
+        top: the number of functions in the report.
+        file: where the report is printed, default is stderr.
+        report: print the report at the end of the block.
+
+    Examples:
+    --------
+        >>> import erddapy
+        >>> with erddapy.profile() as prof:  # doctest: +SKIP
+        ...     df = e.to_pandas()
+        >>> prof.phases["parse"]["seconds"]  # doctest: +SKIP
+
+    """
+    result = _claim(label)
+    if result is None:
+        msg = "Another erddapy profile is active."
+        raise RuntimeError(msg)
+    with _profiling(result, top, file, report=report) as prof:
+        yield prof
+
+
+@contextlib.contextmanager
+def _phase(name: str) -> Iterator[None]:
+    """Account the `with` block to the `name` phase of the active profile.
+
+    Concurrent phases share the process peak, each one gets the peak
+    allocated while it was open, by any thread.
+    """
+    result = _active
+    if result is None:
+        yield
+        return
+    frame = {"peak": 0}
+    with _lock:
+        current, _ = _observe_peak()
+        _frames.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        with _lock:
+            _observe_peak()
+            _frames[:] = [other for other in _frames if other is not frame]
+        result._add(name, seconds, frame["peak"] - current)  # noqa: SLF001
+
+
+def _profiled(func: Callable[..., T]) -> Callable[..., T]:
+    """Profile the calls of `func` when `ERDDAPY_PROFILE` is set.
+
+    Calls made while another profile is active, e.g. in other threads,
+    are not profiled.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        result = None
+        if os.environ.get(PROFILE_ENV):
+            result = _claim(f"ERDDAP.{func.__name__}")
+        if result is None:
+            return func(*args, **kwargs)
+        with _profiling(result, 10, None, report=True):
+            return func(*args, **kwargs)
+
+    return wrapper
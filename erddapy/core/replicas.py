@@ -0,0 +1,292 @@
+"""Copies of a dataset on several ERDDAP servers.
+
+Many datasets are served by more than one ERDDAP, e.g. the CoastWatch nodes
+and the IOOS regional mirrors. `Replicas` probes the candidate servers with
+a small info request, remembers in the metadata cache which ones have the
+dataset and how fast they answered, and sends the data requests to the
+fastest one, failing over to the next one on errors.
+
+Optionally a slow request is hedged: when it takes longer than a percentile
+of the server latency, see `erddapy.core.health`, the same request is sent
+to the next replica and the first answer wins.
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http import HTTPStatus
+from typing import TYPE_CHECKING, TypeVar
+from urllib import parse
+
+import pandas as pd
+import requests
+
+from erddapy.core.cache import get_metadata_cache
+from erddapy.core.health import get_health_registry
+from erddapy.core.url import (
+    _is_no_results,
+    _is_url,
+    _urlstream,
+    get_info_url,
+)
+from erddapy.servers.servers import servers
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+T = TypeVar("T")
+
+# Timeout of the probes of servers without latency statistics.
+PROBE_TIMEOUT = 30.0
+
+
+def _host(server: str) -> str:
+    return parse.urlparse(server).netloc
+
+
+def _resolve(server: str) -> str:
+    """Return the URL of a server URL or of a `servers()` short name."""
+    if not _is_url(server):
+        server = servers()[server.lower()].url
+    return server.rstrip("/")
+
+
+class Replicas:
+    """Route the requests of a dataset to the fastest of its servers.
+
+    Args:
+    ----
+        dataset_id: the dataset ID, or a mapping of server to dataset ID
+            for servers that publish it under different IDs.
+        servers_list: the candidate servers, URLs or `servers()` short names.
+            Default to all the servers in `erddapy.servers`.
+        hedge: latency percentile, e.g. 0.95, after which a slow request
+            is sent to the next replica too. None, the default, disables it.
+        requests_kwargs: kwargs to be passed to the probe requests.
+
+    Examples:
+    --------
+        >>> from erddapy import ERDDAP
+        >>> from erddapy.core.replicas import Replicas
+        >>> e = ERDDAP("cswc", protocol="griddap")
+        >>> e.dataset_id = "erdMH1chla8day"
+        >>> e.replicas = Replicas(e.dataset_id, ["cswc", "ncei", "pfeg"])
+        >>> ds = e.to_xarray()  # from the fastest server with the dataset.
+
+    """
+
+    def __init__(
+        self: Replicas,
+        dataset_id: str | dict[str, str],
+        servers_list: list[str] | None = None,
+        *,
+        hedge: float | None = None,
+        requests_kwargs: dict | None = None,
+    ) -> None:
+        """Store the candidates, they are probed on first use."""
+        if isinstance(dataset_id, dict):
+            self.dataset_ids = {
+                _resolve(server): value for server, value in dataset_id.items()
+            }
+        else:
+            if servers_list is None:
+                servers_list = [server.url for server in servers().values()]
+            self.dataset_ids = dict.fromkeys(
+                map(_resolve, servers_list),
+                dataset_id,
+            )
+        if hedge is not None and not 0 < hedge < 1:
+            msg = f"hedge must be a percentile between 0 and 1, got {hedge}"
+            raise ValueError(msg)
+        self.hedge = hedge
+        self.requests_kwargs = requests_kwargs or {}
+
+    def _probe(self: Replicas, server: str) -> float | None:
+        """Return the latency of the info request, None if it failed.
+
+        Servers without the dataset, a 404, are cached as such. Other errors
+        are transient and not cached, they are reported to the circuit breaker
+        of `erddapy.core.health` by the transport.
+        """
+        dataset_id = self.dataset_ids[server]
+        health = get_health_registry()
+        host = _host(server)
+        if not health.available(host):
+            return None
+        requests_kwargs = {
+            "timeout": health.timeout(host, PROBE_TIMEOUT),
+            **self.requests_kwargs,
+        }
+        url = get_info_url(server, dataset_id, response="csv")
+        start = time.perf_counter()
+        try:
+            with _urlstream(url, requests_kwargs) as response:
+                response.content  # noqa: B018
+        except requests.exceptions.HTTPError as err:
+            if (
+                err.response is None
+                or err.response.status_code != HTTPStatus.NOT_FOUND
+            ):
+                return None
+            latency = None
+        except requests.exceptions.RequestException:
+            return None
+        else:
+            latency = time.perf_counter() - start
+        get_metadata_cache().set(
+            server,
+            dataset_id,
+            "replica",
+            {"latency": latency},
+        )
+        return latency
+
+    def _latencies(
+        self: Replicas,
+        *,
+        refresh: bool = False,
+    ) -> dict[str, float | None]:
+        """Return the probe latency of each server, probing the unknown ones.
+
+        The probes run concurrently.
+        """
+        cache = get_metadata_cache()
+        latencies = {}
+        for server, dataset_id in self.dataset_ids.items():
+            entry = (
+                None if refresh else cache.get(server, dataset_id, "replica")
+            )
+            if entry is not None:
+                latencies[server] = entry["latency"]
+        missing = [
+            server for server in self.dataset_ids if server not in latencies
+        ]
+        if missing:
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                latencies.update(
+                    zip(
+                        missing,
+                        executor.map(self._probe, missing),
+                        strict=True,
+                    ),
+                )
+        return latencies
+
+    def probe(self: Replicas) -> pd.DataFrame:
+        """Probe all the servers again and return the latencies.
+
+        Servers without the dataset, or that did not answer, have no latency.
+        """
+        latencies = self._latencies(refresh=True)
+        df = pd.DataFrame(
+            {
+                "dataset_id": self.dataset_ids,
+                "latency": latencies,
+            },
+        ).sort_values("latency")
+        df.index.name = "server"
+        return df
+
+    def ranked(self: Replicas) -> list[str]:
+        """Return the servers with the dataset, fastest first.
+
+        Servers whose circuit is open, after repeated failures, come last.
+        """
+        health = get_health_registry()
+        latencies = self._latencies()
+        return sorted(
+            (
+                server
+                for server, latency in latencies.items()
+                if latency is not None
+            ),
+            key=lambda server: (
+                not health.available(_host(server)),
+                latencies[server],
+            ),
+        )
+
+    def _hedge_delay(self: Replicas, server: str) -> float | None:
+        """Return the seconds to wait for `server` before hedging."""
+        if self.hedge is None:
+            return None
+        return get_health_registry().latency(_host(server), self.hedge)
+
+    def fetch(self: Replicas, func: Callable[[str, str], T]) -> T:
+        """Return `func(server, dataset_id)` from the fastest replica.
+
+        Errors fail over to the next replica, except the errors of requests
+        without results, which would fail on every server.
+        """
+        ranked = self.ranked()
+        if not ranked:
+            msg = f"No server answered for {self.dataset_ids}."
+            raise ValueError(msg)
+        if self.hedge is None:
+            return self._failover(func, ranked)
+        return self._hedged(func, ranked)
+
+    def _failover(
+        self: Replicas,
+        func: Callable[[str, str], T],
+        ranked: list[str],
+    ) -> T:
+        """Try the replicas one at a time, in the caller's thread."""
+        *fallbacks, last = ranked
+        for server in fallbacks:
+            try:
+                return func(server, self.dataset_ids[server])
+            except requests.exceptions.RequestException as err:
+                if _is_no_results(err):
+                    raise
+        return func(last, self.dataset_ids[last])
+
+    def _hedged(
+        self: Replicas,
+        func: Callable[[str, str], T],
+        ranked: list[str],
+    ) -> T:
+        """Try the replicas in threads, hedging the slow requests."""
+        candidates = iter(ranked)
+        pending = {}
+        error: Exception | None = None
+        executor = ThreadPoolExecutor(max_workers=len(ranked))
+
+        def submit() -> None:
+            server = next(candidates, None)
+            if server is not None:
+                future = executor.submit(
+                    func, server, self.dataset_ids[server]
+                )
+                pending[future] = server
+
+        try:
+            submit()
+            while pending:
+                # Only one request is hedged at a time.
+                delay = (
+                    self._hedge_delay(next(iter(pending.values())))
+                    if len(pending) == 1
+                    else None
+                )
+                done, _ = wait(
+                    pending, timeout=delay, return_when=FIRST_COMPLETED
+                )
+                if not done:
+                    submit()
+                    continue
+                for future in done:
+                    del pending[future]
+                    try:
+                        return future.result()
+                    except requests.exceptions.RequestException as err:
+                        if _is_no_results(err):
+                            raise
+                        error = err
+                if not pending:
+                    submit()
+        finally:
+            # The losers of a hedge finish in the background.
+            executor.shutdown(wait=False, cancel_futures=True)
+        raise error
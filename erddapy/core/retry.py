@@ -0,0 +1,126 @@
+"""Retries of the transient errors of the requests.
+
+Busy ERDDAP servers answer with 502, 503, or 429 now and then, and long
+downloads can be cut. The requests are retried with an exponential backoff
+and full jitter, waiting at least what the `Retry-After` header asks for.
+
+The policy is shared by all the requests, see `set_retry_policy`.
+Use `RetryPolicy(attempts=1)` to disable the retries.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import email.utils
+import random
+import time
+from typing import TYPE_CHECKING, NamedTuple, TypeVar
+
+import requests
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+T = TypeVar("T")
+
+
+class RetryPolicy(NamedTuple):
+    """When and how long to wait before retrying a request.
+
+    attempts: the maximum number of attempts, including the first one.
+    statuses: the HTTP status codes that are retried.
+    exceptions: the exceptions that are retried, the HTTP errors
+        are retried according to `statuses`.
+    backoff: the delay before the first retry, doubled for each retry.
+    max_backoff: the maximum delay between attempts.
+    jitter: wait a random time between 0 and the delay, so that many
+        clients do not retry at once.
+    max_retry_after: give up when `Retry-After` asks to wait longer.
+    """
+
+    attempts: int = 3
+    statuses: tuple[int, ...] = (429, 502, 503, 504)
+    exceptions: tuple[type[Exception], ...] = (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.ChunkedEncodingError,
+    )
+    backoff: float = 0.5
+    max_backoff: float = 30.0
+    jitter: bool = True
+    max_retry_after: float = 120.0
+
+    def retryable(self: RetryPolicy, err: Exception) -> bool:
+        """Return True if the request that raised `err` can be retried."""
+        if isinstance(err, requests.exceptions.HTTPError):
+            response = err.response
+            return response is not None and response.status_code in (
+                self.statuses
+            )
+        return isinstance(err, self.exceptions)
+
+    def delay(self: RetryPolicy, retries: int, err: Exception) -> float | None:
+        """Return the seconds to wait before the next attempt.
+
+        None if `err` cannot be retried after `retries` retries,
+        or when the server asks to wait longer than `max_retry_after`.
+        """
+        if retries + 1 >= self.attempts or not self.retryable(err):
+            return None
+        delay = min(self.max_backoff, self.backoff * 2**retries)
+        if self.jitter:
+            delay = random.uniform(0, delay)  # noqa: S311
+        response = getattr(err, "response", None)
+        if response is not None:
+            retry_after = _retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                if retry_after > self.max_retry_after:
+                    return None
+                delay = max(delay, retry_after)
+        return delay
+
+
+def _retry_after(value: str | None) -> float | None:
+    """Return the seconds of a `Retry-After` header, seconds or HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=dt.UTC)
+    now = dt.datetime.now(tz=dt.UTC)
+    return max(0.0, (date - now).total_seconds())
+
+
+_retry_policy = RetryPolicy()
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Return the retry policy shared by all the requests."""
+    return _retry_policy
+
+
+def set_retry_policy(policy: RetryPolicy) -> None:
+    """Replace the retry policy shared by all the requests."""
+    global _retry_policy  # noqa: PLW0603
+    _retry_policy = policy
+
+
+def _retrying(attempt: Callable[[int], T]) -> T:
+    """Return `attempt(retries)`, retrying it according to the policy."""
+    policy = _retry_policy
+    retries = 0
+    while True:
+        try:
+            return attempt(retries)
+        except requests.exceptions.RequestException as err:
+            delay = policy.delay(retries, err)
+            if delay is None:
+                raise
+            time.sleep(delay)
+        retries += 1
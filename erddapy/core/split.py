@@ -0,0 +1,142 @@
+"""Split-and-retry of requests that are too big for the server.
+
+ERDDAP refuses requests that would produce too much data, and big requests
+may time out. These are retried by bisecting the request,
+fetching the pieces concurrently, and merging the results.
+"""
+
+from __future__ import annotations
+
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, TypeVar
+
+import pandas as pd
+import requests
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    import xarray as xr
+
+T = TypeVar("T")
+
+# Substrings, lower case, of ERDDAP and proxy errors caused by the size
+# of the request.
+_size_error_messages = (
+    "too much data",
+    "too big",
+    "too large",
+    "more memory than",
+    "timed out",
+    "timeout",
+)
+
+# 413 Payload Too Large, 504 Gateway Timeout.
+_size_error_status = (413, 504)
+
+# Header lines to skip when appending pieces of a text response.
+_text_header_lines = {
+    "csv": 2,
+    "csvp": 1,
+    "csv0": 0,
+    "tsv": 2,
+    "tsvp": 1,
+    "tsv0": 0,
+    "jsonlCSV1": 1,
+    "jsonlCSV": 0,
+    "jsonlKVP": 0,
+}
+
+
+def _is_size_error(err: Exception) -> bool:
+    """Return True if the request failed because of its size.
+
+    Only reading the response can time out because of its size,
+    connection errors and timeouts mean the server is not reachable.
+    """
+    if isinstance(err, requests.exceptions.ReadTimeout):
+        return True
+    if not isinstance(err, requests.exceptions.HTTPError):
+        return False
+    response = getattr(err, "response", None)
+    if response is not None and response.status_code in _size_error_status:
+        return True
+    msg = str(err).lower()
+    return any(substring in msg for substring in _size_error_messages)
+
+
+def _split_fetch(
+    fetch: Callable[[dict], T],
+    constraints: dict[str, Any],
+    bisect: Callable[[dict], list[dict]],
+    *,
+    depth: int,
+) -> list[T]:
+    """Fetch `constraints`, bisecting them when the request is too big.
+
+    The pieces are fetched concurrently and recursively,
+    up to `depth` bisections. The results are returned in order.
+    """
+    try:
+        return [fetch(constraints)]
+    except (
+        requests.exceptions.HTTPError,
+        requests.exceptions.ReadTimeout,
+    ) as err:
+        if depth <= 0 or not _is_size_error(err):
+            raise
+        pieces = bisect(constraints)
+        if len(pieces) < 2:  # noqa: PLR2004
+            raise
+
+    with ThreadPoolExecutor(max_workers=len(pieces)) as executor:
+        results = executor.map(
+            lambda piece: _split_fetch(fetch, piece, bisect, depth=depth - 1),
+            pieces,
+        )
+        return [result for piece in results for result in piece]
+
+
+def _merge_frames(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate the DataFrames of the pieces of a request."""
+    ignore_index = all(isinstance(df.index, pd.RangeIndex) for df in frames)
+    df = pd.concat(frames, ignore_index=ignore_index)
+    df.attrs = frames[0].attrs
+    return df
+
+
+def _merge_datasets(datasets: list[xr.Dataset], protocol: str) -> xr.Dataset:
+    """Combine the xarray Datasets of the pieces of a request."""
+    import xarray as xr  # noqa: PLC0415
+
+    if protocol == "griddap":
+        return xr.combine_by_coords(datasets, combine_attrs="override")
+
+    dims = {tuple(ds.dims) for ds in datasets}
+    if len(dims) != 1 or len(next(iter(dims))) != 1:
+        msg = (
+            "Cannot merge the pieces of a tabledap request with more than "
+            f"one dimension, got {dims}. Request less data."
+        )
+        raise ValueError(msg)
+    (dim,) = next(iter(dims))
+    return xr.concat(datasets, dim=dim, combine_attrs="override")
+
+
+def _merge_text_files(
+    parts: list[Path],
+    file_name: Path,
+    response: str,
+) -> Path:
+    """Append text response `parts` into `file_name`, skipping headers."""
+    skip = _text_header_lines[response]
+    with file_name.open("wb") as out:
+        for k, part in enumerate(parts):
+            with part.open("rb") as f:
+                if k > 0:
+                    for _ in range(skip):
+                        f.readline()
+                shutil.copyfileobj(f, out)
+    return file_name
@@ -0,0 +1,200 @@
+"""Rate and concurrency limits of the requests to each host.
+
+The limits are opt-in, with `set_throttle(Throttle(...))`, and apply to all
+the requests of the process, e.g. to many threads calling `to_pandas`.
+Each host has:
+
+- a token bucket, at most `rate` requests per second with bursts of `burst`;
+- an additive-increase/multiplicative-decrease (AIMD) concurrency limit,
+  it grows by one request after about `limit` successful requests and is
+  halved by responses that signal an overloaded server, 429 and 503, and
+  by timeouts.
+
+The concurrency converges to what each server tolerates without tuning.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import pandas as pd
+import requests
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# Responses of servers that are throttling us or overloaded.
+OVERLOAD_STATUS = (429, 503)
+
+
+class HostLimits:
+    """Token bucket and concurrency limit of a host."""
+
+    def __init__(self: HostLimits, burst: float, initial: float) -> None:
+        """Start with a full bucket."""
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.limit = initial
+        self.in_flight = 0
+        self.requests = 0
+        self.overloads = 0
+
+
+class Throttle:
+    """Limit the request rate and concurrency of each host.
+
+    Args:
+    ----
+        rate: requests per second to each host, None for no limit.
+        burst: requests that can be made at once after an idle period.
+        initial: the initial concurrency limit of each host.
+        max_concurrency: the maximum concurrency limit of each host.
+
+    Examples:
+    --------
+        >>> from erddapy.core.throttle import Throttle, set_throttle
+        >>> set_throttle(Throttle(rate=10, max_concurrency=8))
+
+    """
+
+    def __init__(
+        self: Throttle,
+        rate: float | None = None,
+        burst: float = 1,
+        initial: float = 4,
+        max_concurrency: float = 32,
+    ) -> None:
+        """Start without hosts."""
+        if rate is not None and rate <= 0:
+            msg = f"rate must be positive, got {rate}"
+            raise ValueError(msg)
+        if not 1 <= initial <= max_concurrency:
+            msg = (
+                "Expected 1 <= initial <= max_concurrency, "
+                f"got {initial=} and {max_concurrency=}"
+            )
+            raise ValueError(msg)
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.initial = initial
+        self.max_concurrency = max_concurrency
+        self.hosts: dict[str, HostLimits] = {}
+        self._condition = threading.Condition()
+
+    def _host(self: Throttle, host: str) -> HostLimits:
+        limits = self.hosts.get(host)
+        if limits is None:
+            limits = self.hosts[host] = HostLimits(self.burst, self.initial)
+        return limits
+
+    def _token_wait(self: Throttle, limits: HostLimits) -> float:
+        """Take a token and return 0, or return the seconds to the next."""
+        if self.rate is None:
+            return 0.0
+        now = time.monotonic()
+        limits.tokens = min(
+            self.burst,
+            limits.tokens + (now - limits.updated) * self.rate,
+        )
+        limits.updated = now
+        if limits.tokens >= 1:
+            limits.tokens -= 1
+            return 0.0
+        return (1 - limits.tokens) / self.rate
+
+    def acquire(self: Throttle, host: str) -> None:
+        """Wait for a token and a free slot of `host`."""
+        with self._condition:
+            limits = self._host(host)
+            while True:
+                if limits.in_flight < int(limits.limit):
+                    wait = self._token_wait(limits)
+                    if not wait:
+                        limits.in_flight += 1
+                        limits.requests += 1
+                        return
+                    self._condition.wait(wait)
+                else:
+                    self._condition.wait()
+
+    def release(self: Throttle, host: str, *, overloaded: bool) -> None:
+        """Free the slot of `host` and adapt its concurrency limit."""
+        with self._condition:
+            limits = self._host(host)
+            limits.in_flight -= 1
+            if overloaded:
+                limits.overloads += 1
+                limits.limit = max(1.0, limits.limit / 2)
+            else:
+                limits.limit = min(
+                    self.max_concurrency,
+                    limits.limit + 1 / limits.limit,
+                )
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def limit(self: Throttle, host: str) -> Iterator[None]:
+        """Hold a slot of `host` during the `with` block.
+
+        Timeouts and HTTP errors with an `OVERLOAD_STATUS` decrease the
+        concurrency limit, the rest increase it.
+        """
+        self.acquire(host)
+        overloaded = False
+        try:
+            yield
+        except requests.exceptions.Timeout:
+            overloaded = True
+            raise
+        except requests.exceptions.HTTPError as err:
+            overloaded = (
+                err.response is not None
+                and err.response.status_code in OVERLOAD_STATUS
+            )
+            raise
+        finally:
+            self.release(host, overloaded=overloaded)
+
+    def stats(self: Throttle) -> pd.DataFrame:
+        """Return the limits of each host."""
+        with self._condition:
+            rows = {
+                host: {
+                    "limit": int(limits.limit),
+                    "in_flight": limits.in_flight,
+                    "requests": limits.requests,
+                    "overloads": limits.overloads,
+                }
+                for host, limits in self.hosts.items()
+            }
+        df = pd.DataFrame.from_dict(rows, orient="index")
+        df.index.name = "host"
+        return df
+
+
+_throttle: Throttle | None = None
+
+
+def get_throttle() -> Throttle | None:
+    """Return the throttle shared by all the requests, None if disabled."""
+    return _throttle
+
+
+def set_throttle(throttle: Throttle | None) -> None:
+    """Replace the throttle shared by all the requests, None disables it."""
+    global _throttle  # noqa: PLW0603
+    _throttle = throttle
+
+
+@contextlib.contextmanager
+def _throttled(host: str) -> Iterator[None]:
+    """Apply the limits of `host`, if any, to the `with` block."""
+    throttle = _throttle
+    if throttle is None:
+        yield
+        return
+    with throttle.limit(host):
+        yield
@@ -0,0 +1,279 @@
+"""Spatial tile cache for griddap subsets.
+
+Griddap requests are split on a fixed index grid per dataset and each tile
+is stored on disk as a compressed `npz` file. Arbitrary subsets are then
+assembled from the tiles and only the missing, or expired, tiles are
+downloaded.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from erddapy.core.cache import DEFAULT_TTL
+from erddapy.core.griddap import _griddap_index_url
+from erddapy.core.netcdf import _nc_dataset
+
+if TYPE_CHECKING:
+    import xarray as xr
+
+# Tile size, in number of points, of the dimensions not in `tile_shape`.
+DEFAULT_TILE_SIZE = 256
+
+# Keyword arguments of `to_xarray` that apply to the datasets built from
+# the tiles, the others need a regular request.
+_xarray_kwargs = {
+    "chunks",
+    "concat_characters",
+    "decode_coords",
+    "decode_timedelta",
+    "decode_times",
+    "drop_variables",
+    "mask_and_scale",
+    "use_cftime",
+}
+
+
+class TileCache:
+    """Cache griddap data as tiles of a fixed index grid on disk.
+
+    Args:
+    ----
+        directory: where the tiles are stored.
+        tile_shape: number of points of a tile in each dimension.
+            Defaults to one time step and 256 points in the others.
+        ttl: time-to-live, in seconds, of the tiles, like the metadata
+            cache. None keeps them forever.
+
+    Examples:
+    --------
+        >>> from erddapy.core.tiles import TileCache
+        >>> e.tile_cache = TileCache("~/.cache/erddapy/tiles")
+
+    """
+
+    def __init__(
+        self: TileCache,
+        directory: str | Path,
+        tile_shape: dict[str, int] | None = None,
+        ttl: float | None = DEFAULT_TTL,
+    ) -> None:
+        """Instantiate the cache in `directory`."""
+        self.directory = Path(directory).expanduser()
+        self.tile_shape = {"time": 1} if tile_shape is None else tile_shape
+        self.ttl = ttl
+
+    def _size(self: TileCache, dim: str) -> int:
+        return self.tile_shape.get(dim, DEFAULT_TILE_SIZE)
+
+    def _path(
+        self: TileCache,
+        server: str,
+        dataset_id: str,
+        variable: str,
+        tile: tuple[int, ...],
+    ) -> Path:
+        """Return the file of a variable's tile."""
+        server_hash = hashlib.shake_256(server.encode()).hexdigest(5)
+        name = ".".join(str(k) for k in tile)
+        return self.directory.joinpath(
+            server_hash,
+            dataset_id,
+            variable,
+            f"{name}.npz",
+        )
+
+    def _fresh(self: TileCache, path: Path) -> bool:
+        """Return True if the tile exists and has not expired."""
+        try:
+            modified = path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        return self.ttl is None or time.time() - modified <= self.ttl
+
+    def tiles(
+        self: TileCache,
+        indices: dict[str, tuple[int, int, int]],
+    ) -> list[tuple[int, ...]]:
+        """Return the tiles, as grid positions, overlapping `indices`."""
+        ranges = [
+            range(start // self._size(dim), stop // self._size(dim) + 1)
+            for dim, (start, _, stop) in indices.items()
+        ]
+        return list(itertools.product(*ranges))
+
+    def _tile_indices(
+        self: TileCache,
+        tile: tuple[int, ...],
+        sizes: dict[str, int],
+    ) -> dict[str, tuple[int, int, int]]:
+        """Return the index range, clipped to the axis, of a tile."""
+        indices = {}
+        for k, (dim, size) in zip(tile, sizes.items(), strict=True):
+            start = k * self._size(dim)
+            stop = min(start + self._size(dim), size) - 1
+            indices[dim] = (start, 1, stop)
+        return indices
+
+    def fetch(  # noqa: PLR0913
+        self: TileCache,
+        server: str,
+        dataset_id: str,
+        *,
+        variables: list[str] | tuple[str],
+        indices: dict[str, tuple[int, int, int]],
+        sizes: dict[str, int],
+        requests_kwargs: dict | None = None,
+    ) -> int:
+        """Download the missing, or expired, tiles of a request.
+
+        Returns the number of tiles downloaded.
+        """
+        downloaded = 0
+        for tile in self.tiles(indices):
+            missing = [
+                var
+                for var in variables
+                if not self._fresh(self._path(server, dataset_id, var, tile))
+            ]
+            if not missing:
+                continue
+            url = _griddap_index_url(
+                server,
+                dataset_id=dataset_id,
+                variables=missing,
+                indices=self._tile_indices(tile, sizes),
+                response="nc",
+            )
+            nc = _nc_dataset(url, requests_kwargs)
+            nc.set_auto_maskandscale(False)
+            for var in missing:
+                attrs = {k: nc[var].getncattr(k) for k in nc[var].ncattrs()}
+                _save_tile(
+                    self._path(server, dataset_id, var, tile),
+                    nc[var][:],
+                    attrs,
+                )
+            nc.close()
+            downloaded += 1
+        return downloaded
+
+    def assemble(
+        self: TileCache,
+        server: str,
+        dataset_id: str,
+        variable: str,
+        indices: dict[str, tuple[int, int, int]],
+    ) -> tuple[np.ndarray, dict]:
+        """Assemble a variable's array, and attributes, from the tiles."""
+        shape = tuple(stop - start + 1 for start, _, stop in indices.values())
+        data = None
+        attrs: dict = {}
+        for tile in self.tiles(indices):
+            values, attrs = _load_tile(
+                self._path(server, dataset_id, variable, tile),
+            )
+            if data is None:
+                data = np.empty(shape, dtype=values.dtype)
+            source, target = [], []
+            for k, (dim, (start, _, stop)) in zip(
+                tile,
+                indices.items(),
+                strict=True,
+            ):
+                tile_start = k * self._size(dim)
+                lower = max(start, tile_start)
+                upper = min(stop, tile_start + values.shape[len(source)] - 1)
+                source.append(
+                    slice(lower - tile_start, upper - tile_start + 1)
+                )
+                target.append(slice(lower - start, upper - start + 1))
+            data[tuple(target)] = values[tuple(source)]
+        return data, attrs
+
+
+def _save_tile(path: Path, values: np.ndarray, attrs: dict) -> None:
+    """Save a tile atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        with tmp.open("wb") as f:
+            np.savez_compressed(
+                f,
+                values=values,
+                attrs=json.dumps(attrs, default=_json_default),
+            )
+        tmp.replace(path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _load_tile(path: Path) -> tuple[np.ndarray, dict]:
+    """Load a tile and its variable attributes."""
+    with np.load(path) as npz:
+        return npz["values"], json.loads(str(npz["attrs"]))
+
+
+def _json_default(obj: np.generic | np.ndarray) -> object:
+    """Serialize the numpy attributes of netCDF variables."""
+    return obj.tolist()
+
+
+def _griddap_tiles_to_xarray(  # noqa: PLR0913
+    cache: TileCache,
+    *,
+    server: str,
+    dataset_id: str,
+    variables: list[str] | tuple[str],
+    indices: dict[str, tuple[int, int, int]],
+    axes: dict[str, np.ndarray],
+    axes_attrs: dict[str, dict] | None = None,
+    requests_kwargs: dict | None = None,
+    xarray_kwargs: dict | None = None,
+) -> xr.Dataset:
+    """Build a griddap request from the tile cache as a xarray Dataset.
+
+    Only the missing tiles are downloaded. The axes get the attributes
+    in `axes_attrs`, from the NcML metadata, and the variables are decoded
+    with the CF conventions like `to_xarray`. Only the `xarray_kwargs` in
+    `_xarray_kwargs` are supported.
+    """
+    import xarray as xr  # noqa: PLC0415
+
+    xarray_kwargs = dict(xarray_kwargs or {})
+    chunks = xarray_kwargs.pop("chunks", None)
+    sizes = {dim: axis.size for dim, axis in axes.items()}
+    cache.fetch(
+        server,
+        dataset_id,
+        variables=variables,
+        indices=indices,
+        sizes=sizes,
+        requests_kwargs=requests_kwargs,
+    )
+
+    coords = {}
+    for dim, (start, step, stop) in indices.items():
+        attrs = dict((axes_attrs or {}).get(dim, {}))
+        if dim == "time":
+            # `_griddap_get_axis` stores times as seconds since 1970.
+            attrs["units"] = "seconds since 1970-01-01T00:00:00Z"
+        coords[dim] = (dim, axes[dim][start : stop + 1 : step], attrs)
+
+    steps = tuple(slice(None, None, step) for _, step, _ in indices.values())
+    data_vars = {}
+    for var in variables:
+        data, attrs = cache.assemble(server, dataset_id, var, indices)
+        data_vars[var] = (list(indices), data[steps], attrs)
+    ds = xr.decode_cf(
+        xr.Dataset(data_vars=data_vars, coords=coords),
+        **xarray_kwargs,
+    )
+    return ds if chunks is None else ds.chunk(chunks)
@@ -0,0 +1,70 @@
+"""OpenTelemetry spans of the ERDDAP operations.
+
+When `opentelemetry-api` is installed erddapy creates spans for the URL
+building, the HTTP requests, the decoding of the responses, and the
+multiple server searches, nested in the caller's current span.
+Without it the spans are no-ops.
+
+The spans are named `erddapy.<operation>` and have the attributes
+`erddap.server`, `erddap.dataset_id`, `erddap.protocol`,
+`erddap.response`, and `erddap.payload_bytes` when they apply,
+and `url.full` and `http.response.status_code` for the requests.
+"""
+
+from __future__ import annotations
+
+import contextlib
+from typing import TYPE_CHECKING, Any
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from opentelemetry.trace import Span
+
+_tracer = None if trace is None else trace.get_tracer("erddapy")
+
+# Attributes with a name in the OpenTelemetry semantic conventions.
+_semantic_names = {
+    "url": "url.full",
+    "status": "http.response.status_code",
+}
+
+
+def _attributes(attributes: dict[str, Any]) -> dict[str, Any]:
+    """Name the attributes and drop the missing ones."""
+    return {
+        _semantic_names.get(key, f"erddap.{key}"): (
+            value
+            if isinstance(value, bool | int | float | str)
+            else str(value)
+        )
+        for key, value in attributes.items()
+        if value is not None
+    }
+
+
+@contextlib.contextmanager
+def _span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    """Trace the `with` block as the `erddapy.<name>` span.
+
+    Yields the span, or None when OpenTelemetry is not installed.
+    """
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(
+        f"erddapy.{name}",
+        attributes=_attributes(attributes),
+    ) as span:
+        yield span
+
+
+def _set_attributes(span: Span | None, **attributes: Any) -> None:
+    """Add attributes known after the span started, e.g. the payload size."""
+    if span is not None:
+        span.set_attributes(_attributes(attributes))
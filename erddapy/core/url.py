@@ -1,16 +1,28 @@
 """URL handling."""
 
+import contextlib
 import copy
 import datetime
 import functools
 import io
+import threading
+import time
 from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
 from typing import TYPE_CHECKING, Any, BinaryIO
 from urllib import parse
 
 import requests
 from pandas import to_datetime
 
+from erddapy.core.health import get_health_registry
+from erddapy.core.hooks import _emit_request
+from erddapy.core.profiling import _phase
+from erddapy.core.retry import _retrying, get_retry_policy
+from erddapy.core.throttle import _throttled
+from erddapy.core.tracing import _set_attributes, _span
+
 if TYPE_CHECKING:
     from xarray.backends.common import T_PathFileOrDataStore
 
@@ -104,22 +116,279 @@ def _clean_response(response: str) -> str:
     return response.lstrip(".")
 
 
+# Seconds to wait for the multiple server searches, adapted to each server.
+MULTI_SEARCH_TIMEOUT = 120
+
+
+def _report(url: str, *, final: bool = True, **event: Any) -> None:
+    """Emit the request event and add it to the health of the host.
+
+    Connection errors, timeouts, and 5xx responses count as failures.
+    Only the `final` attempt of a request is added to the health,
+    so the retries of one request do not open the circuit of the host.
+    """
+    status = event["status"]
+    ok = status is not None and status < 500  # noqa: PLR2004
+    if ok or final:
+        get_health_registry().record(
+            parse.urlparse(url).netloc,
+            event["ttfb"],
+            ok=ok,
+        )
+    _emit_request(url, **event)
+
+
+def _final(retries: int, err: Exception) -> bool:
+    """Return True if the attempt that raised `err` is not retried."""
+    return get_retry_policy().delay(retries, err) is None
+
+
+# Requests made by `_urlopen` in each thread, to tell the cache hits apart.
+_local = threading.local()
+
+
+def _get(
+    url: str,
+    retries: int,
+    timeout: float,
+    **kwargs: Any,
+) -> requests.Response:
+    """Make one attempt of the `_urlopen` request."""
+    start = time.perf_counter()
+    host = parse.urlparse(url).netloc
+    with (
+        _span("http", url=url, server=host, retries=retries) as span,
+        _throttled(host),
+    ):
+        try:
+            response = requests.get(
+                url,
+                allow_redirects=True,
+                timeout=timeout,
+                **kwargs,
+            )
+        except requests.exceptions.RequestException as err:
+            _report(
+                url,
+                status=None,
+                nbytes=0,
+                ttfb=0.0,
+                start=start,
+                retries=retries,
+                error=str(err),
+                final=_final(retries, err),
+            )
+            raise
+        event = {
+            "status": response.status_code,
+            "nbytes": len(response.content),
+            "ttfb": response.elapsed.total_seconds(),
+            "start": start,
+            "retries": retries,
+        }
+        _set_attributes(
+            span,
+            status=event["status"],
+            payload_bytes=event["nbytes"],
+        )
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as err:
+            msg = str(response.content.decode())
+            error = requests.exceptions.HTTPError(msg, response=response)
+            _report(url, **event, error=msg, final=_final(retries, error))
+            raise error from err
+        _report(url, **event)
+        return response
+
+
 @functools.lru_cache(maxsize=128)
 def _urlopen(url: str, auth: tuple | None = None, **kwargs: Any) -> BinaryIO:
     timeout = kwargs.pop("timeout", 60)
-    response = requests.get(
-        url,
-        allow_redirects=True,
-        auth=auth,
-        timeout=timeout,
-        **kwargs,
-    )
-    try:
-        response.raise_for_status()
-    except requests.exceptions.HTTPError as err:
-        msg = str(response.content.decode())
-        raise requests.exceptions.HTTPError(msg) from err
-    return io.BytesIO(response.content)
+    _local.requests = getattr(_local, "requests", 0) + 1
+    with _phase("fetch"):
+        response = _retrying(
+            lambda retries: _get(
+                url,
+                retries,
+                timeout,
+                auth=auth,
+                **kwargs,
+            ),
+        )
+        with _phase("copy"):
+            return io.BytesIO(response.content)
+
+
+def _is_no_results(err: Exception) -> bool:
+    """Return True if ERDDAP failed because the query matched no data."""
+    return isinstance(
+        err,
+        requests.exceptions.HTTPError,
+    ) and "no matching results" in str(err)
+
+
+@contextlib.contextmanager
+def _stream(
+    url: str,
+    retries: int,
+    timeout: float,
+    requests_kwargs: dict,
+) -> Iterator[requests.Response]:
+    """Make one attempt of the `_urlstream` request."""
+    start = time.perf_counter()
+    host = parse.urlparse(url).netloc
+    with (
+        _span("http", url=url, server=host, retries=retries) as span,
+        _throttled(host),
+    ):
+        try:
+            stream = requests.get(
+                url,
+                allow_redirects=True,
+                stream=True,
+                timeout=timeout,
+                **requests_kwargs,
+            )
+        except requests.exceptions.RequestException as err:
+            _report(
+                url,
+                status=None,
+                nbytes=0,
+                ttfb=0.0,
+                start=start,
+                retries=retries,
+                error=str(err),
+                final=_final(retries, err),
+            )
+            raise
+        with stream as response:
+            error = None
+            final = True
+            try:
+                try:
+                    response.raise_for_status()
+                except requests.exceptions.HTTPError as err:
+                    msg = str(response.content.decode())
+                    http_error = requests.exceptions.HTTPError(
+                        msg,
+                        response=response,
+                    )
+                    # Opening the response is retried, reading it is not.
+                    final = _final(retries, http_error)
+                    raise http_error from err
+                yield response
+            except Exception as err:
+                error = str(err)
+                raise
+            finally:
+                # Reported when the content was read, or abandoned.
+                nbytes = response.raw.tell()
+                _set_attributes(
+                    span,
+                    status=response.status_code,
+                    payload_bytes=nbytes,
+                )
+                _report(
+                    url,
+                    status=response.status_code,
+                    nbytes=nbytes,
+                    ttfb=response.elapsed.total_seconds(),
+                    start=start,
+                    retries=retries,
+                    error=error,
+                    final=final,
+                )
+
+
+@contextlib.contextmanager
+def _urlstream(
+    url: str,
+    requests_kwargs: dict | None = None,
+) -> Iterator[requests.Response]:
+    """Open a streaming response to read the content as it arrives.
+
+    Errors are raised with ERDDAP's message, like in `urlopen`.
+    Opening the response is retried, see `erddapy.core.retry`,
+    the errors while reading the content are left to the caller.
+    """
+    requests_kwargs = dict(requests_kwargs or {})
+    timeout = requests_kwargs.pop("timeout", 60)
+    url = quote_url(url)
+    with _phase("fetch"), contextlib.ExitStack() as stack:
+        yield _retrying(
+            lambda retries: stack.enter_context(
+                _stream(url, retries, timeout, requests_kwargs),
+            ),
+        )
+
+
+def _urlretrieve(
+    url: str,
+    file_name: str | Path,
+    requests_kwargs: dict | None = None,
+) -> Path:
+    """Stream the URL content to `file_name` without buffering it in memory.
+
+    Downloads cut by a retryable error are resumed with a `Range` request.
+    The resumed part is only appended when the server answers with it,
+    for the same version of the content, otherwise the download restarts.
+    """
+    requests_kwargs = dict(requests_kwargs or {})
+    headers = dict(requests_kwargs.pop("headers", None) or {})
+    policy = get_retry_policy()
+    validator = None
+    with Path(file_name).open("wb") as f:
+        retries = 0
+        while True:
+            resume: dict[str, str] = {}
+            if f.tell():
+                resume["Range"] = f"bytes={f.tell()}-"
+                if validator:
+                    resume["If-Range"] = validator
+            reading = False
+            try:
+                with _urlstream(
+                    url,
+                    {**requests_kwargs, "headers": {**headers, **resume}},
+                ) as response:
+                    reading = True
+                    if response.status_code != requests.codes.partial_content:
+                        f.seek(0)
+                        f.truncate()
+                    validator = _validator(response)
+                    f.writelines(
+                        response.iter_content(chunk_size=1024 * 1024),
+                    )
+            except requests.exceptions.RequestException as err:
+                # Opening the response was already retried by `_urlstream`.
+                delay = policy.delay(retries, err) if reading else None
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                retries += 1
+            else:
+                return Path(file_name)
+
+
+def _validator(response: requests.Response) -> str | None:
+    """Return the validator of the content for a `If-Range` header.
+
+    Weak ETags cannot be used, the Last-Modified date is used instead.
+    """
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _urliterlines(
+    url: str,
+    requests_kwargs: dict | None = None,
+) -> Iterator[bytes]:
+    """Yield the lines of the URL content as they arrive."""
+    with _urlstream(url, requests_kwargs) as response:
+        yield from response.iter_lines(chunk_size=64 * 1024)
 
 
 def urlopen(
@@ -149,7 +418,18 @@ def urlopen(
         requests_kwargs = {}
     if quote:
         url = quote_url(url)
+    made = getattr(_local, "requests", 0)
+    start = time.perf_counter()
     data = _urlopen(url, **requests_kwargs)
+    if getattr(_local, "requests", 0) == made:
+        _emit_request(
+            url,
+            status=None,
+            nbytes=data.getbuffer().nbytes,
+            ttfb=0.0,
+            start=start,
+            cache_hit=True,
+        )
     data.seek(0)
     return data
 
@@ -196,9 +476,18 @@ def _format_search_string(server: str, query: str) -> str:
 
 
 def _multi_urlopen(url: str) -> BinaryIO | None:
-    """Simpler URL openner to work with multiprocessing."""
+    """Simpler URL openner to work with multiprocessing.
+
+    Servers that have been failing are skipped, and the timeout adapts
+    to the latency of each server, see `erddapy.core.health`.
+    """
+    host = parse.urlparse(url).netloc
+    health = get_health_registry()
+    if not health.available(host):
+        return None
+    timeout = health.timeout(host, MULTI_SEARCH_TIMEOUT)
     try:
-        data = urlopen(url, requests_kwargs={"timeout": 120})
+        data = urlopen(url, requests_kwargs={"timeout": timeout})
     except (
         requests.exceptions.HTTPError,
         requests.exceptions.ConnectionError,
@@ -228,6 +517,19 @@ def _format_constraints_url(kwargs: dict) -> str:
     return "".join([f"&{k}{v}" for k, v in kwargs.items()])
 
 
+# The valid operators are =, != (not equals),
+# =~ (a regular expression test), <, <=, >, and >=
+_time_operators = (
+    "time=",
+    "time!=",
+    "time=~",
+    "time<",
+    "time<=",
+    "time>",
+    "time>=",
+)
+
+
 def _check_substrings(constraint: str) -> bool:
     """Extend the OPeNDAP with extra strings."""
     # The `now` doesn't need this check, it works both quoted and unquoted.
@@ -571,18 +873,7 @@ def get_download_url(  # noqa: PLR0913
         for k, v in _constraints.items():
             if _check_substrings(v):
                 continue
-            # The valid operators are =, != (not equals),
-            # =~ (a regular expression test), <, <=, >, and >=
-            valid_time_constraints = (
-                "time=",
-                "time!=",
-                "time=~",
-                "time<",
-                "time<=",
-                "time>",
-                "time>=",
-            )
-            if k.startswith(valid_time_constraints):
+            if k.startswith(_time_operators):
                 _constraints.update({k: parse_dates(v)})
         _constraints = _quote_string_constraints(_constraints)
         _constraints_url = _format_constraints_url(_constraints)
@@ -2,27 +2,104 @@
 
 from __future__ import annotations
 
+import copy
 import functools
 import hashlib
+import itertools
+import math
+import threading
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
-from urllib.request import urlretrieve
+from typing import TYPE_CHECKING, Any, TypeVar
 
 import pandas as pd
+import requests
 
+from erddapy.core.cache import (
+    ResultCache,
+    TimePartitionCache,
+    get_metadata_cache,
+)
+from erddapy.core.chunked import (
+    _chunk_grid,
+    _chunk_region,
+    _fetch_piece,
+    _load_progress,
+    _save_progress,
+    _zarr_chunks,
+    _zarr_template,
+)
+from erddapy.core.constraints import _select_columns
+from erddapy.core.dods import _dds_schema, _parse_dds
+from erddapy.core.formats import (
+    _auto_responses,
+    _auto_xarray_response,
+    _strip_units,
+)
 from erddapy.core.griddap import (
+    _griddap_cached_axis,
     _griddap_check_constraints,
     _griddap_check_variables,
-    _griddap_get_constraints,
+    _griddap_constraints_from_metadata,
+    _griddap_get_axis,
+    _griddap_get_metadata,
+    _griddap_index_url,
+    _griddap_resolve_indices,
+    _griddap_shape,
+)
+from erddapy.core.interfaces import (
+    _applies_to_frame,
+    _apply_pandas_kwargs,
+    to_iris,
+    to_ncCF,
+    to_pandas,
+    to_records,
+    to_xarray,
+)
+from erddapy.core.nccsv import _info_attributes
+from erddapy.core.parquet import (
+    _incremental_constraints,
+    _partition_name,
+    _query_key,
+    _stored_max_time,
+    _time_column,
+    _time_constraints,
+    _write_partition,
+)
+from erddapy.core.planner import (
+    MAX_REQUEST_BYTES,
+    RequestPlan,
+    SizeEstimate,
+    _griddap_estimate,
+    _griddap_split_constraints,
+    _isoformat,
+    _split_time_constraints,
+    _tabledap_estimate,
+    _to_number,
+)
+from erddapy.core.profiling import _profiled
+from erddapy.core.split import (
+    _merge_datasets,
+    _merge_frames,
+    _merge_text_files,
+    _split_fetch,
+    _text_header_lines,
 )
-from erddapy.core.interfaces import to_iris, to_ncCF, to_pandas, to_xarray
+from erddapy.core.tiles import (
+    TileCache,
+    _griddap_tiles_to_xarray,
+)
+from erddapy.core.tiles import _xarray_kwargs as _tile_xarray_kwargs
+from erddapy.core.tracing import _span
 from erddapy.core.url import (
     _check_substrings,
     _clean_response,
     _distinct,
     _format_constraints_url,
+    _is_no_results,
     _is_url,
     _sort_url,
+    _time_operators,
+    _urlretrieve,
     download_formats,
     get_categorize_url,
     get_download_url,
@@ -44,10 +121,36 @@ __all__ = [
 ]
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
     import iris.cube
     import netCDF4.Dataset
+    import numpy as np
     import xarray as xr
 
+    from erddapy.core.replicas import Replicas
+    from erddapy.mirror import Mirror
+
+T = TypeVar("T")
+
+
+def _replicated(method: Callable[..., T]) -> Callable[..., T]:
+    """Send the calls to the fastest of the `replicas`, when set."""
+
+    @functools.wraps(method)
+    def wrapper(self: ERDDAP, *args: Any, **kwargs: Any) -> T:
+        if self.replicas is None:
+            return method(self, *args, **kwargs)
+        return self.replicas.fetch(
+            lambda server, dataset_id: method(
+                self._at(server, dataset_id),
+                *args,
+                **kwargs,
+            ),
+        )
+
+    return wrapper
+
 
 class ERDDAP:
     """Creates an ERDDAP instance for a specific server endpoint.
@@ -64,6 +167,16 @@ class ERDDAP:
         response: default is HTML.
         constraints: download constraints, default None (opendap-like url)
         params and requests_kwargs: `requests.get` options
+        max_split_depth: how many times requests that are too big for the
+            server are bisected and retried, default 3 (0 disables it).
+        partition_cache: a `TimePartitionCache` to store `to_pandas` results
+            as time partitions and fetch only the missing time intervals.
+        result_cache: a `ResultCache` to answer `to_pandas` requests
+            contained in a cached one by filtering it locally.
+        tile_cache: a `TileCache` to assemble griddap `to_xarray` requests
+            from tiles stored on disk and download only the missing tiles.
+        mirror: a local parquet `Mirror` of the dataset, `to_pandas` reads
+            the requests it covers from it instead of the server.
 
     Returns:
     -------
@@ -132,18 +245,32 @@ class ERDDAP:
         self.server_functions: dict | None = None
         self.requests_kwargs: dict = {}
         self.auth: tuple | None = None
+        # Requests that are too big for the server are bisected and retried,
+        # up to this many times. Use 0 to disable it.
+        self.max_split_depth: int = 3
+        # Optional caches of tabledap results, see `erddapy.core.cache`.
+        self.partition_cache: TimePartitionCache | None = None
+        self.result_cache: ResultCache | None = None
+        # Optional cache of griddap tiles, see `erddapy.core.tiles`.
+        self.tile_cache: TileCache | None = None
+        # Optional local copy of a tabledap dataset, see `erddapy.mirror`.
+        self.mirror: Mirror | None = None
+        # Optional copies of the dataset on other servers, the data requests
+        # go to the fastest one, see `erddapy.core.replicas`.
+        self.replicas: Replicas | None = None
+
+        # Griddap metadata is loaded lazily, on first use, after setting a
+        # dataset_id. Values set by the user before that are preserved.
+        self._griddap_pending = False
+        self._griddap_user_set: set[str] = set()
 
         self.constraints: dict | None = None
         self.variables: list[str] | tuple[str] | None = None
         self.dim_names: list[str] | tuple[str] | None = None
 
-        self._get_variables = functools.lru_cache(maxsize=128)(
-            self._get_variables_uncached,
-        )
-        # Caching the last dataset_id and variables list request for
-        # quicker access, will be overridden when requesting a new dataset_id.
+        # The variables metadata is cached in `erddapy.core.cache`,
+        # shared by all instances, and keyed by (server, dataset_id).
         self._dataset_id: str | None = None
-        self._variables: dict = {}
 
     @property
     def dataset_id(self) -> str | None:
@@ -153,7 +280,63 @@ class ERDDAP:
     @dataset_id.setter
     def dataset_id(self, value: str) -> None:
         self._dataset_id = value
-        self.griddap_initialize(dataset_id=value)
+        self._griddap_pending = True
+        self._griddap_user_set = set()
+
+    @property
+    def constraints(self) -> dict | None:
+        """Constraints property."""
+        self._griddap_lazy_load()
+        return self._constraints
+
+    @constraints.setter
+    def constraints(self, value: dict | None) -> None:
+        self._constraints = value
+        self._griddap_user_set.add("constraints")
+
+    @property
+    def variables(self) -> list[str] | tuple[str] | None:
+        """Variables property."""
+        self._griddap_lazy_load()
+        return self._variables
+
+    @variables.setter
+    def variables(self, value: list[str] | tuple[str] | None) -> None:
+        self._variables = value
+        self._griddap_user_set.add("variables")
+
+    @property
+    def dim_names(self) -> list[str] | tuple[str] | None:
+        """dim_names property."""
+        self._griddap_lazy_load()
+        return self._dim_names
+
+    @dim_names.setter
+    def dim_names(self, value: list[str] | tuple[str] | None) -> None:
+        self._dim_names = value
+        self._griddap_user_set.add("dim_names")
+
+    def _griddap_lazy_load(self: ERDDAP) -> None:
+        """Initialize griddap metadata on first use after a new dataset_id.
+
+        Only constraints, variables, and dim_names that were not set by the
+        user after the dataset_id assignment are replaced.
+        """
+        if (
+            not self._griddap_pending
+            or self._dataset_id is None
+            or self.protocol != "griddap"
+            or self.response == "opendap"
+        ):
+            return
+        self._griddap_pending = False
+        user_values = {
+            name: getattr(self, f"_{name}") for name in self._griddap_user_set
+        }
+        self.griddap_initialize()
+        for name, value in user_values.items():
+            setattr(self, f"_{name}", value)
+        self._griddap_user_set = set(user_values)
 
     def griddap_initialize(
         self: ERDDAP,
@@ -162,6 +345,9 @@ class ERDDAP:
     ) -> None:
         """Fetch metadata of dataset and initialize constraints and variables.
 
+        The NcML metadata is cached per server and dataset_id, calling this
+        method again, e.g. to reset the constraints, does not re-download it.
+
         Args:
         ----
         dataset_id: a dataset unique id.
@@ -176,14 +362,155 @@ class ERDDAP:
         if dataset_id is None:
             raise ValueError(msg)
 
-        metadata_url = f"{self.server}/griddap/{self.dataset_id}"
+        metadata = _griddap_get_metadata(self.server, dataset_id)
         (
+            self._constraints,
+            self._dim_names,
+            self._variables,
+        ) = _griddap_constraints_from_metadata(metadata, step)
+        self._constraints_original = self._constraints.copy()
+        self._variables_original = self._variables.copy()
+        self._griddap_pending = False
+        self._griddap_user_set = set()
+
+    def griddap_axes(self: ERDDAP) -> dict[str, np.ndarray]:
+        """Return the coordinate values of each griddap dimension.
+
+        The axes are downloaded once, with a small axis only griddap request,
+        and cached per server, dataset_id, and dimension.
+        """
+        if self.protocol != "griddap":
+            msg = f"Axes are only available for griddap, got {self.protocol}"
+            raise ValueError(msg)
+        return {
+            dim: _griddap_get_axis(self.server, self.dataset_id, dim)
+            for dim in self.dim_names
+        }
+
+    def griddap_indices(self: ERDDAP) -> dict[str, tuple[int, int, int]]:
+        """Resolve the griddap value constraints to index ranges locally.
+
+        Returns
+        -------
+            indices: (start, step, stop) for each dimension,
+            using ERDDAP's closest value rule.
+
+        """
+        return _griddap_resolve_indices(
             self.constraints,
             self.dim_names,
-            self.variables,
-        ) = _griddap_get_constraints(metadata_url, step)
-        self._constraints_original = self.constraints.copy()
-        self._variables_original = self.variables.copy()
+            self.griddap_axes(),
+        )
+
+    def griddap_shape(self: ERDDAP) -> dict[str, int]:
+        """Return the exact shape of the griddap request before downloading."""
+        return _griddap_shape(self.griddap_indices())
+
+    def get_griddap_index_url(
+        self: ERDDAP,
+        response: str | None = None,
+    ) -> str:
+        """Build an index based griddap download URL.
+
+        Same as `get_download_url` but with the value constraints resolved
+        locally to indices, so the server does not need to resolve them.
+        """
+        response = _clean_response(response or self.response)
+        return _griddap_index_url(
+            self.server,
+            dataset_id=self.dataset_id,
+            variables=self.variables,
+            indices=self.griddap_indices(),
+            response=response,
+        )
+
+    def estimate_size(
+        self: ERDDAP,
+        response: str | None = None,
+        *,
+        exact: bool = False,
+    ) -> SizeEstimate:
+        """Predict the size of the current request before downloading it.
+
+        For griddap the estimate uses the dimensions lengths, ranges,
+        and steps, from the cached NcML metadata, and no data is requested.
+        With `exact=True` the axes are downloaded to get the exact shape.
+
+        For tabledap a cheap `orderByCount("")` request, with the same
+        variables and constraints, counts the rows.
+
+        Args:
+        ----
+            response: the response format to estimate, default is `response`.
+            exact: griddap only, resolve the shape with the axes values.
+
+        Returns:
+        -------
+            estimate: rows, cells, and the approximate size in bytes.
+
+        """
+        response = _clean_response(response or self.response)
+        if self.protocol == "griddap":
+            metadata = _griddap_get_metadata(self.server, self.dataset_id)
+            return _griddap_estimate(
+                metadata,
+                constraints=self.constraints,
+                dim_names=self.dim_names,
+                variables=self.variables,
+                response=response,
+                shape=self.griddap_shape() if exact else None,
+                axes={
+                    dim: _griddap_cached_axis(
+                        self.server, self.dataset_id, dim
+                    )
+                    for dim in self.dim_names
+                },
+            )
+
+        url = self.get_download_url(response="csv")
+        url = f'{url}&orderByCount("")'
+        data = urlopen(url, requests_kwargs=self.requests_kwargs)
+        # The first row of an ERDDAP csv response has the units.
+        counts = pd.read_csv(data, skiprows=[1]).iloc[0]
+        return _tabledap_estimate(
+            {k: int(v) for k, v in counts.items()},
+            response,
+        )
+
+    def plan_request(
+        self: ERDDAP,
+        max_bytes: int = MAX_REQUEST_BYTES,
+        response: str | None = None,
+    ) -> RequestPlan:
+        """Plan how to fetch the current request.
+
+        Requests estimated to be larger than `max_bytes` are split in
+        time windows (tabledap and griddap) or in tiles (griddap datasets
+        without enough time steps).
+
+        Returns
+        -------
+            plan: the strategy, the constraints of each piece,
+            and the size estimate.
+
+        """
+        estimate = self.estimate_size(response=response)
+        constraints = self.constraints or {}
+        if estimate.nbytes <= max_bytes:
+            return RequestPlan("single", [constraints], estimate)
+
+        pieces = math.ceil(estimate.nbytes / max_bytes)
+        if self.protocol == "griddap":
+            strategy, split = _griddap_split_constraints(
+                constraints,
+                self.griddap_indices(),
+                self.griddap_axes(),
+                pieces,
+            )
+        else:
+            split = _split_time_constraints(constraints, pieces)
+            strategy = "time-split" if len(split) > 1 else "single"
+        return RequestPlan(strategy, split, estimate)
 
     def get_search_url(
         self: ERDDAP,
@@ -360,29 +687,41 @@ class ERDDAP:
             msg = f"Please specify a valid `protocol`, got {protocol}"
             raise ValueError(msg)
 
-        if (
-            protocol == "griddap"
-            and constraints is not None
-            and variables is not None
-            and dim_names is not None
-        ):
-            # Check that dimensions, constraints,
-            # and variables are valid for this dataset.
-
-            _griddap_check_constraints(constraints, self._constraints_original)
-            _griddap_check_variables(variables, self._variables_original)
-
-        return get_download_url(
-            self.server,
+        with _span(
+            "url",
+            server=self.server,
             dataset_id=dataset_id,
             protocol=protocol,
-            variables=variables,
-            dim_names=dim_names,
             response=response,
-            constraints=constraints,
-            distinct=distinct,
-        )
+        ):
+            if (
+                protocol == "griddap"
+                and constraints is not None
+                and variables is not None
+                and dim_names is not None
+            ):
+                # Check that dimensions, constraints,
+                # and variables are valid for this dataset.
+                self._griddap_lazy_load()
+                _griddap_check_constraints(
+                    constraints,
+                    self._constraints_original,
+                )
+                _griddap_check_variables(variables, self._variables_original)
+
+            return get_download_url(
+                self.server,
+                dataset_id=dataset_id,
+                protocol=protocol,
+                variables=variables,
+                dim_names=dim_names,
+                response=response,
+                constraints=constraints,
+                distinct=distinct,
+            )
 
+    @_profiled
+    @_replicated
     def to_pandas(
         self: ERDDAP,
         requests_kwargs: dict | None = None,
@@ -396,6 +735,20 @@ class ERDDAP:
         This method uses the .csvp [1] response as the default for simplicity,
         please check ERDDAP's docs for the other csv options available.
 
+        With `response="nccsv"` the variables attributes are read from the
+        same response and attached to `df.attrs`. When all the variables
+        are requested they are also stored in the metadata cache, with the
+        time attributes converted to the units of the info response.
+
+        With `response="auto"` the most efficient format supported by the
+        server and by the installed decoders is used: parquet, then nc,
+        then csvp. Small griddap requests, estimated from the NcML metadata,
+        and requests with `pandas.read_csv` kwargs use csvp. The columns
+        are named after the variables, without the units.
+
+        With `replicas` set the request goes to the fastest server with the
+        dataset, and to the next ones if it fails.
+
         [1] Download a ISO-8859-1 .csv file with line 1: name (units).
             Times are ISO 8601 strings.
 
@@ -404,16 +757,285 @@ class ERDDAP:
         """
         response = kw.pop("response", "csvp")
         distinct = kw.pop("distinct", False)
-        url = self.get_download_url(
-            response=str(response),
-            distinct=bool(distinct),
+
+        def fetch(
+            constraints: dict | None,
+            pandas_kwargs: dict | None = None,
+            file_type: str = str(response),
+        ) -> pd.DataFrame:
+            url = self.get_download_url(
+                response=file_type,
+                distinct=bool(distinct),
+                constraints=constraints,
+            )
+            return to_pandas(
+                url,
+                requests_kwargs=requests_kwargs,
+                pandas_kwargs=pandas_kwargs,
+            )
+
+        if (
+            self.mirror is not None
+            and (self.mirror.server, self.mirror.dataset_id)
+            == (self.server, self.dataset_id)
+            and (response == "csvp" and not distinct)
+            and _applies_to_frame(kw)
+        ):
+            df = self.mirror.read(self.variables, self.constraints)
+            if df is not None:
+                return _apply_pandas_kwargs(df, kw)
+
+        if (
+            self.result_cache is not None or self.partition_cache is not None
+        ) and (response == "csvp" and not distinct and _applies_to_frame(kw)):
+            df = self._to_pandas_cached(fetch)
+            if df is not None:
+                return _apply_pandas_kwargs(df, kw)
+
+        responses = [str(response)]
+        if response == "auto":
+            responses = (
+                ["csvp"] if kw else self._auto_responses(requests_kwargs)
+            )
+        file_type, frames = self._fetch_first_format(
+            functools.partial(fetch, pandas_kwargs=kw),
+            responses,
         )
-        return to_pandas(
+        df = frames[0] if len(frames) == 1 else _merge_frames(frames)
+        if response == "auto" and file_type == "csvp":
+            df = _strip_units(df)
+        if file_type == "nccsv" and not self.variables and df.attrs:
+            # All the variables metadata came with the data, skip the info
+            # request of `get_var_by_attr` and friends.
+            get_metadata_cache().set(
+                self.server,
+                self.dataset_id,
+                "variables",
+                _info_attributes(df.attrs),
+            )
+        return df
+
+    def _auto_responses(
+        self: ERDDAP,
+        requests_kwargs: dict | None = None,
+    ) -> list[str]:
+        """Return the formats `to_pandas` tries with `response="auto"`."""
+        nbytes = None
+        if self.protocol == "griddap":
+            # Free for griddap, tabledap would need an extra request.
+            try:
+                nbytes = self.estimate_size(response="nc").nbytes
+            except ValueError:
+                # Bounds the estimator cannot resolve locally, e.g. `last-1`.
+                nbytes = None
+        return _auto_responses(
+            self.server,
+            self.protocol,
+            nbytes,
+            requests_kwargs,
+        )
+
+    def _fetch_first_format(
+        self: ERDDAP,
+        fetch: Callable[..., T],
+        responses: list[str],
+    ) -> tuple[str, list[T]]:
+        """Fetch with the first of `responses` that the server accepts.
+
+        Returns the response used and the fetched pieces.
+        """
+        *fallbacks, last = responses
+        for response in fallbacks:
+            try:
+                pieces = self._split_fetch(
+                    functools.partial(fetch, file_type=response),
+                )
+            except requests.exceptions.HTTPError as err:
+                if _is_no_results(err):
+                    raise
+            else:
+                return response, pieces
+        return last, self._split_fetch(
+            functools.partial(fetch, file_type=last)
+        )
+
+    def to_records(
+        self: ERDDAP,
+        response: str = "jsonlKVP",
+        requests_kwargs: dict | None = None,
+        *,
+        distinct: bool = False,
+    ) -> Iterator[tuple | dict]:
+        """Stream the data request one record at a time.
+
+        The response is parsed line by line while it is downloaded, so the
+        first record is available before the download ends and memory use
+        does not grow with the size of the request.
+
+        Args:
+        ----
+            response: jsonlKVP, the default, yields a dictionary per record.
+                jsonlCSV and jsonlCSV1 yield tuples in the variables order.
+            requests_kwargs: kwargs to be passed to urlopen method.
+            distinct: return only the distinct records.
+
+        """
+        if response not in ("jsonlCSV", "jsonlCSV1", "jsonlKVP"):
+            msg = (
+                f"Records need a jsonlCSV or jsonlKVP response, got {response}"
+            )
+            raise ValueError(msg)
+        url = self.get_download_url(response=response, distinct=distinct)
+        return to_records(
             url,
-            requests_kwargs=requests_kwargs,
-            pandas_kwargs={**kw},
+            requests_kwargs={"auth": self.auth, **(requests_kwargs or {})},
+        )
+
+    def _to_pandas_cached(
+        self: ERDDAP,
+        fetch: Callable[[dict | None], pd.DataFrame],
+    ) -> pd.DataFrame | None:
+        """Answer the request from the result or partition caches.
+
+        Returns None if the request cannot be cached.
+        """
+        key = (
+            self.server,
+            self.dataset_id,
+            tuple(sorted(self.variables or [])),
         )
+        if self.result_cache is not None:
+            df = self.result_cache.get(key, self.constraints)
+            if df is not None:
+                # Cached under the sorted variables, in any order.
+                return _select_columns(df, self.variables)
+
+        df = None
+        if self.partition_cache is not None:
+            df = self._to_pandas_partitioned(fetch)
+        if df is None and self.result_cache is not None:
+            df = _merge_frames(self._split_fetch(fetch))
+        if df is not None and self.result_cache is not None:
+            self.result_cache.add(key, self.constraints, df)
+            # The cached frame must not change if the user modifies it.
+            df = df.copy()
+        if df is not None:
+            df = _select_columns(df, self.variables)
+        return df
+
+    def _to_pandas_partitioned(
+        self: ERDDAP,
+        fetch: Callable[[dict | None], pd.DataFrame],
+    ) -> pd.DataFrame | None:
+        """Fetch the missing time intervals and assemble the rest locally.
 
+        Returns None if the request cannot use the partition cache,
+        it requires absolute `time>=` and `time<=` constraints and
+        the time variable.
+        """
+        constraints = self.constraints or {}
+        variables = self.variables or []
+        if variables and "time" not in variables:
+            return None
+        time_keys = {k for k in constraints if k in _time_operators}
+        if time_keys != {"time>=", "time<="} or any(
+            _check_substrings(constraints[k]) or "now" in str(constraints[k])
+            for k in time_keys
+        ):
+            return None
+        start = _to_number(constraints["time>="])
+        stop = _to_number(constraints["time<="])
+
+        fixed = {k: v for k, v in constraints.items() if k not in time_keys}
+        key = (
+            self.server,
+            self.dataset_id,
+            tuple(sorted(variables)),
+            tuple(sorted((k, str(v)) for k, v in fixed.items())),
+        )
+        cache = self.partition_cache
+        for gap_start, gap_stop, closed_start, closed_stop in cache.missing(
+            key,
+            start,
+            stop,
+        ):
+            gap = {
+                **fixed,
+                "time>=" if closed_start else "time>": _isoformat(gap_start),
+                "time<=" if closed_stop else "time<": _isoformat(gap_stop),
+            }
+            try:
+                df = _merge_frames(self._split_fetch(fetch, constraints=gap))
+            except requests.exceptions.HTTPError as err:
+                if not _is_no_results(err):
+                    raise
+                df = pd.DataFrame()
+            column = _time_column(df) if not df.empty else ""
+            cache.add(key, gap_start, gap_stop, df, column)
+        return cache.assemble(key, start, stop)
+
+    def fetch_incremental(
+        self: ERDDAP,
+        store_path: str | Path,
+        requests_kwargs: dict | None = None,
+    ) -> pd.DataFrame:
+        """Append the rows newer than the ones stored in a parquet dataset.
+
+        The first call fetches the current request.
+        The next calls replace the lower time constraint with `time>` the
+        last time stored for the same variables and non-time constraints,
+        fetch only the new rows, and append them as a new partition.
+        Partitions are written atomically and named after the last time
+        they store, so an interrupted call does not corrupt the dataset.
+
+        The stored data can be read with `pandas.read_parquet(store_path)`.
+
+        Args:
+        ----
+            store_path: the parquet dataset directory.
+            requests_kwargs: kwargs to be passed to urlopen method.
+
+        Returns:
+        -------
+            df: the new rows, empty if there were none.
+
+        """
+        if self.protocol != "tabledap":
+            msg = f"Incremental fetch requires tabledap, got {self.protocol}"
+            raise ValueError(msg)
+        store = Path(store_path)
+        fixed = {
+            k: v
+            for k, v in (self.constraints or {}).items()
+            if k not in _time_constraints
+        }
+        key = _query_key(
+            f"{self.server}/{self.dataset_id}"
+            f"?{sorted(self.variables or [])}&{sorted(fixed.items())}",
+        )
+        constraints = _incremental_constraints(
+            self.constraints,
+            _stored_max_time(store, key),
+        )
+        url = self.get_download_url(response="csvp", constraints=constraints)
+        try:
+            df = to_pandas(url, requests_kwargs=requests_kwargs)
+        except requests.exceptions.HTTPError as err:
+            if not _is_no_results(err):
+                raise
+            return pd.DataFrame()
+        if df.empty:
+            return df
+
+        column = _time_column(df)
+        df[column] = pd.to_datetime(df[column], utc=True)
+        _write_partition(
+            df,
+            store.joinpath(_partition_name(key, df[column].max())),
+        )
+        return df
+
+    @_profiled
     def to_ncCF(  # noqa: N802
         self: ERDDAP,
         protocol: str | None = None,
@@ -425,6 +1047,8 @@ class ERDDAP:
         url = self.get_download_url(response="ncCF", distinct=bool(distinct))
         return to_ncCF(url, protocol=protocol, requests_kwargs={**kw})
 
+    @_profiled
+    @_replicated
     def to_xarray(
         self: ERDDAP,
         requests_kwargs: dict | None = None,
@@ -433,26 +1057,134 @@ class ERDDAP:
         """Load the data request into a xarray.Dataset.
 
         Accepts any `xr.open_dataset` keyword arguments.
+        With `e.response = "dods"` the binary DAP2 response is decoded with
+        NumPy and netCDF is not needed.
+        With `e.response = "auto"` netCDF is used when netCDF4 is installed,
+        dods otherwise.
+        With `replicas` set the request goes to the fastest server with the
+        dataset, and to the next ones if it fails.
         """
-        if self.response == "opendap":
-            response = "opendap"
+        if self.response in ("opendap", "dods"):
+            response = self.response
+        elif self.response == "auto":
+            response = _auto_xarray_response(self.protocol)
         elif self.protocol == "griddap":
             response = "nc"
         else:
             response = "ncCF"
         distinct = kw.pop("distinct", False)
-        url = self.get_download_url(response=response, distinct=bool(distinct))
         if requests_kwargs:
             requests_kwargs = {"auth": self.auth, **requests_kwargs}
         else:
             requests_kwargs = {"auth": self.auth}
-        return to_xarray(
-            url,
-            response,
-            requests_kwargs,
-            xarray_kwargs={**kw},
-        )
 
+        def fetch(constraints: dict | None) -> xr.Dataset:
+            url = self.get_download_url(
+                response=response,
+                distinct=bool(distinct),
+                constraints=constraints,
+            )
+            return to_xarray(
+                url,
+                response,
+                requests_kwargs,
+                xarray_kwargs={**kw},
+            )
+
+        if response == "opendap":
+            return fetch(None)
+        if (
+            self.tile_cache is not None
+            and self.protocol == "griddap"
+            and set(kw) <= _tile_xarray_kwargs
+        ):
+            indices = self.griddap_indices()
+            # Tiles are stored at full resolution, strided requests would
+            # download more than the plain request.
+            if all(step == 1 for _, step, _ in indices.values()):
+                metadata = _griddap_get_metadata(self.server, self.dataset_id)
+                return _griddap_tiles_to_xarray(
+                    self.tile_cache,
+                    server=self.server,
+                    dataset_id=self.dataset_id,
+                    variables=self.variables,
+                    indices=indices,
+                    axes=self.griddap_axes(),
+                    axes_attrs=metadata.get("attributes"),
+                    requests_kwargs=requests_kwargs,
+                    xarray_kwargs=kw,
+                )
+        datasets = self._split_fetch(fetch)
+        if len(datasets) == 1:
+            return datasets[0]
+        return _merge_datasets(datasets, self.protocol)
+
+    def to_zarr(
+        self: ERDDAP,
+        store: str | Path,
+        chunks: dict[str, int] | None = None,
+        requests_kwargs: dict | None = None,
+    ) -> Path:
+        """Download the griddap request, chunk by chunk, to a Zarr store.
+
+        Each chunk is downloaded with an index request, written to its region
+        of the store, and released, so the whole request is never held in
+        memory. Calling it again with the same store resumes an interrupted
+        download and only fetches the chunks that were not written.
+
+        Args:
+        ----
+            store: path of the Zarr store.
+            chunks: number of points of a chunk in each dimension.
+                Defaults to one time step and 512 points in the others.
+            requests_kwargs: arguments to be passed to urlopen method.
+
+        Returns:
+        -------
+            store: the Zarr store path, open it with `xr.open_zarr`.
+
+        """
+        if self.protocol != "griddap":
+            msg = f"to_zarr is only available for griddap, got {self.protocol}"
+            raise ValueError(msg)
+        requests_kwargs = {"auth": self.auth, **(requests_kwargs or {})}
+        store = Path(store).expanduser()
+        indices = self.griddap_indices()
+        chunks = _zarr_chunks(indices, chunks)
+        url = self.get_griddap_index_url(response="nc")
+        done, ready = _load_progress(store, url)
+        for chunk in _chunk_grid(indices, chunks):
+            if chunk in done:
+                continue
+            region, piece_indices = _chunk_region(chunk, indices, chunks)
+            piece_url = _griddap_index_url(
+                self.server,
+                dataset_id=self.dataset_id,
+                variables=self.variables,
+                indices=piece_indices,
+                response="nc",
+            )
+            piece = _fetch_piece(piece_url, requests_kwargs)
+            if not ready:
+                # Marks the store as ours before writing the template,
+                # a template cut midway is written again by the next call.
+                _save_progress(store, url, done, template=False)
+                template = _zarr_template(
+                    piece,
+                    self.griddap_axes(),
+                    indices,
+                    chunks,
+                )
+                template.to_zarr(store, mode="a", compute=False)
+                ready = True
+                _save_progress(store, url, done)
+            piece.drop_vars(list(piece.coords)).to_zarr(store, region=region)
+            piece.close()
+            done.add(chunk)
+            _save_progress(store, url, done)
+        return store
+
+    @_profiled
     def to_iris(self: ERDDAP, **kw: Any) -> iris.cube.CubeList:
         """Load the data request into an iris.cube.CubeList.
 
@@ -463,6 +1195,23 @@ class ERDDAP:
         url = self.get_download_url(response=response, distinct=distinct)
         return to_iris(url, iris_kwargs={**kw})
 
+    def _get_variables(
+        self: ERDDAP,
+        dataset_id: str | None = None,
+    ) -> dict:
+        """Return the variables metadata from the shared metadata cache."""
+        dataset_id = dataset_id or self.dataset_id
+        if dataset_id is None:
+            msg = f"You must specify a valid dataset_id, got {dataset_id}"
+            raise ValueError(msg)
+
+        cache = get_metadata_cache()
+        variables = cache.get(self.server, dataset_id, "variables")
+        if variables is None:
+            variables = self._get_variables_uncached(dataset_id=dataset_id)
+            cache.set(self.server, dataset_id, "variables", variables)
+        return variables
+
     def _get_variables_uncached(
         self: ERDDAP,
         dataset_id: str | None = None,
@@ -479,7 +1228,6 @@ class ERDDAP:
         variables = {}
         data = urlopen(url, requests_kwargs=self.requests_kwargs)
         _df = pd.read_csv(data)
-        self._dataset_id = dataset_id
         for variable in set(_df["Variable Name"]):
             attributes = (
                 _df.loc[
@@ -492,6 +1240,38 @@ class ERDDAP:
             variables.update({variable: attributes})
         return variables
 
+    def schema(
+        self: ERDDAP,
+        dataset_id: str | None = None,
+    ) -> dict[str, dict]:
+        """Return the dtype, dimensions, and shape of the dataset variables.
+
+        Only the small `.dds` header response is requested, no data is
+        downloaded, and the result is cached in the metadata cache.
+        Tabledap variables have a `row` dimension of unknown length.
+
+        Returns
+        -------
+            schema: {variable: {"dtype": ..., "dims": [...], "shape": [...]}}
+
+        """
+        dataset_id = dataset_id or self.dataset_id
+        if dataset_id is None:
+            msg = f"You must specify a valid dataset_id, got {dataset_id}"
+            raise ValueError(msg)
+        if self.protocol not in ("tabledap", "griddap"):
+            msg = f"Schema requires tabledap or griddap, got {self.protocol}"
+            raise ValueError(msg)
+
+        cache = get_metadata_cache()
+        schema = cache.get(self.server, dataset_id, "schema")
+        if schema is None:
+            url = f"{self.server}/{self.protocol}/{dataset_id}.dds"
+            data = urlopen(url, requests_kwargs=self.requests_kwargs)
+            schema = _dds_schema(_parse_dds(data.read().decode("utf-8")))
+            cache.set(self.server, dataset_id, "schema", schema)
+        return schema
+
     def get_var_by_attr(
         self: ERDDAP,
         dataset_id: str | None = None,
@@ -549,6 +1329,7 @@ class ERDDAP:
                 vs.append(vname)
         return vs
 
+    @_profiled
     def download_file(
         self: ERDDAP,
         file_type: str,
@@ -561,6 +1342,90 @@ class ERDDAP:
         url = _sort_url(self.get_download_url(response=file_type))
         fname_hash = hashlib.shake_256(url.encode()).hexdigest(5)
         file_name = Path(f"{self.dataset_id}_{fname_hash}.{file_type}")
-        if not file_name.exists():
-            urlretrieve(url, file_name)  # noqa: S310
+        if file_name.exists():
+            return file_name
+
+        parts: list[Path] = []
+        # The pieces of a split request are fetched concurrently.
+        numbers = itertools.count()
+        lock = threading.Lock()
+
+        def fetch(constraints: dict | None) -> Path:
+            with lock:
+                part = file_name.with_name(
+                    f"{file_name.name}.part{next(numbers)}",
+                )
+                parts.append(part)
+            return _urlretrieve(
+                self.get_download_url(
+                    response=file_type,
+                    constraints=constraints,
+                ),
+                part,
+                requests_kwargs=self.requests_kwargs,
+            )
+
+        # Only text responses can be merged after splitting the request.
+        depth = self.max_split_depth if file_type in _text_header_lines else 0
+        try:
+            pieces = self._split_fetch(fetch, depth=depth)
+            if len(pieces) == 1:
+                pieces[0].replace(file_name)
+            else:
+                _merge_text_files(pieces, file_name, file_type)
+        finally:
+            for part in parts:
+                part.unlink(missing_ok=True)
         return file_name
+
+    def _at(self: ERDDAP, server: str, dataset_id: str) -> ERDDAP:
+        """Return a copy of the request for the same dataset on `server`.
+
+        Griddap metadata not loaded yet is loaded from `server`,
+        keeping the values set by the user.
+        """
+        other = copy.copy(self)
+        other.server = server
+        other.replicas = None
+        other._dataset_id = dataset_id  # noqa: SLF001
+        other._griddap_user_set = set(self._griddap_user_set)  # noqa: SLF001
+        return other
+
+    def _bisect_constraints(self: ERDDAP, constraints: dict) -> list[dict]:
+        """Split the constraints in two, along time when possible."""
+        if self.protocol == "griddap":
+            axes = self.griddap_axes()
+            indices = _griddap_resolve_indices(
+                constraints,
+                self.dim_names,
+                axes,
+            )
+            _, pieces = _griddap_split_constraints(
+                constraints,
+                indices,
+                axes,
+                2,
+            )
+            return pieces
+        return _split_time_constraints(constraints, 2)
+
+    def _split_fetch(
+        self: ERDDAP,
+        fetch: Callable[[dict | None], T],
+        constraints: dict | None = None,
+        depth: int | None = None,
+    ) -> list[T]:
+        """Fetch the constraints, default to the current ones,
+        bisecting them if the request is too big.
+
+        """
+        if constraints is None:
+            constraints = self.constraints
+        if depth is None:
+            depth = self.max_split_depth
+        return _split_fetch(
+            fetch,
+            constraints,
+            self._bisect_constraints,
+            depth=depth if constraints else 0,
+        )
@@ -0,0 +1,387 @@
+"""Local parquet mirror of tabledap datasets.
+
+The mirror is a hive-partitioned parquet dataset, one directory per time
+period and, optionally, per station, e.g. `period=2020-01/station=A/`.
+The periods are fetched in parallel, periods already mirrored are skipped
+when a sync is resumed, and the open period is refreshed incrementally.
+"""
+
+from __future__ import annotations
+
+import json
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import requests
+
+from erddapy.core.constraints import (
+    _column,
+    _contains,
+    _filter_frame,
+    _parse_constraints,
+)
+from erddapy.core.interfaces import to_pandas
+from erddapy.core.parquet import (
+    _incremental_constraints,
+    _partition_name,
+    _query_key,
+    _stored_max_time,
+    _time_column,
+    _write_partition,
+)
+from erddapy.core.planner import _isoformat
+from erddapy.core.url import _is_no_results
+from erddapy.erddapy import ERDDAP
+
+_state_file = "_mirror.json"
+
+
+class Mirror:
+    """Mirror a tabledap dataset into a local parquet dataset.
+
+    Args:
+    ----
+        path: the parquet dataset directory.
+        server: the ERDDAP server URL.
+        dataset_id: the tabledap dataset to mirror.
+        variables: the variables to mirror, default all of them.
+        constraints: non-time constraints applied to the mirror.
+        freq: the time period of each partition, as a pandas period alias.
+        station: optional variable to partition each period by.
+        requests_kwargs: kwargs to be passed to urlopen method.
+
+    Examples:
+    --------
+        >>> from erddapy.mirror import Mirror
+        >>> mirror = Mirror(
+        ...     "buoys",
+        ...     "https://erddap.ioos.us/erddap",
+        ...     "buoy",
+        ...     station="station",
+        ... )
+        >>> mirror.sync(start="2020-01-01")
+        >>> e.mirror = mirror
+        >>> e.to_pandas()  # read from the mirror when it covers the request.
+
+    """
+
+    def __init__(  # noqa: PLR0913
+        self: Mirror,
+        path: str | Path,
+        server: str,
+        dataset_id: str,
+        *,
+        variables: list[str] | tuple[str] | None = None,
+        constraints: dict | None = None,
+        freq: str = "M",
+        station: str | None = None,
+        requests_kwargs: dict | None = None,
+    ) -> None:
+        """Instantiate the mirror of `dataset_id` in `path`."""
+        self.path = Path(path).expanduser()
+        self.server = server.rstrip("/")
+        self.dataset_id = dataset_id
+        if variables is not None:
+            variables = list(variables)
+            for required in ("time", station):
+                if required is not None and required not in variables:
+                    variables.append(required)
+        self.variables = variables
+        self.constraints = dict(constraints or {})
+        self.freq = freq
+        self.station = station
+        self.requests_kwargs = requests_kwargs
+        self.key = _query_key(
+            f"{self.server}/{dataset_id}?{variables}"
+            f"&{sorted(self.constraints.items())}&{freq}&{station}",
+        )
+
+    def _load_state(self: Mirror) -> dict:
+        path = self.path / _state_file
+        if not path.exists():
+            return {"key": self.key, "done": [], "start": None, "stop": None}
+        state = json.loads(path.read_text())
+        if state["key"] != self.key:
+            msg = (
+                f"{self.path} mirrors another dataset, variables, or "
+                "constraints. Use a new path."
+            )
+            raise ValueError(msg)
+        return state
+
+    def _save_state(self: Mirror, state: dict) -> None:
+        path = self.path / _state_file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps(state))
+        tmp.replace(path)
+
+    def _period_dir(self: Mirror, period: pd.Period) -> Path:
+        return self.path / f"period={period}"
+
+    def _files(self: Mirror, period: pd.Period) -> list[Path]:
+        return sorted(self._period_dir(period).rglob("part-*.parquet"))
+
+    def _station_dir(self: Mirror, period: pd.Period, name: object) -> Path:
+        return self._period_dir(period).joinpath(
+            f"station={urllib.parse.quote(str(name), safe='')}",
+        )
+
+    def _download(
+        self: Mirror,
+        variables: list[str] | None,
+        constraints: dict,
+        *,
+        distinct: bool = False,
+    ) -> pd.DataFrame:
+        """Return the csvp response of a request, empty without results."""
+        e = ERDDAP(self.server, protocol="tabledap")
+        e.dataset_id = self.dataset_id
+        e.variables = variables
+        url = e.get_download_url(
+            response="csvp",
+            constraints=constraints,
+            distinct=distinct,
+        )
+        try:
+            return to_pandas(url, requests_kwargs=self.requests_kwargs)
+        except requests.exceptions.HTTPError as err:
+            if not _is_no_results(err):
+                raise
+            return pd.DataFrame()
+
+    def _fetch_period(
+        self: Mirror,
+        period: pd.Period,
+        stop: pd.Timestamp,
+    ) -> pd.DataFrame:
+        """Fetch and store the rows of `period` not stored yet.
+
+        With per station partitions the stations can be stored up to
+        different times, the request starts after the earliest one and the
+        rows each station already has are dropped. When the period has a
+        station not stored yet the request starts at the period start.
+        """
+        directories = [self._period_dir(period)]
+        if self.station is not None:
+            directories = self._period_dir(period).glob("station=*")
+        stored = {
+            path: time
+            for path in directories
+            if (time := _stored_max_time(path, self.key)) is not None
+        }
+        end = (period + 1).start_time.tz_localize("UTC")
+        constraints = {
+            **self.constraints,
+            "time>=": _isoformat(
+                period.start_time.tz_localize("UTC").timestamp()
+            ),
+            "time<": _isoformat(min(end, stop).timestamp()),
+        }
+        lower = min(stored.values()) if stored else None
+        if lower is not None and self.station is not None:
+            stations = self._download(
+                [self.station],
+                constraints,
+                distinct=True,
+            )
+            if not stations.empty and not {
+                self._station_dir(period, name)
+                for name in stations[_column(stations, self.station)]
+            } <= set(stored):
+                lower = None
+        constraints = _incremental_constraints(constraints, lower)
+        df = self._download(self.variables, constraints)
+        if df.empty:
+            return df
+
+        groups = [(self._period_dir(period), df)]
+        if self.station is not None:
+            column = _column(df, self.station)
+            groups = [
+                (
+                    self._station_dir(period, name),
+                    group.drop(columns=column),
+                )
+                for name, group in df.groupby(column)
+            ]
+        written = []
+        for directory, group in groups:
+            times = pd.to_datetime(group[_time_column(group)], utc=True)
+            if directory in stored:
+                times = times[times > stored[directory]]
+            if times.empty:
+                continue
+            partition = group.loc[times.index]
+            if self.station is not None:
+                # The station is the directory name, its dtype is kept in
+                # the parquet schema metadata to restore it when reading.
+                partition.attrs = {"station_dtype": str(df[column].dtype)}
+            _write_partition(
+                partition,
+                directory.joinpath(_partition_name(self.key, times.max())),
+            )
+            written.extend(times.index)
+        return df.loc[sorted(written)]
+
+    def sync(
+        self: Mirror,
+        start: str | pd.Timestamp | None = None,
+        stop: str | pd.Timestamp | None = None,
+        max_workers: int = 4,
+    ) -> int:
+        """Fetch the periods between `start` and `stop` not mirrored yet.
+
+        Periods that ended before the sync are marked as complete and skipped
+        by the next syncs, so an interrupted sync resumes where it stopped.
+        The open period, and periods extended by a later `stop`, are refreshed
+        incrementally with only the rows newer than the ones stored.
+
+        Args:
+        ----
+            start: first time to mirror, default the `time_coverage_start`
+                of the dataset, or the start of the previous sync.
+            stop: end of the times to mirror, excluded, default now.
+            max_workers: number of periods fetched in parallel.
+
+        Returns:
+        -------
+            rows: the number of rows fetched.
+
+        """
+        state = self._load_state()
+        now = pd.Timestamp.now(tz="UTC")
+        if start is None:
+            start = state["start"] or self._coverage_start()
+        start = pd.Timestamp(start)
+        start = start.tz_localize("UTC") if start.tz is None else start
+        if state["start"] is not None:
+            # Keep the mirror contiguous, the periods already done are skipped.
+            start = min(start, pd.Timestamp(state["start"]))
+        stop = now if stop is None else pd.Timestamp(stop)
+        stop = stop.tz_localize("UTC") if stop.tz is None else stop
+        stop = min(stop, now)
+
+        done = set(state["done"])
+        periods = [
+            period
+            for period in pd.period_range(
+                start.tz_localize(None),
+                stop.tz_localize(None),
+                freq=self.freq,
+            )
+            if str(period) not in done
+            and period.start_time.tz_localize("UTC") < stop
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                (period, executor.submit(self._fetch_period, period, stop))
+                for period in periods
+            ]
+            rows = 0
+            for period, future in futures:
+                df = future.result()
+                rows += len(df)
+                if not df.empty and state.get("columns") is None:
+                    state["columns"] = list(df.columns)
+                if (period + 1).start_time.tz_localize("UTC") <= stop:
+                    done.add(str(period))
+                    state["done"] = sorted(done)
+                    self._save_state(state)
+
+        state["start"] = _isoformat(start.timestamp())
+        if state["stop"] is None or stop > pd.Timestamp(state["stop"]):
+            state["stop"] = _isoformat(stop.timestamp())
+        self._save_state(state)
+        return rows
+
+    def _coverage_start(self: Mirror) -> str:
+        """Return the dataset `time_coverage_start` attribute."""
+        e = ERDDAP(self.server, protocol="tabledap")
+        e.requests_kwargs = self.requests_kwargs or {}
+        metadata = e._get_variables(self.dataset_id)  # noqa: SLF001
+        start = metadata.get("NC_GLOBAL", {}).get("time_coverage_start")
+        if start is None:
+            msg = f"{self.dataset_id} has no time_coverage_start, pass start."
+            raise ValueError(msg)
+        return start
+
+    def covers(
+        self: Mirror,
+        variables: list[str] | tuple[str] | None = None,
+        constraints: dict[str, Any] | None = None,
+    ) -> bool:
+        """Return True if the request can be answered by the mirror."""
+        state = self._load_state()
+        if state["start"] is None:
+            return False
+        if self.variables is not None and (
+            variables is None or not set(variables) <= set(self.variables)
+        ):
+            return False
+        outer = _parse_constraints(
+            {
+                **self.constraints,
+                "time>=": state["start"],
+                "time<": state["stop"],
+            },
+        )
+        inner = _parse_constraints(constraints)
+        return inner is not None and _contains(outer, inner)
+
+    def read(
+        self: Mirror,
+        variables: list[str] | tuple[str] | None = None,
+        constraints: dict[str, Any] | None = None,
+    ) -> pd.DataFrame | None:
+        """Read a request from the mirror like `ERDDAP.to_pandas`.
+
+        Only the partitions overlapping the requested times are read.
+        Returns None if the request is not covered by the mirror.
+        """
+        if not self.covers(variables, constraints):
+            return None
+        state = self._load_state()
+        query = _parse_constraints(constraints)
+        bounds = query.ranges["time"]
+        periods = pd.period_range(
+            pd.Timestamp(bounds.lower, unit="s"),
+            pd.Timestamp(bounds.upper, unit="s"),
+            freq=self.freq,
+        )
+        frames = []
+        for period in periods:
+            for path in self._files(period):
+                df = pd.read_parquet(path)
+                if self.station is not None:
+                    name = path.parent.name.removeprefix("station=")
+                    station = pd.Series([urllib.parse.unquote(name)])
+                    dtype = df.attrs.get("station_dtype")
+                    if dtype is not None:
+                        station = station.astype(dtype)
+                    df[_column_name(state, self.station)] = station.iloc[0]
+                df.attrs = {}
+                frames.append(df)
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        if state.get("columns"):
+            df = df[state["columns"]]
+        order = pd.to_datetime(df[_time_column(df)], utc=True)
+        df = df.iloc[order.argsort(kind="stable")]
+        df = _filter_frame(df.reset_index(drop=True), query)
+        if df is None or not variables:
+            return df
+        columns = [_column(df, var) for var in variables]
+        return None if None in columns else df[columns]
+
+
+def _column_name(state: dict, variable: str) -> str:
+    """Return the column of `variable` as returned by the server."""
+    for column in state.get("columns") or []:
+        if column == variable or column.startswith(f"{variable} ("):
+            return column
+    return variable
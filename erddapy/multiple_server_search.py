@@ -11,6 +11,7 @@ try:
 except ImportError:
     joblib = False
 
+from erddapy.core.tracing import _set_attributes, _span
 from erddapy.core.url import (
     _format_search_string,
     _multi_urlopen,
@@ -39,23 +40,28 @@ def fetch_results(
     If the server fails to response this function returns None
     and the failed search should be parsed downstream.
     """
-    data = _multi_urlopen(url)
-    if data is None:
-        return None
-    try:
-        df_results = pd.read_csv(data)
-    except pd.errors.ParserError:
-        # Bad servers will return data that is not
-        # a csv but with valid html code.
-        return None
-    try:
-        df_results = df_results.dropna(subset=[protocol])
-    except KeyError:
-        return None
-    df_results["Server url"] = url.split("search", maxsplit=1)[0]
-    return {
-        key: df_results[["Title", "Institution", "Dataset ID", "Server url"]],
-    }
+    server = url.split("search", maxsplit=1)[0]
+    with _span("search.server", server=server, protocol=protocol) as span:
+        data = _multi_urlopen(url)
+        if data is None:
+            return None
+        try:
+            df_results = pd.read_csv(data)
+        except pd.errors.ParserError:
+            # Bad servers will return data that is not
+            # a csv but with valid html code.
+            return None
+        try:
+            df_results = df_results.dropna(subset=[protocol])
+        except KeyError:
+            return None
+        _set_attributes(span, results=len(df_results))
+        df_results["Server url"] = server
+        return {
+            key: df_results[
+                ["Title", "Institution", "Dataset ID", "Server url"]
+            ],
+        }
 
 
 def search_servers(
@@ -84,12 +90,32 @@ def search_servers(
     urls = {
         server: _format_search_string(server, query) for server in servers_list
     }
+    with _span(
+        "search",
+        query=query,
+        servers=len(urls),
+        protocol=protocol,
+        parallel=bool(parallel),
+    ):
+        dfs = _fetch_all_results(urls, protocol=protocol, parallel=parallel)
+    return _format_results(dfs)
+
+
+def _fetch_all_results(
+    urls: dict[str, str],
+    *,
+    protocol: str,
+    parallel: bool | None,
+) -> list[dict[str, pd.DataFrame] | None]:
+    """Fetch the search results of all the servers."""
     if parallel:
         num_cores = multiprocessing.cpu_count()
         if not joblib:
             msg = "Missing joblib. Please install it to use parallel searches."
             raise ImportError(msg)
-        returns = Parallel(n_jobs=num_cores)(
+        # The searches wait on the network, threads share the health
+        # registry, and its circuit breaker, of `_multi_urlopen`.
+        returns = Parallel(n_jobs=num_cores, prefer="threads")(
             delayed(fetch_results)(url, key, protocol=protocol)
             for key, url in urls.items()
         )
@@ -99,7 +125,7 @@ def search_servers(
             fetch_results(url, key, protocol=protocol)
             for key, url in urls.items()
         ]
-    return _format_results(dfs)
+    return dfs
 
 
 def advanced_search_servers(
@@ -131,20 +157,11 @@ def advanced_search_servers(
         for server in servers_list
     }
 
-    if parallel:
-        num_cores = multiprocessing.cpu_count()
-        if not joblib:
-            msg = "Missing joblib. Please install it to use parallel searches."
-            raise ImportError(msg)
-        returns = Parallel(n_jobs=num_cores)(
-            delayed(fetch_results)(url, key, protocol=protocol)
-            for key, url in urls.items()
-        )
-        dfs = [x for x in returns if x is not None]
-    else:
-        dfs = [
-            fetch_results(url, key, protocol=protocol)
-            for key, url in urls.items()
-        ]
-
+    with _span(
+        "search",
+        servers=len(urls),
+        protocol=protocol,
+        parallel=bool(parallel),
+    ):
+        dfs = _fetch_all_results(urls, protocol=protocol, parallel=parallel)
     return _format_results(dfs)
@@ -0,0 +1,55 @@
+"""Test the offline benchmarks against the stand-in server."""
+
+from erddapy import ERDDAP
+from erddapy.benchmarks.__main__ import run
+from erddapy.benchmarks.formats import (
+    VARIABLES,
+    available_formats,
+    compare_formats,
+    decoders,
+)
+from erddapy.benchmarks.server import StandInServer, shared_server
+from erddapy.core.url import get_download_url
+
+ROWS = 100
+
+
+def _url(response):
+    return get_download_url(
+        shared_server().url,
+        dataset_id=f"table_{ROWS}",
+        protocol="tabledap",
+        variables=VARIABLES,
+        response=response,
+    )
+
+
+def test_stand_in_server():
+    """Test the stand-in server answers like ERDDAP."""
+    with StandInServer() as server:
+        e = ERDDAP(server.url, protocol="tabledap")
+        e.dataset_id = "table_100"
+        df = e.to_pandas()
+        assert df.shape == (100, 5)
+        assert "temperature (degree_C)" in df.columns
+        assert e.get_var_by_attr(units="degree_C") == ["temperature"]
+
+
+def test_run():
+    """Test the benchmarks are discovered and timed."""
+    results = run("TimeURLBuilding", repeat=1, number=1)
+    names = {name.rsplit(".", maxsplit=1)[-1] for name, _, _ in results}
+    assert "time_get_download_url" in names
+    assert all(best > 0 for _, _, best in results)
+
+
+def test_compare_formats():
+    """Test all formats decode to the same table."""
+    df = compare_formats(rows=ROWS, repeat=1)
+    assert set(df.index) == set(available_formats())
+    assert {"csvp", "jsonlKVP", "nccsv", "dods"} <= set(df.index)
+    assert (df["bytes"] > 0).all()
+    assert df["total_s"].is_monotonic_increasing
+    for response, decode in decoders.items():
+        if response in df.index:
+            assert len(decode(_url(response))) == ROWS
@@ -0,0 +1,255 @@
+"""Test the metadata and result caches."""
+
+import io
+import re
+import sqlite3
+import threading
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from erddapy import ERDDAP
+from erddapy.core import griddap
+from erddapy.core.cache import MetadataCache, ResultCache, TimePartitionCache
+
+
+def test_metadata_cache_memory():
+    """Test the in-memory layer is keyed by server, dataset_id, and kind."""
+    cache = MetadataCache()
+    server = "https://erddap.ioos.us/erddap"
+    cache.set(server, "OBIS", "variables", {"time": {"axis": "T"}})
+    assert cache.get(f"{server}/", "OBIS", "variables") == {
+        "time": {"axis": "T"},
+    }
+    assert cache.get(server, "OBIS", "schema") is None
+    assert cache.get(server, "other", "variables") is None
+
+
+def test_metadata_cache_ttl():
+    """Test that expired entries are not returned."""
+    cache = MetadataCache(ttl=-1)
+    cache.set("https://erddap.ioos.us/erddap", "OBIS", "variables", {})
+    assert (
+        cache.get("https://erddap.ioos.us/erddap", "OBIS", "variables") is None
+    )
+
+
+def test_metadata_cache_sqlite(tmp_path):
+    """Test that the SQLite layer is shared between cache instances."""
+    path = tmp_path.joinpath("metadata.sqlite")
+    server = "https://erddap.ioos.us/erddap"
+    MetadataCache(path=path).set(server, "OBIS", "variables", {"a": {}})
+    other = MetadataCache(path=path)
+    assert other.get(server, "OBIS", "variables") == {"a": {}}
+    other.clear()
+    assert MetadataCache(path=path).get(server, "OBIS", "variables") is None
+
+
+def test_metadata_cache_lru_and_copies():
+    """Test the memory layer is bounded and returns copies."""
+    cache = MetadataCache(maxsize=2)
+    cache.set("server", "a", "variables", {"time": {"axis": "T"}})
+    cache.set("server", "b", "variables", {})
+    cache.get("server", "a", "variables")
+    cache.set("server", "c", "variables", {})
+    # `b` is the least recently used.
+    assert cache.get("server", "b", "variables") is None
+    assert cache.get("server", "c", "variables") == {}
+
+    value = cache.get("server", "a", "variables")
+    value["time"]["axis"] = "X"
+    assert cache.get("server", "a", "variables") == {"time": {"axis": "T"}}
+
+
+def test_griddap_axis_cache(monkeypatch):
+    """Test the griddap axes are kept in the metadata cache."""
+    cache = MetadataCache()
+    requests = []
+
+    def urlopen(url):
+        requests.append(url)
+        return io.BytesIO(b"2020-01-01T00:00:00Z\n2020-01-02T00:00:00Z\n")
+
+    monkeypatch.setattr(griddap, "get_metadata_cache", lambda: cache)
+    monkeypatch.setattr(griddap, "urlopen", urlopen)
+    server = "https://erddap.ioos.us/erddap"
+    for _ in range(2):
+        axis = griddap._griddap_get_axis(server, "sst", "time")  # noqa: SLF001
+    assert len(requests) == 1
+    assert axis.tolist() == [1577836800.0, 1577923200.0]
+    assert not axis.flags.writeable
+    # The same array is returned, not rebuilt on every call.
+    assert griddap._griddap_get_axis(server, "sst", "time") is axis  # noqa: SLF001
+    cache.clear()
+    griddap._griddap_get_axis(server, "sst", "time")  # noqa: SLF001
+    assert len(requests) == 2  # noqa: PLR2004
+
+
+def test_metadata_cache_arrays(tmp_path):
+    """Test arrays are stored as npy bytes on disk and read-only."""
+    path = tmp_path / "metadata.sqlite"
+    array = np.linspace(0, 1, 5)
+    MetadataCache(path=path).set("server", "sst", "axis:time", array)
+    with closing(sqlite3.connect(path)) as con:
+        (value,) = con.execute("SELECT value FROM metadata").fetchone()
+    assert isinstance(value, bytes)
+    assert value.startswith(b"\x93NUMPY")
+
+    restored = MetadataCache(path=path).get("server", "sst", "axis:time")
+    np.testing.assert_array_equal(restored, array)
+    assert restored.dtype == array.dtype
+    assert not restored.flags.writeable
+    # The array of the caller is not frozen.
+    assert array.flags.writeable
+
+
+def test_time_partition_cache_missing():
+    """Test only the intervals that are not cached are returned."""
+    cache = TimePartitionCache()
+    key = ("server", "dataset")
+    assert cache.missing(key, 0, 10) == [(0, 10, True, True)]
+
+    cache.add(key, 0, 10, pd.DataFrame(), "")
+    assert cache.missing(key, 2, 8) == []
+    assert cache.missing(key, 5, 20) == [(10, 20, False, True)]
+
+    cache.add(key, 15, 20, pd.DataFrame(), "")
+    assert cache.missing(key, -5, 30) == [
+        (-5, 0, True, False),
+        (10, 15, False, False),
+        (20, 30, False, True),
+    ]
+
+
+def test_time_partition_cache_same_start():
+    """Test overlapping partitions do not duplicate their rows."""
+    cache = TimePartitionCache()
+    key = ("server", "dataset")
+    df = pd.DataFrame({"time": pd.to_datetime([0, 5], unit="s", utc=True)})
+    cache.add(key, 0, 10, df, "time")
+    cache.add(key, 0, 5, df, "time")
+    assert cache.missing(key, 0, 10) == []
+    assert len(cache.assemble(key, 0, 10)) == 2  # noqa: PLR2004
+
+    later = pd.DataFrame(
+        {"time": pd.to_datetime([5, 15], unit="s", utc=True)},
+    )
+    cache.add(key, 5, 15, later, "time")
+    result = cache.assemble(key, 0, 20)
+    expected = pd.to_datetime([0, 5, 15], unit="s", utc=True)
+    assert list(result["time"]) == list(expected)
+
+
+def test_time_partition_cache_concurrent_gap():
+    """Test the same gap stored by concurrent requests is assembled once."""
+    cache = TimePartitionCache()
+    key = ("server", "dataset")
+    df = pd.DataFrame({"time": pd.to_datetime([0, 5], unit="s", utc=True)})
+    gaps = [cache.missing(key, 0, 10) for _ in range(2)]
+    assert gaps[0] == gaps[1] == [(0, 10, True, True)]
+    threads = [
+        threading.Thread(target=cache.add, args=(key, 0, 10, df, "time"))
+        for _ in gaps
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache.assemble(key, 0, 10)) == 2  # noqa: PLR2004
+
+
+def _hourly(url):
+    """Return hourly rows between the time constraints of the URL."""
+    bounds = dict(re.findall(r"&time(>=|>|<=|<)([\d.]+)", url))
+    start = float(bounds.get(">=", bounds.get(">", 0)))
+    stop = float(bounds.get("<=", bounds.get("<", np.inf)))
+    seconds = np.arange(0, 48 * 3600, 3600.0)
+    keep = (seconds >= start) & (seconds <= stop)
+    if ">" in bounds:
+        keep &= seconds > start
+    if "<" in bounds:
+        keep &= seconds < stop
+    times = pd.to_datetime(seconds[keep], unit="s", utc=True)
+    return pd.DataFrame(
+        {
+            "time (UTC)": times.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "temperature (degree_C)": seconds[keep] / 3600,
+        },
+    )
+
+
+def test_to_pandas_partition_cache(monkeypatch):
+    """Test overlapping requests only download the missing intervals."""
+    urls = []
+
+    def fake_to_pandas(url, requests_kwargs=None, pandas_kwargs=None):  # noqa: ARG001
+        urls.append(url)
+        return _hourly(url)
+
+    monkeypatch.setattr("erddapy.erddapy.to_pandas", fake_to_pandas)
+    e = ERDDAP(server="https://erddap.ioos.us/erddap", protocol="tabledap")
+    e.dataset_id = "buoy"
+    e.variables = ["time", "temperature"]
+    e.partition_cache = TimePartitionCache()
+
+    e.constraints = {
+        "time>=": "1970-01-01T00:00:00Z",
+        "time<=": "1970-01-01T12:00:00Z",
+    }
+    first = e.to_pandas()
+    expected = 13
+    assert len(first) == expected
+
+    e.constraints = {
+        "time>=": "1970-01-01T06:00:00Z",
+        "time<=": "1970-01-01T18:00:00Z",
+    }
+    second = e.to_pandas(index_col="time (UTC)", parse_dates=True)
+    assert len(second) == expected
+    assert second.index[0] == pd.Timestamp("1970-01-01T06:00:00Z")
+    assert second["temperature (degree_C)"].tolist() == list(range(6, 19))
+    # The second request only downloaded the rows after 12:00.
+    assert "time>43200.0" in urls[1]
+    assert len(urls) == 2  # noqa: PLR2004
+
+
+def test_to_pandas_result_cache(monkeypatch):
+    """Test requests contained in a cached one are filtered locally."""
+    urls = []
+
+    def fake_to_pandas(url, requests_kwargs=None, pandas_kwargs=None):  # noqa: ARG001
+        urls.append(url)
+        return _hourly(url)
+
+    monkeypatch.setattr("erddapy.erddapy.to_pandas", fake_to_pandas)
+    e = ERDDAP(server="https://erddap.ioos.us/erddap", protocol="tabledap")
+    e.dataset_id = "buoy"
+    e.variables = ["time", "temperature"]
+    e.result_cache = ResultCache()
+
+    e.constraints = {
+        "time>=": "1970-01-01T00:00:00Z",
+        "time<=": "1970-01-02T00:00:00Z",
+    }
+    expected = 25
+    assert len(e.to_pandas()) == expected
+
+    e.constraints = {
+        "time>": "1970-01-01T06:00:00Z",
+        "time<=": "1970-01-01T12:00:00Z",
+        "temperature>=": 10,
+    }
+    df = e.to_pandas()
+    assert df["temperature (degree_C)"].tolist() == [10, 11, 12]
+    assert len(urls) == 1
+
+    # Answered in the requested variables order.
+    e.variables = ["temperature", "time"]
+    df = e.to_pandas()
+    assert list(df.columns) == ["temperature (degree_C)", "time (UTC)"]
+    assert len(urls) == 1
+
+    e.constraints = {"time>=": "now-1day"}
+    e.to_pandas()
+    assert len(urls) == 2  # noqa: PLR2004
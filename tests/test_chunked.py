@@ -0,0 +1,148 @@
+"""Test the chunked griddap downloads to Zarr."""
+
+import io
+import re
+
+import numpy as np
+import pytest
+import requests
+
+from erddapy import ERDDAP
+from erddapy.core import chunked
+from erddapy.core.griddap import _griddap_parse_ncml
+
+xr = pytest.importorskip("xarray")
+pytest.importorskip("zarr")
+pytest.importorskip("dask")
+
+NCML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<netcdf xmlns="https://www.unidata.ucar.edu/namespaces/netcdf/ncml-2.2">
+  <dimension name="time" length="3"/>
+  <dimension name="latitude" length="5"/>
+  <variable name="time" shape="time" type="double">
+    <attribute name="actual_range" type="double" value="0.0 172800.0"/>
+  </variable>
+  <variable name="latitude" shape="latitude" type="float">
+    <attribute name="actual_range" type="float" value="10.0 20.0"/>
+  </variable>
+  <variable name="sst" shape="time latitude" type="float">
+    <attribute name="actual_range" type="float" value="0.0 7.0"/>
+  </variable>
+</netcdf>
+"""
+
+AXES = {
+    "time": np.array([0.0, 86400.0, 172800.0]),
+    "latitude": np.array([10.0, 12.5, 15.0, 17.5, 20.0]),
+}
+
+SST = np.arange(15, dtype="float32").reshape(3, 5) / 2
+
+
+@pytest.fixture
+def sst(monkeypatch):
+    """Return a griddap request served from memory and its piece URLs."""
+    urls = []
+    pieces = []
+
+    def fake_urlretrieve(url, file_name, requests_kwargs=None):  # noqa: ARG001
+        if len(urls) == fake_urlretrieve.fail_after:
+            msg = "Connection reset by peer."
+            raise requests.ConnectionError(msg)
+        urls.append(url)
+        (time, lat) = (
+            slice(int(start), int(stop) + 1, int(step))
+            for start, step, stop in re.findall(r"\[(\d+):(\d+):(\d+)\]", url)
+        )
+        ds = xr.Dataset(
+            {"sst": (("time", "latitude"), SST[time, lat], {"units": "C"})},
+            coords={
+                "time": AXES["time"][time].astype("datetime64[s]"),
+                "latitude": AXES["latitude"][lat],
+            },
+        )
+        ds["sst"].encoding = {"dtype": "int16", "scale_factor": 0.5}
+        ds.to_netcdf(file_name, engine="netcdf4")
+        pieces.append(file_name)
+        return file_name
+
+    fake_urlretrieve.fail_after = None
+    monkeypatch.setattr(chunked, "_urlretrieve", fake_urlretrieve)
+    monkeypatch.setattr(
+        "erddapy.erddapy._griddap_get_metadata",
+        lambda _server, _dataset_id: _griddap_parse_ncml(io.BytesIO(NCML)),
+    )
+    monkeypatch.setattr(
+        "erddapy.erddapy._griddap_get_axis",
+        lambda _server, _dataset_id, dim: AXES[dim],
+    )
+    e = ERDDAP(server="https://erddap.ioos.us/erddap", protocol="griddap")
+    e.dataset_id = "sst"
+    e.constraints = {
+        "time>=": "1970-01-01T00:00:00Z",
+        "time<=": "1970-01-03T00:00:00Z",
+        "time_step": 1,
+        "latitude>=": 12.5,
+        "latitude<=": 20.0,
+        "latitude_step": 1,
+    }
+    return e, urls, pieces, fake_urlretrieve
+
+
+def test_to_zarr_resumes(sst, tmp_path):
+    """Test chunks are written to their region and resumed on failure."""
+    e, urls, pieces, fake_urlretrieve = sst
+    store = tmp_path / "sst.zarr"
+    chunks = {"time": 1, "latitude": 3}
+
+    fake_urlretrieve.fail_after = 3
+    with pytest.raises(requests.ConnectionError):
+        e.to_zarr(store, chunks=chunks)
+    assert urls[0].endswith("sst[0:1:0][1:1:3]")
+
+    fake_urlretrieve.fail_after = None
+    e.to_zarr(store, chunks=chunks)
+    # Three time steps with two latitude chunks each.
+    expected = 6
+    assert len(urls) == expected
+    assert len(set(urls)) == expected
+    # The pieces were read from disk and removed.
+    assert not any(piece.exists() for piece in pieces)
+
+    ds = xr.open_zarr(store)
+    assert ds["sst"].encoding["dtype"] == "int16"
+    assert ds["sst"].attrs["units"] == "C"
+    assert ds["time"].values[1] == np.datetime64("1970-01-02")
+    np.testing.assert_array_equal(ds["latitude"], AXES["latitude"][1:])
+    np.testing.assert_array_equal(ds["sst"], SST[:, 1:])
+
+    e.constraints["latitude>="] = 10.0
+    with pytest.raises(ValueError, match="created for another request"):
+        e.to_zarr(store, chunks=chunks)
+
+
+def test_to_zarr_template_cut(sst, tmp_path, monkeypatch):
+    """Test a store cut while writing its template is written again."""
+    e, *_ = sst
+    store = tmp_path / "sst.zarr"
+    chunks = {"time": 1, "latitude": 3}
+
+    def cut(_self, _store, mode, compute):  # noqa: ARG001
+        msg = "Killed while writing the template."
+        raise KeyboardInterrupt(msg)
+
+    to_zarr = xr.Dataset.to_zarr
+    monkeypatch.setattr(xr.Dataset, "to_zarr", cut)
+    with pytest.raises(KeyboardInterrupt):
+        e.to_zarr(store, chunks=chunks)
+    assert store.exists()
+
+    monkeypatch.setattr(xr.Dataset, "to_zarr", to_zarr)
+    e.to_zarr(store, chunks=chunks)
+    np.testing.assert_array_equal(xr.open_zarr(store)["sst"], SST[:, 1:])
+
+    other = tmp_path / "other"
+    other.mkdir()
+    other.joinpath("data.txt").write_text("not a zarr store")
+    with pytest.raises(ValueError, match="not created by to_zarr"):
+        e.to_zarr(other, chunks=chunks)
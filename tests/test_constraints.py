@@ -0,0 +1,91 @@
+"""Test the constraint algebra."""
+
+import pandas as pd
+
+from erddapy.core.constraints import (
+    _contains,
+    _filter_frame,
+    _parse_constraints,
+)
+
+outer = _parse_constraints(
+    {
+        "time>=": "2020-01-01T00:00:00Z",
+        "time<=": "2020-01-31T00:00:00Z",
+        "latitude>=": 30,
+        "latitude<=": 40,
+        "station=": "A",
+    },
+)
+
+
+def test__parse_constraints_relative():
+    """Test relative constraints cannot be resolved locally."""
+    assert _parse_constraints({"time>": "now-7days"}) is None
+    assert _parse_constraints({"depth>": "max(depth)-23"}) is None
+
+
+def test__contains():
+    """Test a smaller box and time range is contained in a larger one."""
+    inner = _parse_constraints(
+        {
+            "time>": "2020-01-10T00:00:00Z",
+            "time<=": "2020-01-31T00:00:00Z",
+            "latitude=": 35,
+            "longitude<": -70,
+            "station=": "A",
+        },
+    )
+    assert _contains(outer, inner)
+    assert not _contains(inner, outer)
+
+    wider = _parse_constraints(
+        {
+            "time>=": "2020-01-01T00:00:00Z",
+            "time<=": "2020-02-01T00:00:00Z",
+            "latitude>=": 30,
+            "latitude<=": 40,
+            "station=": "A",
+        },
+    )
+    assert not _contains(outer, wider)
+
+    other_station = _parse_constraints({"station=": "B"})
+    assert not _contains(outer, other_station)
+
+
+def test__contains_regex():
+    """Test regex constraints are only contained in the same regex."""
+    regex = _parse_constraints({"station=~": "A.*"})
+    assert _contains(regex, _parse_constraints({"station=~": "A.*"}))
+    assert not _contains(regex, _parse_constraints({"station=~": "AB.*"}))
+    assert not _contains(regex, _parse_constraints({"station=": "AB"}))
+    assert not _contains(
+        _parse_constraints({}),
+        _parse_constraints({"station=~": "A.*"}),
+    )
+
+
+def test__filter_frame():
+    """Test filtering a cached frame with the constraints."""
+    df = pd.DataFrame(
+        {
+            "time (UTC)": [
+                "2020-01-01T00:00:00Z",
+                "2020-01-15T00:00:00Z",
+                "2020-01-20T00:00:00Z",
+            ],
+            "latitude (degrees_north)": [35.0, 35.0, 39.0],
+            "station": ["A", "A", "A"],
+        },
+    )
+    inner = _parse_constraints(
+        {
+            "time>": "2020-01-01T00:00:00Z",
+            "latitude<": 36,
+            "station=": "A",
+        },
+    )
+    filtered = _filter_frame(df, inner)
+    assert filtered["time (UTC)"].tolist() == ["2020-01-15T00:00:00Z"]
+    assert _filter_frame(df, _parse_constraints({"depth<": 10})) is None
@@ -0,0 +1,276 @@
+"""Test the DAP2 .dods decoder."""
+
+import io
+import struct
+
+import numpy as np
+import pytest
+
+from erddapy import ERDDAP
+from erddapy.core import dods, interfaces
+from erddapy.core.cache import MetadataCache
+from erddapy.core.dods import (
+    _dds_schema,
+    _decode_dods,
+    _dods_to_pandas,
+    _dods_to_xarray,
+    _parse_das_signed,
+    _parse_dds,
+)
+
+SEQUENCE_DDS = b"""Dataset {
+  Sequence {
+    Float64 time;
+    String station;
+    Int16 flag;
+    Float32 temperature;
+  } s;
+} buoy;
+"""
+
+GRID_DDS = b"""Dataset {
+  GRID {
+    ARRAY:
+      Float32 sst[time = 1][latitude = 2][longitude = 3];
+    MAPS:
+      Float64 time[time = 1];
+      Float32 latitude[latitude = 2];
+      Float32 longitude[longitude = 3];
+  } sst;
+} erdSST;
+"""
+
+
+def _string(value):
+    data = value.encode()
+    return struct.pack(">I", len(data)) + data + b"\0" * (-len(data) % 4)
+
+
+def _array(dtype, values):
+    values = np.asarray(values, dtype=dtype)
+    return struct.pack(">II", values.size, values.size) + values.tobytes()
+
+
+def _sequence(rows, *, strings=True):
+    data = b""
+    for time, station, flag, temperature in rows:
+        data += struct.pack(">I", 0x5A000000) + struct.pack(">d", time)
+        if strings:
+            data += _string(station)
+        data += struct.pack(">if", flag, temperature)
+    return data + struct.pack(">I", 0xA5000000)
+
+
+ROWS = [(0.0, "A", -1, 1.5), (3600.0, "long name", 2, np.nan)]
+
+
+def test__parse_dds():
+    """Test sequences and grids are parsed with their dimensions."""
+    dataset = _parse_dds(GRID_DDS.decode())
+    assert dataset.name == "erdSST"
+    (grid,) = dataset.children
+    assert grid.type == "Grid"
+    assert [child.name for child in grid.children] == [
+        "sst",
+        "time",
+        "latitude",
+        "longitude",
+    ]
+    assert grid.children[0].dims == (
+        ("time", 1),
+        ("latitude", 2),
+        ("longitude", 3),
+    )
+
+
+def test__dods_to_pandas_sequence():
+    """Test sequences, with and without strings, are decoded as columns."""
+    df = _dods_to_pandas(SEQUENCE_DDS + b"\nData:\n" + _sequence(ROWS))
+    assert list(df.columns) == ["time", "station", "flag", "temperature"]
+    assert list(df["station"]) == ["A", "long name"]
+    assert df["flag"].dtype == "int16"
+    assert list(df["flag"]) == [-1, 2]
+    assert df["time"].iloc[1].hour == 1
+    assert np.isnan(df["temperature"].iloc[1])
+
+    fixed = SEQUENCE_DDS.replace(b"    String station;\n", b"")
+    data = fixed + b"\nData:\n" + _sequence(ROWS, strings=False)
+    _, values = _decode_dods(data)
+    np.testing.assert_array_equal(values["s"]["flag"], [-1, 2])
+    assert values["s"]["temperature"].dtype == "float32"
+
+    empty = fixed + b"\nData:\n" + _sequence([], strings=False)
+    assert _dods_to_pandas(empty).empty
+
+
+def test__dods_to_xarray_grid():
+    """Test grids are decoded with their maps as coordinates."""
+    sst = np.arange(6, dtype=">f4").reshape(1, 2, 3)
+    data = (
+        GRID_DDS
+        + b"\nData:\n"
+        + _array(">f4", sst)
+        + _array(">f8", [86400.0])
+        + _array(">f4", [10.0, 20.0])
+        + _array(">f4", [0.0, 1.0, 2.0])
+    )
+    ds = _dods_to_xarray(data)
+    assert ds["sst"].dims == ("time", "latitude", "longitude")
+    np.testing.assert_array_equal(ds["sst"], sst)
+    np.testing.assert_array_equal(ds["latitude"], [10.0, 20.0])
+    assert ds["time"].values[0] == np.datetime64("1970-01-02")
+
+
+def test__dods_to_pandas_grid_decoded_once(monkeypatch):
+    """Test the grid frame is built from the values already decoded."""
+    calls = []
+
+    def decode(data, signed=frozenset()):
+        calls.append(data)
+        return _decode_dods(data, signed)
+
+    monkeypatch.setattr(dods, "_decode_dods", decode)
+    data = (
+        GRID_DDS
+        + b"\nData:\n"
+        + _array(">f4", np.arange(6).reshape(1, 2, 3))
+        + _array(">f8", [0.0])
+        + _array(">f4", [10.0, 20.0])
+        + _array(">f4", [0.0, 1.0, 2.0])
+    )
+    df = _dods_to_pandas(data)
+    assert len(df) == 6  # noqa: PLR2004
+    assert len(calls) == 1
+
+
+BYTE_DDS = b"""Dataset {
+  Sequence {
+    Byte flag;
+    Byte count;
+  } s;
+} buoy;
+"""
+
+BYTE_DAS = b"""Attributes {
+  s {
+    flag {
+      Byte _FillValue 127;
+      String _Unsigned "false";
+    }
+    count {
+      Byte _FillValue 255;
+      String _Unsigned "true";
+    }
+  }
+  NC_GLOBAL {
+    String title "buoy";
+  }
+}
+"""
+
+
+def test__parse_das_signed():
+    """Test the bytes with `_Unsigned="false"` are signed."""
+    assert _parse_das_signed(BYTE_DAS.decode()) == {"flag"}
+
+
+def test_to_pandas_dods_signed_bytes(monkeypatch):
+    """Test ERDDAP's signed bytes are not decoded as unsigned."""
+    row = struct.pack(">I", 0x5A000000) + struct.pack(">II", 255, 255)
+    data = BYTE_DDS + b"\nData:\n" + row + struct.pack(">I", 0xA5000000)
+    urls = []
+
+    def fake_urlopen(url, requests_kwargs=None):  # noqa: ARG001
+        urls.append(url)
+        return io.BytesIO(BYTE_DAS if url.endswith(".das") else data)
+
+    monkeypatch.setattr(interfaces, "urlopen", fake_urlopen)
+    url = "https://erddap.ioos.us/erddap/tabledap/buoy.dods?flag,count"
+    df = interfaces.to_pandas(url)
+    assert df["flag"].dtype == "int8"
+    assert list(df["flag"]) == [-1]
+    assert df["count"].dtype == "uint8"
+    assert list(df["count"]) == [255]
+    assert urls[-1] == "https://erddap.ioos.us/erddap/tabledap/buoy.das"
+
+    data = SEQUENCE_DDS + b"\nData:\n" + _sequence(ROWS)
+    urls.clear()
+    interfaces.to_pandas(url)
+    assert len(urls) == 1
+
+
+def test_to_xarray_dods_xarray_kwargs(monkeypatch):
+    """Test the xarray_kwargs are used to decode the dods response."""
+    data = (
+        GRID_DDS
+        + b"\nData:\n"
+        + _array(">f4", np.arange(6).reshape(1, 2, 3))
+        + _array(">f8", [86400.0])
+        + _array(">f4", [10.0, 20.0])
+        + _array(">f4", [0.0, 1.0, 2.0])
+    )
+    monkeypatch.setattr(
+        interfaces,
+        "urlopen",
+        lambda _url, requests_kwargs=None: io.BytesIO(data),  # noqa: ARG005
+    )
+    url = "https://erddap.ioos.us/erddap/griddap/erdSST.dods?sst"
+    ds = interfaces.to_xarray(
+        url,
+        response="dods",
+        xarray_kwargs={"decode_times": False},
+    )
+    assert ds["time"].values[0] == 86400.0  # noqa: PLR2004
+
+
+def test__decode_dods_invalid():
+    """Test error responses are not decoded."""
+    with pytest.raises(ValueError, match=r"Not a valid \.dods response"):
+        _decode_dods(b'Error {\n    code=404;\n    message="Not Found";\n}')
+
+
+def test_to_pandas_dods(monkeypatch):
+    """Test .dods URLs are decoded without pandas.read_csv."""
+    data = SEQUENCE_DDS + b"\nData:\n" + _sequence(ROWS)
+    monkeypatch.setattr(
+        interfaces,
+        "urlopen",
+        lambda _url, requests_kwargs=None: io.BytesIO(data),  # noqa: ARG005
+    )
+    url = "https://erddap.ioos.us/erddap/tabledap/buoy.dods?time,station"
+    df = interfaces.to_pandas(url)
+    assert list(df["station"]) == ["A", "long name"]
+    df = interfaces.to_pandas(url, pandas_kwargs={"usecols": ["station"]})
+    assert list(df.columns) == ["station"]
+
+
+def test_schema(monkeypatch):
+    """Test the schema is read from the DDS and cached."""
+    cache = MetadataCache()
+    urls = []
+
+    def fake_urlopen(url, requests_kwargs=None):  # noqa: ARG001
+        urls.append(url)
+        return io.BytesIO(
+            b"Dataset {\n  Float64 time[time = 1];\n" + GRID_DDS[10:],
+        )
+
+    monkeypatch.setattr("erddapy.erddapy.get_metadata_cache", lambda: cache)
+    monkeypatch.setattr("erddapy.erddapy.urlopen", fake_urlopen)
+    e = ERDDAP(server="https://erddap.ioos.us/erddap", protocol="griddap")
+    schema = e.schema("erdSST")
+    assert schema["sst"] == {
+        "dtype": "float32",
+        "dims": ["time", "latitude", "longitude"],
+        "shape": [1, 2, 3],
+    }
+    assert schema["time"]["dtype"] == "float64"
+    assert e.schema("erdSST") == schema
+    assert urls == ["https://erddap.ioos.us/erddap/griddap/erdSST.dds"]
+
+    dataset = _parse_dds(SEQUENCE_DDS.decode())
+    assert _dds_schema(dataset)["station"] == {
+        "dtype": "str",
+        "dims": ["row"],
+        "shape": [None],
+    }
@@ -1,13 +1,21 @@
 """Test ERDDAP functionality."""
 
 import datetime
+import io
 from zoneinfo import ZoneInfo
 
+import numpy as np
 import pytest
 
+from erddapy import ERDDAP
 from erddapy.core.griddap import (
     _griddap_check_constraints,
     _griddap_check_variables,
+    _griddap_constraints_from_metadata,
+    _griddap_index_url,
+    _griddap_parse_ncml,
+    _griddap_resolve_indices,
+    _griddap_shape,
 )
 from erddapy.core.url import (
     _format_constraints_url,
@@ -90,3 +98,112 @@ def test__griddap_check_variables():
         match=r"are not present in dataset. Re-run e.griddap_initialize",
     ):
         _griddap_check_variables(bad_variables, original_variables)
+
+
+NCML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<netcdf xmlns="https://www.unidata.ucar.edu/namespaces/netcdf/ncml-2.2">
+  <attribute name="title" value="Synthetic SST"/>
+  <dimension name="time" length="3"/>
+  <dimension name="latitude" length="2"/>
+  <variable name="time" shape="time" type="double">
+    <attribute name="actual_range" type="double" value="0.0 172800.0"/>
+  </variable>
+  <variable name="latitude" shape="latitude" type="float">
+    <attribute name="actual_range" type="float" value="10.0 20.0"/>
+    <attribute name="units" value="degrees_north"/>
+  </variable>
+  <variable name="sst" shape="time latitude" type="float">
+    <attribute name="actual_range" type="float" value="1.0 30.0"/>
+  </variable>
+</netcdf>
+"""
+
+
+def test__griddap_parse_ncml():
+    """Test the NcML parser keeps only dimensions and axes metadata."""
+    metadata = _griddap_parse_ncml(io.BytesIO(NCML))
+    assert metadata["dimensions"] == {"time": 3, "latitude": 2}
+    assert metadata["variables"]["sst"] == {
+        "type": "float",
+        "shape": ["time", "latitude"],
+    }
+    assert metadata["actual_range"]["latitude"] == ["10.0", "20.0"]
+    assert metadata["attributes"]["latitude"] == {
+        "actual_range": [10.0, 20.0],
+        "units": "degrees_north",
+    }
+    assert "sst" not in metadata["attributes"]
+
+    constraints, dim_names, variables = _griddap_constraints_from_metadata(
+        metadata,
+        step=2,
+    )
+    assert dim_names == ["time", "latitude"]
+    assert variables == ["sst"]
+    assert constraints == {
+        "time>=": "172800.0",
+        "time<=": "172800.0",
+        "time_step": "2",
+        "latitude>=": "10.0",
+        "latitude<=": "20.0",
+        "latitude_step": "2",
+    }
+
+
+def test_griddap_lazy_initialize(monkeypatch):
+    """Test griddap metadata is loaded on first use and not on assignment."""
+    calls = []
+
+    def fake_metadata(_server, dataset_id):
+        calls.append(dataset_id)
+        return _griddap_parse_ncml(io.BytesIO(NCML))
+
+    monkeypatch.setattr(
+        "erddapy.erddapy._griddap_get_metadata",
+        fake_metadata,
+    )
+    e = ERDDAP(server="https://erddap.ioos.us/erddap", protocol="griddap")
+    for dataset_id in ("a", "b", "c"):
+        e.dataset_id = dataset_id
+    assert calls == []
+
+    e.variables = ["sst"]
+    assert e.constraints["latitude<="] == "20.0"
+    assert e.variables == ["sst"]
+    assert e.dim_names == ["time", "latitude"]
+    assert calls == ["c"]
+
+
+def test__griddap_resolve_indices():
+    """Test value constraints are resolved to the closest axis index."""
+    axes = {
+        "time": np.array([0.0, 86400.0, 172800.0]),
+        # Latitude is often stored from north to south.
+        "latitude": np.array([20.0, 17.5, 15.0, 12.5, 10.0]),
+    }
+    constraints = {
+        "time>=": "1970-01-02T00:00:00Z",
+        "time<=": "last",
+        "time_step": "1",
+        "latitude>=": "12.0",
+        "latitude<=": 17.4,
+        "latitude_step": "2",
+    }
+    indices = _griddap_resolve_indices(
+        constraints,
+        ["time", "latitude"],
+        axes,
+    )
+    assert indices == {"time": (1, 1, 2), "latitude": (1, 2, 3)}
+    assert _griddap_shape(indices) == {"time": 2, "latitude": 2}
+
+    url = _griddap_index_url(
+        "https://erddap.ioos.us/erddap/",
+        dataset_id="sst",
+        variables=["sst"],
+        indices=indices,
+        response="nc",
+    )
+    assert (
+        url == "https://erddap.ioos.us/erddap/griddap/sst.nc?sst[1:1:2][1:2:3]"
+    )
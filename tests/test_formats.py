@@ -0,0 +1,132 @@
+"""Test the automatic choice of the response format."""
+
+import io
+
+import pandas as pd
+import pytest
+import requests
+
+from erddapy import ERDDAP
+from erddapy.benchmarks.server import StandInServer
+from erddapy.core import formats
+from erddapy.core.cache import MetadataCache
+from erddapy.core.formats import _auto_responses
+from erddapy.core.hooks import hooks
+from erddapy.core.url import _urlopen
+
+VARIABLES = ["time", "latitude", "longitude", "station", "temperature"]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Use an empty metadata cache."""
+    cache = MetadataCache()
+    monkeypatch.setattr(formats, "get_metadata_cache", lambda: cache)
+    return cache
+
+
+def test_server_version(cache, monkeypatch):
+    """Test the version is requested once and failures are cached."""
+    urls = []
+
+    def fake_urlopen(url, requests_kwargs=None):  # noqa: ARG001
+        urls.append(url)
+        if "broken" in url:
+            msg = "Not Found"
+            raise requests.exceptions.HTTPError(msg)
+        return io.BytesIO(b"ERDDAP_version=2.23_1\n")
+
+    monkeypatch.setattr(formats, "urlopen", fake_urlopen)
+    server = "https://erddap.ioos.us/erddap"
+    assert formats.server_version(server) == (2, 23)
+    assert formats.server_version(f"{server}/") == (2, 23)
+    assert formats.server_version("https://broken/erddap") is None
+    assert formats.server_version("https://broken/erddap") is None
+    assert len(urls) == 2  # noqa: PLR2004
+    assert cache.get(server, None, "version") == [2, 23]
+
+
+def test__auto_responses(monkeypatch):
+    """Test parquet needs a recent server and small results use csvp."""
+    server = "https://erddap.ioos.us/erddap"
+    monkeypatch.setattr(formats, "server_version", lambda *_: (2, 23))
+    assert _auto_responses(server, "tabledap") == [
+        "parquet",
+        "nc",
+        "csvp",
+    ]
+    assert _auto_responses(server, "griddap") == ["nc", "csvp"]
+    assert _auto_responses(server, "tabledap", nbytes=100) == [
+        "csvp",
+    ]
+    monkeypatch.setattr(formats, "server_version", lambda *_: (1, 82))
+    assert _auto_responses(server, "tabledap") == ["nc", "csvp"]
+
+
+def test_to_pandas_auto(cache):  # noqa: ARG001
+    """Test the auto response returns the same table as csvp."""
+    with StandInServer() as server:
+        e = ERDDAP(server.url, protocol="tabledap")
+        e.dataset_id = "table_100"
+        csvp = e.to_pandas()
+        df = e.to_pandas(response="auto")
+        assert list(df.columns) == VARIABLES
+        assert (
+            df["temperature"].tolist()
+            == csvp["temperature (degree_C)"].tolist()
+        )
+        df = e.to_pandas(response="auto", usecols=["station"])
+        assert list(df.columns) == ["station"]
+
+
+@pytest.mark.parametrize("response", ["nc", "dods", "parquet"])
+def test_to_pandas_binary_kwargs(response):
+    """Test the read_csv kwargs are applied to the binary responses."""
+    with StandInServer() as server:
+        e = ERDDAP(server.url, protocol="tabledap")
+        e.dataset_id = "table_100"
+        urls = []
+        _urlopen.cache_clear()
+        with hooks(request=lambda event: urls.append(event.url)):
+            df = e.to_pandas(
+                response=response,
+                usecols=["temperature", "time"],
+                parse_dates=["time"],
+                index_col="time",
+            )
+        assert len(urls) == 1
+        assert urls[0].split("?")[0].endswith(f".{response}")
+        assert list(df.columns) == ["temperature"]
+        assert df.index[0] == pd.Timestamp("2020-01-01T00:00:00Z")
+
+        # The kwargs of the text parser fall back to the csvp response.
+        urls.clear()
+        with hooks(request=lambda event: urls.append(event.url)):
+            df = e.to_pandas(response=response, skiprows=[1])
+        assert len(urls) == 1
+        assert urls[0].split("?")[0].endswith(".csvp")
+        assert len(df) == 99  # noqa: PLR2004
+
+
+@pytest.mark.parametrize(
+    ("last", "response"),
+    # The single time step is small, csvp, unless it cannot be estimated.
+    [("last", "csvp"), ("(last)", "csvp"), ("last-1", "nc")],
+)
+def test_to_pandas_auto_griddap_last(cache, monkeypatch, last, response):  # noqa: ARG001
+    """Test the auto response of a griddap request ending at `last`."""
+    urls = []
+
+    def fake_to_pandas(url, requests_kwargs=None, pandas_kwargs=None):  # noqa: ARG001
+        urls.append(url)
+        return pd.DataFrame({"time": [0.0]})
+
+    monkeypatch.setattr("erddapy.erddapy.to_pandas", fake_to_pandas)
+    with StandInServer() as server:
+        e = ERDDAP(server.url, protocol="griddap")
+        e.dataset_id = "grid_10"
+        e.constraints["time>="] = last
+        e.constraints["time<="] = last
+        df = e.to_pandas(response="auto")
+    assert len(df) == 1
+    assert urls[0].split("?")[0].endswith(f".{response}")
@@ -0,0 +1,143 @@
+"""Test the server health statistics."""
+
+import datetime as dt
+import io
+
+import pytest
+import requests
+
+from erddapy import multiple_server_search
+from erddapy.core import health as health_module
+from erddapy.core import retry as retry_module
+from erddapy.core import url as url_module
+from erddapy.core.health import (
+    COOLDOWN,
+    FAILURES_TO_OPEN,
+    MIN_TIMEOUT,
+    HealthRegistry,
+)
+from erddapy.core.retry import RetryPolicy
+from erddapy.multiple_server_search import _fetch_all_results
+
+HOST = "erddap.ioos.us"
+
+
+def test_timeout():
+    """Test the timeout adapts once there are enough requests."""
+    registry = HealthRegistry()
+    assert registry.timeout(HOST, 120) == 120  # noqa: PLR2004
+    for _ in range(5):
+        registry.record(HOST, 0.1, ok=True)
+    assert registry.timeout(HOST, 120) == MIN_TIMEOUT
+    for _ in range(5):
+        registry.record(HOST, 10.0, ok=True)
+    assert registry.timeout(HOST, 120) == 40.0  # noqa: PLR2004
+    assert registry.timeout(HOST, 30) == 30  # noqa: PLR2004
+
+
+def test_circuit_breaker(monkeypatch):
+    """Test failing hosts are skipped for a growing cooldown."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(health_module.time, "time", lambda: now[0])
+    registry = HealthRegistry()
+    for _ in range(FAILURES_TO_OPEN - 1):
+        registry.record(HOST, 0.0, ok=False)
+    assert registry.available(HOST)
+    registry.record(HOST, 0.0, ok=False)
+    assert not registry.available(HOST)
+
+    now[0] += COOLDOWN
+    assert registry.available(HOST)
+    registry.record(HOST, 0.0, ok=False)
+    assert registry.hosts[HOST].cooldown == 2 * COOLDOWN
+    assert not registry.available(HOST)
+
+    now[0] += 2 * COOLDOWN
+    registry.record(HOST, 0.5, ok=True)
+    assert registry.available(HOST)
+    stats = registry.stats().loc[HOST]
+    assert stats["failures"] == FAILURES_TO_OPEN + 1
+    assert not stats["open"]
+
+
+def test_persistence(tmp_path):
+    """Test the statistics survive a new registry."""
+    path = tmp_path.joinpath("health.json")
+    registry = HealthRegistry(path=path)
+    registry.record(HOST, 0.5, ok=True)
+    registry.save()
+    restored = HealthRegistry(path=path)
+    assert list(restored.hosts[HOST].latencies) == [0.5]
+    assert restored.hosts[HOST].requests == 1
+
+
+def test_multi_urlopen_skips_failing_servers(monkeypatch):
+    """Test the multiple server searches skip open circuits."""
+    registry = HealthRegistry()
+    monkeypatch.setattr(url_module, "get_health_registry", lambda: registry)
+    timeouts = []
+
+    def fake_urlopen(url, requests_kwargs=None):  # noqa: ARG001
+        timeouts.append(requests_kwargs["timeout"])
+        return io.BytesIO(b"")
+
+    monkeypatch.setattr(url_module, "urlopen", fake_urlopen)
+    url = f"https://{HOST}/erddap/search/index.csv?searchFor=temperature"
+    assert url_module._multi_urlopen(url) is not None  # noqa: SLF001
+    for _ in range(FAILURES_TO_OPEN):
+        registry.record(HOST, 0.0, ok=False)
+    assert url_module._multi_urlopen(url) is None  # noqa: SLF001
+    assert timeouts == [url_module.MULTI_SEARCH_TIMEOUT]
+
+
+def test_parallel_search_shares_registry(monkeypatch):
+    """Test the parallel searches record to the registry of the caller."""
+    registry = HealthRegistry()
+    monkeypatch.setattr(url_module, "get_health_registry", lambda: registry)
+    monkeypatch.setattr(retry_module, "_retry_policy", RetryPolicy(attempts=1))
+    # More than one job, joblib runs a single one in the caller.
+    monkeypatch.setattr(
+        multiple_server_search.multiprocessing,
+        "cpu_count",
+        lambda: 2,
+    )
+    dead = "127.0.0.1:9"
+    urls = {
+        f"http://{dead}/erddap/{k}": (
+            f"http://{dead}/erddap/{k}/search/index.csv?searchFor=temperature"
+        )
+        for k in range(3)
+    }
+    assert _fetch_all_results(urls, protocol="tabledap", parallel=True) == []
+    assert registry.hosts[dead].requests == len(urls)
+
+
+def test_retries_record_one_outcome(monkeypatch):
+    """Test the retries of a request are added to the health once."""
+    registry = HealthRegistry()
+    monkeypatch.setattr(url_module, "get_health_registry", lambda: registry)
+    monkeypatch.setattr(
+        retry_module,
+        "_retry_policy",
+        RetryPolicy(backoff=0.0, jitter=False),
+    )
+    dead = "127.0.0.1:9"
+    for _ in range(FAILURES_TO_OPEN - 1):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            url_module.urlopen(f"http://{dead}/erddap/version")
+    assert registry.hosts[dead].requests == FAILURES_TO_OPEN - 1
+    assert registry.available(dead)
+
+    statuses = iter([503, 200])
+
+    def fake_get(url, **_kwargs):  # noqa: ARG001, ANN003
+        response = requests.Response()
+        response.status_code = next(statuses)
+        response._content = b"ERDDAP_version=2.23"  # noqa: SLF001
+        response.elapsed = dt.timedelta(seconds=0.1)
+        return response
+
+    monkeypatch.setattr(url_module.requests, "get", fake_get)
+    url_module.urlopen(f"http://{HOST}/erddap/version")
+    assert registry.hosts[HOST].requests == 1
+    assert registry.hosts[HOST].failures == 0
@@ -0,0 +1,64 @@
+"""Test the request and decode instrumentation hooks."""
+
+import pytest
+import requests
+
+from erddapy import ERDDAP
+from erddapy.benchmarks.server import StandInServer
+from erddapy.core.hooks import _hooks, add_hook, hooks
+from erddapy.core.url import _urlopen
+
+
+@pytest.fixture
+def server():
+    """Run the stand-in server with an empty `urlopen` cache."""
+    _urlopen.cache_clear()
+    with StandInServer() as server:
+        yield server
+    _urlopen.cache_clear()
+
+
+def test_hooks(server):
+    """Test requests, cache hits, and decoding are reported."""
+    e = ERDDAP(server.url, protocol="tabledap")
+    e.dataset_id = "table_10"
+    requested, decoded = [], []
+    with hooks(request=requested.append, decode=decoded.append):
+        e.to_pandas()
+        e.to_pandas()
+    assert _hooks == {"request": [], "decode": []}
+
+    miss, hit = requested
+    assert miss.status == 200  # noqa: PLR2004
+    assert miss.host == server.url.split("/")[2]
+    assert not miss.cache_hit
+    assert miss.nbytes > 0
+    assert 0 <= miss.ttfb <= miss.elapsed
+    assert hit.cache_hit
+    assert hit.nbytes == miss.nbytes
+    assert [event.decoder for event in decoded] == ["pandas", "pandas"]
+    assert decoded[0].nbytes == miss.nbytes
+
+
+def test_hooks_errors_and_streams(server):
+    """Test failed and streamed requests are reported."""
+    e = ERDDAP(server.url, protocol="tabledap")
+    e.dataset_id = "missing_10"
+    requested = []
+    with hooks(request=requested.append):
+        with pytest.raises(requests.exceptions.HTTPError):
+            e.to_pandas()
+        e.dataset_id = "table_10"
+        assert len(list(e.to_records())) == 10  # noqa: PLR2004
+    error, stream = requested
+    assert error.status == 404  # noqa: PLR2004
+    assert "Not Found" in error.error
+    assert stream.url.split("?")[0].endswith(".jsonlKVP")
+    assert stream.error is None
+    assert stream.nbytes > 0
+
+
+def test_add_hook_invalid_kind():
+    """Test only the known events can be hooked."""
+    with pytest.raises(ValueError, match="must be one of"):
+        add_hook("response", print)
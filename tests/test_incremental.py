@@ -0,0 +1,65 @@
+"""Test the incremental append mode."""
+
+import pandas as pd
+import pytest
+import requests
+
+from erddapy import ERDDAP
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def buoy():
+    """Instantiate a tabledap query with a relative time constraint."""
+    e = ERDDAP(server="https://erddap.ioos.us/erddap", protocol="tabledap")
+    e.dataset_id = "buoy"
+    e.variables = ["time", "temperature"]
+    e.constraints = {"time>=": "now-7days", "station=": "A"}
+    return e
+
+
+def test_fetch_incremental(buoy, tmp_path, monkeypatch):
+    """Test only rows newer than the stored ones are requested."""
+    urls = []
+    responses = [
+        pd.DataFrame(
+            {
+                "time (UTC)": ["2020-01-01T00:00:00Z", "2020-01-01T01:00:00Z"],
+                "temperature (degree_C)": [1.0, 2.0],
+            },
+        ),
+        pd.DataFrame(
+            {
+                "time (UTC)": ["2020-01-01T02:00:00Z"],
+                "temperature (degree_C)": [3.0],
+            },
+        ),
+    ]
+
+    def fake_to_pandas(url, requests_kwargs=None):  # noqa: ARG001
+        urls.append(url)
+        if not responses:
+            msg = "Your query produced no matching results."
+            raise requests.HTTPError(msg)
+        return responses.pop(0)
+
+    monkeypatch.setattr("erddapy.erddapy.to_pandas", fake_to_pandas)
+
+    first = buoy.fetch_incremental(tmp_path)
+    expected = 2
+    assert len(first) == expected
+    assert "now-7days" in urls[0]
+
+    second = buoy.fetch_incremental(tmp_path)
+    assert len(second) == 1
+    # 2020-01-01T01:00:00Z in seconds since 1970.
+    assert "time>1577840400.0" in urls[1]
+    assert "now-7days" not in urls[1]
+
+    assert buoy.fetch_incremental(tmp_path).empty
+
+    stored = pd.read_parquet(tmp_path)
+    expected = 3
+    assert len(stored) == expected
+    assert stored["time (UTC)"].is_monotonic_increasing
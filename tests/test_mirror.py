@@ -0,0 +1,162 @@
+"""Test the local parquet mirror."""
+
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from erddapy import ERDDAP
+from erddapy.core.parquet import _partition_name, _write_partition
+from erddapy.mirror import Mirror
+
+pytest.importorskip("pyarrow")
+
+SERVER = "https://erddap.ioos.us/erddap"
+
+
+@pytest.fixture
+def urls(monkeypatch):
+    """Serve hourly rows of two stations and record the URLs."""
+    urls = []
+
+    def fake_to_pandas(url, requests_kwargs=None, pandas_kwargs=None):  # noqa: ARG001
+        urls.append(url)
+        bounds = dict(re.findall(r"&time(>=|>|<=|<)([\d.]+)", url))
+        seconds = np.arange(0, 72 * 3600, 3600.0)
+        keep = np.ones(seconds.size, dtype=bool)
+        for op, value in bounds.items():
+            keep &= {
+                ">=": np.greater_equal,
+                ">": np.greater,
+                "<=": np.less_equal,
+                "<": np.less,
+            }[op](seconds, float(value))
+        times = pd.to_datetime(seconds[keep], unit="s", utc=True)
+        return pd.DataFrame(
+            {
+                "station": np.repeat(["A", "B"], keep.sum()),
+                "time (UTC)": np.tile(times.strftime("%Y-%m-%dT%H:%M:%SZ"), 2),
+                "temperature (degree_C)": np.tile(seconds[keep] / 3600, 2),
+            },
+        )
+
+    monkeypatch.setattr("erddapy.mirror.to_pandas", fake_to_pandas)
+    monkeypatch.setattr("erddapy.erddapy.to_pandas", fake_to_pandas)
+    return urls
+
+
+def test_mirror_sync_and_read(urls, tmp_path):
+    """Test periods are mirrored, refreshed incrementally, and read back."""
+    mirror = Mirror(tmp_path, SERVER, "buoy", freq="D", station="station")
+
+    rows = mirror.sync(start="1970-01-01", stop="1970-01-02T12:00:00")
+    expected = 2 * (24 + 12)
+    assert rows == expected
+    assert (tmp_path / "period=1970-01-01" / "station=A").is_dir()
+
+    # The first day is complete, the second is refreshed incrementally.
+    rows = mirror.sync(stop="1970-01-03T00:00:00")
+    assert rows == 2 * 12
+    # The stations of the open day are listed, all of them are stored.
+    assert len(urls) == 4  # noqa: PLR2004
+    assert urls[-2].endswith("&distinct()")
+    # 1970-01-02T11:00:00Z in seconds since 1970.
+    assert "&time>126000.0" in urls[-1]
+
+    e = ERDDAP(server=SERVER, protocol="tabledap")
+    e.dataset_id = "buoy"
+    e.mirror = mirror
+    e.variables = ["time", "temperature"]
+    e.constraints = {
+        "time>=": "1970-01-01T06:00:00Z",
+        "time<=": "1970-01-02T18:00:00Z",
+        "station=": "A",
+    }
+    df = e.to_pandas()
+    assert len(urls) == 4  # noqa: PLR2004
+    assert list(df.columns) == ["time (UTC)", "temperature (degree_C)"]
+    np.testing.assert_array_equal(df["temperature (degree_C)"], range(6, 43))
+
+    df = e.to_pandas(parse_dates=["time (UTC)"])
+    assert df["time (UTC)"].dt.hour.iloc[0] == 6  # noqa: PLR2004
+
+    # Requests outside of the mirror go to the server.
+    e.constraints["time<="] = "1970-01-03T18:00:00Z"
+    assert not mirror.covers(e.variables, e.constraints)
+    assert len(e.to_pandas()) == 2 * 61
+    assert len(urls) == 5  # noqa: PLR2004
+
+
+def test_mirror_sync_lagging_station(urls, tmp_path):
+    """Test a station behind the others is refreshed from its own time."""
+    mirror = Mirror(tmp_path, SERVER, "buoy", freq="D", station="station")
+    mirror.sync(start="1970-01-01", stop="1970-01-01T12:00:00")
+
+    # Station B only has the first 6 hours.
+    directory = tmp_path / "period=1970-01-01" / "station=B"
+    (path,) = directory.glob("*.parquet")
+    df = pd.read_parquet(path).iloc[:6]
+    path.unlink()
+    times = pd.to_datetime(df["time (UTC)"], utc=True)
+    _write_partition(df, directory / _partition_name(mirror.key, times.max()))
+
+    rows = mirror.sync(stop="1970-01-01T18:00:00")
+    # 1970-01-01T05:00:00Z in seconds since 1970.
+    assert "&time>18000.0" in urls[-1]
+    assert rows == 6 + 12
+    e = ERDDAP(server=SERVER, protocol="tabledap")
+    e.dataset_id = "buoy"
+    e.mirror = mirror
+    e.variables = ["station", "time", "temperature"]
+    e.constraints = {
+        "time>=": "1970-01-01T00:00:00Z",
+        "time<": "1970-01-01T18:00:00Z",
+    }
+    df = e.to_pandas()
+    assert len(urls) == 3  # noqa: PLR2004
+    assert df["station"].value_counts().to_dict() == {"A": 18, "B": 18}
+
+
+def test_mirror_sync_new_station(monkeypatch, tmp_path):
+    """Test a station new to a period is fetched from the period start."""
+    urls = []
+
+    def fake_to_pandas(url, requests_kwargs=None, pandas_kwargs=None):  # noqa: ARG001
+        urls.append(url)
+        bounds = dict(re.findall(r"&time(>=|>|<)([\d.]+)", url))
+        seconds = np.arange(0, 24 * 3600, 3600.0)
+        seconds = seconds[seconds < float(bounds["<"])]
+        seconds = seconds[seconds >= float(bounds.get(">=", -1))]
+        seconds = seconds[seconds > float(bounds.get(">", -1))]
+        # Station 2 arrives late, with its past rows, at the second sync.
+        stations = [1] if len(urls) == 1 else [1, 2]
+        df = pd.DataFrame(
+            {
+                "station": np.repeat(stations, seconds.size),
+                "time (UTC)": np.tile(
+                    pd.to_datetime(seconds, unit="s", utc=True).strftime(
+                        "%Y-%m-%dT%H:%M:%SZ",
+                    ),
+                    len(stations),
+                ),
+                "temperature (degree_C)": np.tile(seconds, len(stations)),
+            },
+        )
+        if url.endswith("&distinct()"):
+            return df[["station"]].drop_duplicates()
+        return df
+
+    monkeypatch.setattr("erddapy.mirror.to_pandas", fake_to_pandas)
+    mirror = Mirror(tmp_path, SERVER, "buoy", freq="D", station="station")
+    assert mirror.sync(start="1970-01-01", stop="1970-01-01T12:00:00") == 12  # noqa: PLR2004
+    rows = mirror.sync(stop="1970-01-01T18:00:00")
+    assert "&time>=0.0" in urls[-1]
+    assert rows == 6 + 18
+
+    df = mirror.read(
+        ["station", "time", "temperature"],
+        {"time>=": "1970-01-01T00:00:00Z", "time<": "1970-01-01T18:00:00Z"},
+    )
+    assert df["station"].dtype == "int64"
+    assert df["station"].value_counts().to_dict() == {1: 18, 2: 18}
@@ -0,0 +1,84 @@
+"""Test the NCCSV reader."""
+
+import io
+
+import pandas as pd
+import pytest
+
+from erddapy import ERDDAP
+from erddapy.core import interfaces
+from erddapy.core.cache import MetadataCache
+from erddapy.core.nccsv import _parse_nccsv
+
+NCCSV = b"""*GLOBAL*,Conventions,"COARDS, CF-1.6, ACDD-1.3, NCCSV-1.2"
+*GLOBAL*,title,"Buoy ""A"" data"
+station,*DATA_TYPE*,String
+station,cf_role,timeseries_id
+time,*DATA_TYPE*,String
+time,units,yyyy-MM-dd'T'HH:mm:ssZ
+time,actual_range,1970-01-01T00:00:00Z,1970-01-01T01:00:00Z
+count,*DATA_TYPE*,long
+temperature,*DATA_TYPE*,float
+temperature,actual_range,1.5f,30.25f
+temperature,standard_name,sea_water_temperature
+temperature,units,degree_C
+
+*END_METADATA*
+station,time,count,temperature
+A,2020-01-01T00:00:00Z,1L,1.5
+NaN,2020-01-01T01:00:00Z,2L,NaN
+*END_DATA*
+"""
+
+
+def test__parse_nccsv():
+    """Test the data and the attributes are read from one response."""
+    df = _parse_nccsv(NCCSV)
+    assert list(df.columns) == ["station", "time", "count", "temperature"]
+    # Strings are not converted to missing values.
+    assert list(df["station"]) == ["A", "NaN"]
+    assert list(df["count"]) == [1, 2]
+    assert df["temperature"].isna().iloc[1]
+    assert df.attrs["NC_GLOBAL"]["title"] == 'Buoy "A" data'
+    assert df.attrs["temperature"] == {
+        "actual_range": "1.5, 30.25",
+        "standard_name": "sea_water_temperature",
+        "units": "degree_C",
+    }
+
+
+def test_to_pandas_nccsv_fills_metadata_cache(monkeypatch):
+    """Test the nccsv metadata replaces the info request."""
+    cache = MetadataCache()
+    monkeypatch.setattr("erddapy.erddapy.get_metadata_cache", lambda: cache)
+    monkeypatch.setattr(
+        interfaces,
+        "urlopen",
+        lambda _url, requests_kwargs=None: io.BytesIO(NCCSV),  # noqa: ARG005
+    )
+
+    def no_info(_self, dataset_id=None):  # noqa: ARG001
+        msg = "The info response should not be requested."
+        raise AssertionError(msg)
+
+    monkeypatch.setattr(ERDDAP, "_get_variables_uncached", no_info)
+    e = ERDDAP(server="https://erddap.ioos.us/erddap", protocol="tabledap")
+    e.dataset_id = "buoy"
+    df = e.to_pandas(response="nccsv", parse_dates=["time"])
+    assert isinstance(df["time"].dtype, pd.DatetimeTZDtype)
+    assert df.attrs["temperature"]["units"] == "degree_C"
+    assert e.get_var_by_attr(standard_name="sea_water_temperature") == [
+        "temperature",
+    ]
+    # The time attributes are stored like the info response has them.
+    variables = e._get_variables()  # noqa: SLF001
+    assert variables["time"]["units"] == "seconds since 1970-01-01T00:00:00Z"
+    assert variables["time"]["actual_range"] == "0.0, 3600.0"
+    assert df.attrs["time"]["units"] == "yyyy-MM-dd'T'HH:mm:ssZ"
+
+    other = ERDDAP(server="https://erddap.ioos.us/erddap", protocol="tabledap")
+    other.dataset_id = "other"
+    other.variables = ["time"]
+    other.to_pandas(response="nccsv")
+    with pytest.raises(AssertionError, match="info response"):
+        other.get_var_by_attr(standard_name="sea_water_temperature")
@@ -0,0 +1,147 @@
+"""Test request size estimation and planning."""
+
+import io
+import math
+
+import numpy as np
+
+from erddapy import ERDDAP
+from erddapy.benchmarks.server import StandInServer, ncml_payload
+from erddapy.core.griddap import _griddap_parse_ncml
+from erddapy.core.planner import (
+    _griddap_estimate,
+    _griddap_split_constraints,
+    _split_time_constraints,
+    _tabledap_estimate,
+)
+
+metadata = {
+    "dimensions": {"time": 11, "latitude": 101},
+    "variables": {
+        "time": {"type": "double", "shape": ["time"]},
+        "latitude": {"type": "float", "shape": ["latitude"]},
+        "sst": {"type": "float", "shape": ["time", "latitude"]},
+    },
+    "actual_range": {"time": ["0", "10"], "latitude": ["0", "100"]},
+}
+
+
+def test__griddap_estimate():
+    """Test griddap estimates from the dimension ranges and steps."""
+    constraints = {
+        "time>=": "0",
+        "time<=": "10",
+        "time_step": "1",
+        "latitude>=": "0",
+        "latitude<=": "50",
+        "latitude_step": "2",
+    }
+    estimate = _griddap_estimate(
+        metadata,
+        constraints=constraints,
+        dim_names=["time", "latitude"],
+        variables=["sst"],
+        response="nc",
+    )
+    expected_rows = 11 * 26
+    assert estimate.rows == expected_rows
+    assert estimate.nbytes == expected_rows * 4
+    assert not estimate.exact
+
+
+def test__tabledap_estimate():
+    """Test tabledap estimates from orderByCount results."""
+    estimate = _tabledap_estimate({"time": 10, "temperature": 8}, "csvp")
+    expected_rows = 10
+    assert estimate.rows == expected_rows
+    assert estimate.cells == expected_rows * 2
+    assert estimate.exact
+
+
+def test__split_time_constraints():
+    """Test time windows do not overlap and keep the user's edges."""
+    constraints = {
+        "time>": "2020-01-01T00:00:00Z",
+        "time<=": "2020-01-04T00:00:00Z",
+        "station=": "buoy",
+    }
+    pieces = _split_time_constraints(constraints, 3)
+    expected = 3
+    assert len(pieces) == expected
+    assert pieces[0]["time>"] == constraints["time>"]
+    assert pieces[0]["time<"] == "2020-01-02T00:00:00.000000Z"
+    assert pieces[1] == {
+        "station=": "buoy",
+        "time>=": "2020-01-02T00:00:00.000000Z",
+        "time<": "2020-01-03T00:00:00.000000Z",
+    }
+    assert pieces[2]["time<="] == constraints["time<="]
+
+
+def test__split_time_constraints_relative():
+    """Test relative time constraints are not split."""
+    constraints = {"time>=": "now-7days", "time<=": "now"}
+    assert _split_time_constraints(constraints, 3) == [constraints]
+
+
+def test__griddap_split_constraints():
+    """Test griddap splits time first and tiles when it is not enough."""
+    axes = {"time": np.arange(2.0), "latitude": np.arange(10.0)}
+    indices = {"time": (0, 1, 1), "latitude": (0, 1, 9)}
+    strategy, pieces = _griddap_split_constraints({}, indices, axes, 2)
+    assert strategy == "time-split"
+    assert [(p["time>="], p["time<="]) for p in pieces] == [
+        ("0.0", "0.0"),
+        ("1.0", "1.0"),
+    ]
+
+    strategy, pieces = _griddap_split_constraints({}, indices, axes, 4)
+    assert strategy == "tiled"
+    expected = 4
+    assert len(pieces) == expected
+    assert {(p["latitude>="], p["latitude<="]) for p in pieces} == {
+        ("0.0", "4.0"),
+        ("5.0", "9.0"),
+    }
+
+
+def test__griddap_estimate_last_and_parentheses():
+    """Test `last` and parenthesized bounds are resolved locally."""
+    constraints = {
+        "time>=": "(5)",
+        "time<=": "last",
+        "time_step": "1",
+        "latitude>=": "(0)",
+        "latitude<=": "(last)",
+        "latitude_step": "1",
+    }
+    kw = {
+        "constraints": constraints,
+        "dim_names": ["time", "latitude"],
+        "variables": ["sst"],
+        "response": "nc",
+    }
+    # Without the axes `last` is the end of the actual_range.
+    assert _griddap_estimate(metadata, **kw).rows == 6 * 101
+    axes = {"time": np.arange(8.0), "latitude": None}
+    assert _griddap_estimate(metadata, axes=axes, **kw).rows == 3 * 101
+
+    constraints["time>="] = "(1970-01-01T00:00:05Z)"
+    assert _griddap_estimate(metadata, **kw).rows == 6 * 101
+
+
+def test_estimate_size_last():
+    """Test the estimate of a griddap request with a `last` time bound."""
+    with StandInServer() as server:
+        e = ERDDAP(server.url, protocol="griddap")
+        e.dataset_id = "grid_10"
+        e.constraints["time>="] = "last"
+        e.constraints["time<="] = "(last)"
+        estimate = e.estimate_size(response="nc")
+    lengths = _griddap_parse_ncml(io.BytesIO(ncml_payload("grid_10")))
+    points = math.prod(
+        length
+        for dim, length in lengths["dimensions"].items()
+        if dim != "time"
+    )
+    assert estimate.rows == points
@@ -0,0 +1,95 @@
+"""Test the profiling of the data requests."""
+
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import erddapy
+from erddapy import ERDDAP
+from erddapy.benchmarks.server import StandInServer
+from erddapy.core.profiling import PROFILE_ENV, _phase
+from erddapy.core.url import _urlopen
+
+
+@pytest.fixture
+def buoy():
+    """Request a stand-in dataset with an empty `urlopen` cache."""
+    _urlopen.cache_clear()
+    with StandInServer() as server:
+        e = ERDDAP(server.url, protocol="tabledap")
+        e.dataset_id = "table_100"
+        yield e
+    _urlopen.cache_clear()
+
+
+def test_profile(buoy):
+    """Test the phases are timed and the report is printed."""
+    report = io.StringIO()
+    with erddapy.profile("buoy", file=report) as prof:
+        buoy.to_pandas()
+    assert set(prof.phases) == {"fetch", "copy", "parse"}
+    assert prof.phases["fetch"]["calls"] == 1
+    assert prof.phases["parse"]["peak"] > 0
+    assert prof.elapsed >= prof.phases["fetch"]["seconds"]
+    assert prof.peak >= prof.phases["parse"]["peak"]
+    text = report.getvalue()
+    assert text.startswith("buoy: ")
+    assert "ncalls" in text
+
+    with erddapy.profile(report=False), pytest.raises(RuntimeError):
+        erddapy.profile().__enter__()
+
+
+def test_profile_env(buoy, monkeypatch, capsys):
+    """Test the environment variable profiles the `to_*` calls."""
+    buoy.to_pandas()
+    assert capsys.readouterr().err == ""
+    monkeypatch.setenv(PROFILE_ENV, "1")
+    buoy.to_pandas()
+    assert capsys.readouterr().err.startswith("ERDDAP.to_pandas: ")
+
+
+def test_profile_env_threads(buoy, monkeypatch, capsys):
+    """Test concurrent calls do not fail when another one is profiled."""
+    monkeypatch.setenv(PROFILE_ENV, "1")
+
+    def request(rows):
+        e = ERDDAP(buoy.server, protocol="tabledap")
+        e.dataset_id = f"table_{rows}"
+        return len(e.to_pandas())
+
+    rows = list(range(100, 116))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(request, rows)) == rows
+    assert "ERDDAP.to_pandas: " in capsys.readouterr().err
+
+
+def test_phase_threads():
+    """Test a concurrent phase does not reset the peak of the others."""
+    freed = threading.Event()
+    reset = threading.Event()
+
+    def allocate():
+        with _phase("parse"):
+            data = bytearray(2**22)
+            del data
+            freed.set()
+            reset.wait()
+
+    def other():
+        freed.wait()
+        with _phase("copy"):
+            reset.set()
+
+    with erddapy.profile(report=False) as prof:
+        threads = [
+            threading.Thread(target=allocate),
+            threading.Thread(target=other),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert prof.phases["parse"]["peak"] >= 2**22
@@ -0,0 +1,60 @@
+"""Test the streaming record interface."""
+
+import pytest
+
+from erddapy import ERDDAP
+
+KVP = [
+    b'{"time":"2020-01-01T00:00:00Z","temperature":1.5}',
+    b'{"time":"2020-01-01T01:00:00Z","temperature":null}',
+    b"",
+]
+
+CSV1 = [
+    b'["time","temperature"]',
+    b'["2020-01-01T00:00:00Z",1.5]',
+    b'["2020-01-01T01:00:00Z",null]',
+]
+
+
+@pytest.fixture
+def buoy():
+    """Instantiate a tabledap request."""
+    e = ERDDAP(server="https://erddap.ioos.us/erddap", protocol="tabledap")
+    e.dataset_id = "buoy"
+    e.variables = ["time", "temperature"]
+    return e
+
+
+def test_to_records(buoy, monkeypatch):
+    """Test records are parsed while the lines are read."""
+    read = []
+
+    def fake_urliterlines(url, requests_kwargs=None):  # noqa: ARG001
+        lines = CSV1 if url.split("?")[0].endswith("CSV1") else KVP
+        for line in lines:
+            read.append(line)
+            yield line
+
+    monkeypatch.setattr(
+        "erddapy.core.interfaces._urliterlines",
+        fake_urliterlines,
+    )
+    records = buoy.to_records()
+    assert read == []
+    assert next(records) == {
+        "time": "2020-01-01T00:00:00Z",
+        "temperature": 1.5,
+    }
+    assert len(read) == 1
+    assert next(records)["temperature"] is None
+    assert list(records) == []
+
+    records = list(buoy.to_records(response="jsonlCSV1"))
+    assert records == [
+        ("2020-01-01T00:00:00Z", 1.5),
+        ("2020-01-01T01:00:00Z", None),
+    ]
+
+    with pytest.raises(ValueError, match="jsonlCSV or jsonlKVP"):
+        buoy.to_records(response="csvp")
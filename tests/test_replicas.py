@@ -0,0 +1,117 @@
+"""Test the routing of requests to the fastest replica."""
+
+import time
+
+import pytest
+import requests
+
+from erddapy import ERDDAP
+from erddapy.benchmarks.server import StandInServer
+from erddapy.core import replicas as replicas_module
+from erddapy.core.cache import MetadataCache
+from erddapy.core.health import MIN_SAMPLES, HealthRegistry
+from erddapy.core.replicas import Replicas, _host
+
+DEAD = "http://127.0.0.1:9/erddap"
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """Run a stand-in server with empty caches and statistics."""
+    cache = MetadataCache()
+    health = HealthRegistry()
+    monkeypatch.setattr(replicas_module, "get_metadata_cache", lambda: cache)
+    monkeypatch.setattr(replicas_module, "get_health_registry", lambda: health)
+    with StandInServer() as server:
+        yield server
+
+
+def test_probe(stand_in):
+    """Test servers that do not answer are left out."""
+    replicas = Replicas("table_100", [stand_in.url, DEAD])
+    df = replicas.probe()
+    assert df.index[0] == stand_in.url
+    assert df["latency"].isna().tolist() == [False, True]
+    assert replicas.ranked() == [stand_in.url]
+
+
+def test_ranked_by_latency(stand_in):
+    """Test the cached probes rank the servers."""
+    slow = stand_in.url.replace("/erddap", "/slow/erddap")
+    replicas = Replicas("table_100", [slow, stand_in.url])
+    cache = replicas_module.get_metadata_cache()
+    cache.set(slow, "table_100", "replica", {"latency": 1.0})
+    cache.set(stand_in.url, "table_100", "replica", {"latency": 0.1})
+    assert replicas.ranked() == [stand_in.url, slow]
+
+
+def test_failover(stand_in):
+    """Test the request goes to the next replica when the fastest fails."""
+    replicas = Replicas({DEAD: "table_100", stand_in.url: "table_100"})
+    cache = replicas_module.get_metadata_cache()
+    cache.set(DEAD, "table_100", "replica", {"latency": 0.01})
+    cache.set(stand_in.url, "table_100", "replica", {"latency": 1.0})
+
+    e = ERDDAP(DEAD, protocol="tabledap")
+    e.dataset_id = "table_100"
+    e.replicas = replicas
+    df = e.to_pandas()
+    assert len(df) == 100  # noqa: PLR2004
+    assert e.server == DEAD
+
+
+def test_hedge(stand_in):
+    """Test a slow request is sent to the next replica."""
+    slow = stand_in.url.replace("/erddap", "/slow/erddap")
+    replicas = Replicas("table_100", [slow, stand_in.url], hedge=0.9)
+    health = replicas_module.get_health_registry()
+    cache = replicas_module.get_metadata_cache()
+    cache.set(slow, "table_100", "replica", {"latency": 0.01})
+    cache.set(stand_in.url, "table_100", "replica", {"latency": 0.1})
+    # Both replicas share the host of the stand-in.
+    for _ in range(MIN_SAMPLES):
+        health.record(_host(slow), 0.05, ok=True)
+
+    def func(server, dataset_id):
+        if server == slow:
+            time.sleep(1)
+            return "slow"
+        return dataset_id
+
+    start = time.perf_counter()
+    assert replicas.fetch(func) == "table_100"
+    assert time.perf_counter() - start < 1
+
+
+def test_no_results_do_not_fail_over(stand_in):
+    """Test an empty result is not retried on the other replicas."""
+    replicas = Replicas("table_100", [stand_in.url, DEAD])
+    calls = []
+
+    def func(server, _):
+        calls.append(server)
+        msg = "Your query produced no matching results."
+        raise requests.exceptions.HTTPError(msg)
+
+    cache = replicas_module.get_metadata_cache()
+    cache.set(DEAD, "table_100", "replica", {"latency": 0.5})
+    with pytest.raises(requests.exceptions.HTTPError):
+        replicas.fetch(func)
+    assert calls == [stand_in.url]
+
+
+@pytest.mark.parametrize(("status", "cached"), [(503, None), (404, True)])
+def test_probe_errors_cache(stand_in, monkeypatch, status, cached):
+    """Test only a missing dataset, not a transient error, is cached."""
+    replicas = Replicas("table_100", [stand_in.url])
+    response = requests.Response()
+    response.status_code = status
+
+    def failing(url, requests_kwargs):  # noqa: ARG001
+        raise requests.exceptions.HTTPError(response=response)
+
+    monkeypatch.setattr(replicas_module, "_urlstream", failing)
+    assert replicas.ranked() == []
+    cache = replicas_module.get_metadata_cache()
+    entry = cache.get(stand_in.url, "table_100", "replica")
+    assert entry == ({"latency": None} if cached else None)
@@ -0,0 +1,130 @@
+"""Test the retries of the transient errors."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from erddapy.core import retry as retry_module
+from erddapy.core.hooks import hooks
+from erddapy.core.retry import RetryPolicy, _retry_after
+from erddapy.core.url import _urlopen, _urlretrieve, urlopen
+
+# Larger than the chunks of `_urlretrieve`, a cut leaves a complete one.
+CONTENT = bytes(range(256)) * 3 * 2**12
+
+
+def _http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.exceptions.HTTPError(response=response)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Fail the first request of each path, then answer it."""
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("Range")))
+        first = [path for path, _ in self.server.requests].count(self.path)
+        if self.path.startswith("/busy") and first == 1:
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "4")
+            self.end_headers()
+            self.wfile.write(b"busy")
+            return
+        if self.path.startswith("/cut") and first == 1:
+            # Promise all the content and close the connection halfway.
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(CONTENT)))
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            self.wfile.write(CONTENT[: len(CONTENT) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        body, status = CONTENT, 200
+        ranges = self.headers.get("Range")
+        if ranges and self.headers.get("If-Range") == '"v1"':
+            body = CONTENT[int(ranges.split("=")[1].rstrip("-")) :]
+            status = 206
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        """Do not log the requests."""
+
+
+@pytest.fixture
+def flaky_server(monkeypatch):
+    """Run a server that fails the first request of each path."""
+    monkeypatch.setattr(
+        retry_module,
+        "_retry_policy",
+        RetryPolicy(backoff=0.01),
+    )
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_delay():
+    """Test the delays of the policy."""
+    policy = RetryPolicy(attempts=3, backoff=1, jitter=False)
+    assert policy.delay(0, _http_error(503)) == 1
+    assert policy.delay(1, _http_error(503)) == 2  # noqa: PLR2004
+    assert policy.delay(2, _http_error(503)) is None
+    assert policy.delay(0, _http_error(404)) is None
+    assert policy.delay(0, requests.exceptions.ConnectionError()) == 1
+    assert policy.delay(0, requests.exceptions.ReadTimeout()) is None
+    error = _http_error(429, {"Retry-After": "10"})
+    assert policy.delay(0, error) == 10  # noqa: PLR2004
+    error = _http_error(429, {"Retry-After": "3600"})
+    assert policy.delay(0, error) is None
+
+
+def test_retry_after_date():
+    """Test the HTTP date form of Retry-After."""
+    assert _retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert _retry_after("soon") is None
+    assert _retry_after(None) is None
+
+
+def test_urlopen_retries(flaky_server):
+    """Test a 503 is retried and the hooks see the retries."""
+    url = f"http://127.0.0.1:{flaky_server.server_address[1]}/busy/erddap"
+    events = []
+    _urlopen.cache_clear()
+    with hooks(request=events.append):
+        data = urlopen(url)
+    assert data.read() == CONTENT
+    assert [event.status for event in events] == [503, 200]
+    assert [event.retries for event in events] == [0, 1]
+
+
+def test_urlretrieve_resumes(flaky_server, tmp_path):
+    """Test a cut download is resumed where it stopped."""
+    url = f"http://127.0.0.1:{flaky_server.server_address[1]}/cut/erddap"
+    path = _urlretrieve(url, tmp_path.joinpath("data.bin"))
+    assert path.read_bytes() == CONTENT
+    assert flaky_server.requests == [
+        ("/cut/erddap", None),
+        ("/cut/erddap", f"bytes={2**20}-"),
+    ]
+
+
+def test_no_retries(flaky_server):
+    """Test a single attempt policy raises the first error."""
+    retry_module.set_retry_policy(RetryPolicy(attempts=1))
+    url = f"http://127.0.0.1:{flaky_server.server_address[1]}/busy/erddap"
+    _urlopen.cache_clear()
+    with pytest.raises(requests.exceptions.HTTPError):
+        urlopen(url)
@@ -0,0 +1,153 @@
+"""Test the split-and-retry of requests that are too big."""
+
+import threading
+
+import pandas as pd
+import pytest
+import requests
+
+from erddapy import ERDDAP
+from erddapy import erddapy as erddapy_module
+from erddapy.core.planner import _split_time_constraints
+from erddapy.core.split import (
+    _is_size_error,
+    _merge_frames,
+    _merge_text_files,
+    _split_fetch,
+)
+
+
+def _bisect(constraints):
+    return _split_time_constraints(constraints, 2)
+
+
+def test__is_size_error():
+    """Test ERDDAP's size errors are recognized."""
+    too_much = requests.HTTPError(
+        "Error {code=413; message=Payload Too Large: "
+        'Your query produced too much data."}',
+    )
+    assert _is_size_error(too_much)
+    assert _is_size_error(requests.exceptions.ReadTimeout())
+    assert not _is_size_error(requests.HTTPError("Resource not found."))
+    assert not _is_size_error(requests.exceptions.ConnectTimeout())
+    assert not _is_size_error(requests.exceptions.ConnectionError())
+
+
+def test__split_fetch():
+    """Test requests are bisected until the pieces are small enough."""
+    constraints = {
+        "time>=": "2020-01-01T00:00:00Z",
+        "time<=": "2020-01-05T00:00:00Z",
+    }
+    fetched = []
+
+    def fetch(piece):
+        start = pd.Timestamp(piece["time>="])
+        stop = pd.Timestamp(piece.get("time<", piece.get("time<=")))
+        if stop - start > pd.Timedelta(days=1):
+            msg = "Your query produced too much data."
+            raise requests.HTTPError(msg)
+        fetched.append(piece)
+        return pd.DataFrame({"start": [start]})
+
+    frames = _split_fetch(fetch, constraints, _bisect, depth=2)
+    expected = 4
+    assert len(frames) == expected
+    df = _merge_frames(frames)
+    assert df["start"].is_monotonic_increasing
+    assert list(df.index) == list(range(expected))
+
+    with pytest.raises(requests.HTTPError, match="too much data"):
+        _split_fetch(fetch, constraints, _bisect, depth=1)
+
+
+def test__split_fetch_other_errors():
+    """Test errors unrelated to the request size are not retried."""
+    calls = []
+
+    def fetch(piece):
+        calls.append(piece)
+        msg = "Resource not found."
+        raise requests.HTTPError(msg)
+
+    constraints = {"time>=": "2020-01-01", "time<=": "2020-01-05"}
+    with pytest.raises(requests.HTTPError, match="not found"):
+        _split_fetch(fetch, constraints, _bisect, depth=3)
+    assert calls == [constraints]
+
+
+@pytest.mark.parametrize(
+    "error",
+    [requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError],
+)
+def test__split_fetch_unreachable(error):
+    """Test an unreachable server is not bisected."""
+    calls = []
+
+    def fetch(piece):
+        calls.append(piece)
+        raise error
+
+    constraints = {"time>=": "2020-01-01", "time<=": "2020-01-05"}
+    with pytest.raises(error):
+        _split_fetch(fetch, constraints, _bisect, depth=3)
+    assert calls == [constraints]
+
+
+def test__merge_text_files(tmp_path):
+    """Test text pieces are appended without repeating the headers."""
+    parts = []
+    for k in range(2):
+        part = tmp_path.joinpath(f"part{k}")
+        part.write_text(f"time,temperature\nUTC,degree_C\n{k},1.0\n")
+        parts.append(part)
+    merged = _merge_text_files(parts, tmp_path.joinpath("out.csv"), "csv")
+    assert (
+        merged.read_text() == "time,temperature\nUTC,degree_C\n0,1.0\n1,1.0\n"
+    )
+
+
+def test_download_file_concurrent_parts(monkeypatch, tmp_path):
+    """Test the concurrent pieces of a download do not share a part file."""
+    monkeypatch.chdir(tmp_path)
+    e = ERDDAP("https://erddap.ioos.us/erddap", protocol="tabledap")
+    e.dataset_id = "OBIS"
+    e.constraints = {
+        "time>=": "2020-01-01T00:00:00Z",
+        "time<=": "2020-01-05T00:00:00Z",
+    }
+
+    def get_download_url(constraints=None, **_: object):
+        constraints = constraints or e.constraints
+        start = constraints["time>="]
+        stop = constraints.get("time<=", constraints.get("time<"))
+        return (
+            f"https://erddap.ioos.us/erddap/tabledap/OBIS.csv?{start}|{stop}"
+        )
+
+    e.get_download_url = get_download_url
+    names = []
+    barrier = threading.Barrier(2, timeout=5)
+
+    def urlretrieve(url, part, requests_kwargs=None):  # noqa: ARG001
+        start, stop = url.split("?")[1].split("|")
+        if pd.Timestamp(stop) - pd.Timestamp(start) > pd.Timedelta(days=2):
+            msg = "Your query produced too much data."
+            raise requests.HTTPError(msg)
+        names.append(part.name)
+        # Both halves are in flight at once.
+        barrier.wait()
+        part.write_text(f"time\nUTC\n{start}\n")
+        return part
+
+    monkeypatch.setattr(erddapy_module, "_urlretrieve", urlretrieve)
+    file_name = e.download_file("csv")
+    assert len(set(names)) == len(names) == 2  # noqa: PLR2004
+    assert file_name.read_text().splitlines() == [
+        "time",
+        "UTC",
+        "2020-01-01T00:00:00Z",
+        "2020-01-03T00:00:00.000000Z",
+    ]
+    assert not list(tmp_path.glob("*.part*"))
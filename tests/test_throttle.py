@@ -0,0 +1,93 @@
+"""Test the per host rate and concurrency limits."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from erddapy import ERDDAP
+from erddapy.benchmarks.server import StandInServer
+from erddapy.core.throttle import Throttle, set_throttle
+from erddapy.core.url import _urlopen
+
+HOST = "erddap.ioos.us"
+
+
+def _overloaded(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(response=response)
+
+
+def test_aimd():
+    """Test the limit grows with successes and halves on overloads."""
+    throttle = Throttle(initial=4, max_concurrency=5)
+    for _ in range(5):
+        with throttle.limit(HOST):
+            pass
+    assert throttle.hosts[HOST].limit == 5  # noqa: PLR2004
+
+    with pytest.raises(requests.exceptions.HTTPError), throttle.limit(HOST):
+        raise _overloaded(503)
+    assert throttle.hosts[HOST].limit == 2.5  # noqa: PLR2004
+
+    with pytest.raises(requests.exceptions.HTTPError), throttle.limit(HOST):
+        raise _overloaded(404)
+    assert throttle.hosts[HOST].limit == pytest.approx(2.9)
+
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.Timeout), throttle.limit(HOST):
+            raise requests.exceptions.Timeout
+    assert throttle.hosts[HOST].limit == 1
+    stats = throttle.stats().loc[HOST]
+    assert stats["overloads"] == 4  # noqa: PLR2004
+    assert stats["in_flight"] == 0
+
+
+def test_concurrency_limit():
+    """Test no more than `limit` requests run at once."""
+    throttle = Throttle(initial=2, max_concurrency=2)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def request():
+        with throttle.limit(HOST):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: request(), range(8)))
+    assert max(peak) == 2  # noqa: PLR2004
+
+
+def test_rate():
+    """Test the token bucket spaces the requests."""
+    throttle = Throttle(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        with throttle.limit(HOST):
+            pass
+    assert time.monotonic() - start >= 0.09  # noqa: PLR2004
+
+
+def test_transport():
+    """Test the requests go through the throttle when it is set."""
+    throttle = Throttle()
+    set_throttle(throttle)
+    _urlopen.cache_clear()
+    try:
+        with StandInServer() as server:
+            e = ERDDAP(server.url, protocol="tabledap")
+            e.dataset_id = "table_100"
+            e.to_pandas()
+            host = server.url.split("/")[2]
+    finally:
+        set_throttle(None)
+    assert throttle.stats().loc[host, "requests"] == 1
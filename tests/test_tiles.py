@@ -0,0 +1,135 @@
+"""Test the griddap tile cache."""
+
+import os
+import re
+
+import numpy as np
+import pytest
+
+from erddapy.core.tiles import TileCache, _griddap_tiles_to_xarray
+
+netcdf4 = pytest.importorskip("netCDF4")
+
+SERVER = "https://coastwatch.pfeg.noaa.gov/erddap"
+
+SST = np.arange(2 * 6 * 8, dtype="int16").reshape(2, 6, 8)
+
+
+@pytest.fixture
+def urls(monkeypatch):
+    """Serve index requests of SST from memory and record their URLs."""
+    urls = []
+
+    def fake_nc_dataset(url, requests_kwargs=None):  # noqa: ARG001
+        urls.append(url)
+        slices = tuple(
+            slice(int(start), int(stop) + 1, int(step))
+            for start, step, stop in re.findall(
+                r"\[(\d+):(\d+):(\d+)\]",
+                url.split(",")[0],
+            )
+        )
+        values = SST[slices]
+        nc = netcdf4.Dataset("tile.nc", mode="w", diskless=True)
+        for dim, size in zip(
+            ("time", "latitude", "longitude"),
+            values.shape,
+            strict=True,
+        ):
+            nc.createDimension(dim, size)
+        var = nc.createVariable("sst", "i2", ("time", "latitude", "longitude"))
+        var.set_auto_maskandscale(False)
+        var.scale_factor = 0.5
+        var[:] = values
+        return nc
+
+    monkeypatch.setattr("erddapy.core.tiles._nc_dataset", fake_nc_dataset)
+    return urls
+
+
+def test_tile_cache_downloads_missing_tiles(urls, tmp_path):
+    """Test overlapping requests only download the missing tiles."""
+    cache = TileCache(tmp_path, {"time": 1, "latitude": 4, "longitude": 4})
+    sizes = {"time": 2, "latitude": 6, "longitude": 8}
+
+    first = {"time": (0, 1, 0), "latitude": (1, 1, 3), "longitude": (2, 1, 5)}
+    first_request = {"variables": ["sst"], "indices": first, "sizes": sizes}
+    downloaded = cache.fetch(SERVER, "sst", **first_request)
+    expected = 2
+    assert downloaded == expected
+    data, attrs = cache.assemble(SERVER, "sst", "sst", first)
+    np.testing.assert_array_equal(data, SST[0:1, 1:4, 2:6])
+    assert attrs["scale_factor"] == 0.5  # noqa: PLR2004
+
+    # Only the tiles of the last latitude rows are new.
+    second = {"time": (0, 1, 0), "latitude": (2, 1, 5), "longitude": (0, 1, 7)}
+    downloaded = cache.fetch(
+        SERVER,
+        "sst",
+        variables=["sst"],
+        indices=second,
+        sizes=sizes,
+    )
+    assert downloaded == expected
+    assert len(urls) == 2 * expected
+    # Tiles on the edge of the grid are clipped to the axis.
+    assert "[4:1:5]" in urls[-1]
+    data, _ = cache.assemble(SERVER, "sst", "sst", second)
+    np.testing.assert_array_equal(data, SST[0:1, 2:6, 0:8])
+
+    assert cache.fetch(SERVER, "sst", **first_request) == 0
+
+
+def test_griddap_tiles_to_xarray(urls, tmp_path):
+    """Test a request is assembled and decoded like `to_xarray`."""
+    cache = TileCache(tmp_path)
+    axes = {
+        "time": np.array([0.0, 86400.0]),
+        "latitude": np.linspace(-2.5, 2.5, 6),
+        "longitude": np.linspace(0, 7, 8),
+    }
+    indices = {
+        "time": (1, 1, 1),
+        "latitude": (0, 2, 4),
+        "longitude": (3, 1, 6),
+    }
+    request = {
+        "server": SERVER,
+        "dataset_id": "sst",
+        "variables": ["sst"],
+        "indices": indices,
+        "axes": axes,
+        "axes_attrs": {"latitude": {"units": "degrees_north"}},
+    }
+    ds = _griddap_tiles_to_xarray(cache, **request)
+
+    assert len(urls) == 1
+    assert ds["time"].values[0] == np.datetime64("1970-01-02")
+    np.testing.assert_array_equal(ds["latitude"], axes["latitude"][0:5:2])
+    assert ds["latitude"].attrs["units"] == "degrees_north"
+    np.testing.assert_array_equal(ds["sst"], SST[1:2, 0:5:2, 3:7] * 0.5)
+
+    raw = _griddap_tiles_to_xarray(
+        cache,
+        **request,
+        xarray_kwargs={"mask_and_scale": False, "decode_times": False},
+    )
+    assert len(urls) == 1
+    assert raw["time"].values[0] == 86400.0  # noqa: PLR2004
+    np.testing.assert_array_equal(raw["sst"], SST[1:2, 0:5:2, 3:7])
+
+
+def test_tile_cache_ttl(urls, tmp_path):
+    """Test expired tiles are downloaded again."""
+    cache = TileCache(tmp_path, ttl=60)
+    request = {
+        "variables": ["sst"],
+        "indices": {"time": (0, 1, 0), "latitude": (0, 1, 5)},
+        "sizes": {"time": 2, "latitude": 6},
+    }
+    assert cache.fetch(SERVER, "sst", **request) == 1
+    assert cache.fetch(SERVER, "sst", **request) == 0
+    for path in tmp_path.rglob("*.npz"):
+        os.utime(path, (0, 0))
+    assert cache.fetch(SERVER, "sst", **request) == 1
+    assert len(urls) == 2  # noqa: PLR2004
@@ -0,0 +1,58 @@
+"""Test the OpenTelemetry spans."""
+
+import pytest
+
+from erddapy import ERDDAP
+from erddapy.benchmarks.server import StandInServer
+from erddapy.core import tracing
+from erddapy.core.url import _urlopen
+from erddapy.multiple_server_search import search_servers
+
+
+def test_span_without_opentelemetry(monkeypatch):
+    """Test spans are no-ops without OpenTelemetry."""
+    monkeypatch.setattr(tracing, "_tracer", None)
+    with tracing._span("url", server="https://erddap.ioos.us") as span:  # noqa: SLF001
+        tracing._set_attributes(span, payload_bytes=1)  # noqa: SLF001
+    assert span is None
+
+
+def test_spans(monkeypatch):
+    """Test the URL, request, decode, and search spans."""
+    sdk = pytest.importorskip("opentelemetry.sdk.trace")
+    export = pytest.importorskip("opentelemetry.sdk.trace.export")
+    memory = pytest.importorskip(
+        "opentelemetry.sdk.trace.export.in_memory_span_exporter",
+    )
+    exporter = memory.InMemorySpanExporter()
+    provider = sdk.TracerProvider()
+    provider.add_span_processor(export.SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "_tracer", provider.get_tracer("erddapy"))
+    _urlopen.cache_clear()
+
+    with StandInServer() as server:
+        e = ERDDAP(server.url, protocol="tabledap")
+        e.dataset_id = "table_10"
+        e.to_pandas()
+        search_servers("temperature", servers_list=[f"{server.url}/"])
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert {
+        "erddapy.url",
+        "erddapy.http",
+        "erddapy.decode",
+        "erddapy.search",
+        "erddapy.search.server",
+    } <= set(spans)
+    url = spans["erddapy.url"].attributes
+    assert url["erddap.dataset_id"] == "table_10"
+    assert url["erddap.response"] == "csvp"
+    http = spans["erddapy.http"].attributes
+    assert http["http.response.status_code"] == 200  # noqa: PLR2004
+    assert http["erddap.payload_bytes"] > 0
+    assert spans["erddapy.decode"].attributes["erddap.decoder"] == "pandas"
+    assert spans["erddapy.search"].attributes["erddap.servers"] == 1
+    assert (
+        spans["erddapy.search.server"].parent.span_id
+        == spans["erddapy.search"].context.span_id
+    )